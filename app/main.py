@@ -1,13 +1,42 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.routes.main import router  
+from app.utils.audio_processing import warmup_whisper
+from app.utils.sentiment_analysis import warmup_sentiment
+from app.utils.executors import shutdown_executors
+from app.utils.long_audio import cerrar_pools
+from app.utils.jobs import job_queue
+from app.utils.search_llm import precargar_definiciones
+from app.utils import http_client, openai_client
 
+import asyncio
 import os
 import uvicorn
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Precargar los modelos de Whisper indicados en WHISPER_WARMUP (p. ej. "small")
+    await asyncio.to_thread(warmup_whisper)
+    # Opcional (SENTIMENT_WARMUP=1): solo en los workers que sirven /api/analyze
+    await asyncio.to_thread(warmup_sentiment)
+    await job_queue.start()
+    # Opcional (LLM_CACHE_PREWARM=1): precargar en segundo plano las definiciones más consultadas
+    precarga = asyncio.create_task(precargar_definiciones()) if os.getenv("LLM_CACHE_PREWARM", "0") == "1" else None
+    yield
+    if precarga is not None:
+        precarga.cancel()
+    await job_queue.stop()
+    await http_client.aclose()
+    await openai_client.aclose()
+    await asyncio.to_thread(cerrar_pools)
+    shutdown_executors()
+
+
 # Crear la instancia principal de FastAPI
-app = FastAPI(title="YouTube Analysis Backend")
+app = FastAPI(title="YouTube Analysis Backend", lifespan=lifespan)
 
 # Middleware CORS
 app.add_middleware(
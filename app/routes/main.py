@@ -1,28 +1,42 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field 
 from typing import Any, Optional, List 
 from app.utils.youtube_api import fetch_channel_videos
 from app.database.database_service import (
     save_feedback
 )
+import json
 import logging
 import sys
-from openai import OpenAI  # Añadir esta línea
 import os  # Añadir esta línea
 from dotenv import load_dotenv  # Añadir esta línea
 from app.utils.audio_processing import procesar_video  
 from app.utils.audio_processing import transcribir_audio_whisper
 from app.utils.audio_processing import download_audio_yt_dlp
+from app.utils.audio_processing import whisper_models
+from app.utils.asr_engines import asr_stats, get_engine
+from app.utils.audio_processing import obtener_transcripcion_youtube
+from app.utils.executors import run_io, run_cpu
+from app.utils.openai_client import chat_completion, check_openai_ready
+from app.utils.transcription_cache import transcription_cache_stats
+from app.utils.audio_cache import audio_cache_stats
+from app.utils.vad import vad_stats
+from app.utils.video_pipeline import ejecutar_pipeline_async, pipeline_cache_stats, resolver_etapas
+from app.utils.audio_processing import extraer_video_id
+from app.utils.jobs import job_queue
+from app.utils.sentiment_analysis import sentiment_models
+from app.utils.summarizer import summary_cache_stats
+from app.utils.transcript_index import contexto_para_pregunta, embedding_models, index_cache_stats
 from app.utils.perfume_analysis import analyze_perfumes_from_transcription
 from app.utils.perfume_parameters import analyze_parameters_from_transcription
-from app.utils.search_llm import truncate_at_last_period 
+from app.utils.search_llm import generar_definicion
+from app.utils.llm_cache import llm_cache_stats, record_feedback
+from app.utils.catalog import get_catalog, reload_catalog
 
 # Cargar variables de entorno
 load_dotenv()
 
-# Inicializar el cliente OpenAI
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -35,6 +49,17 @@ logger = logging.getLogger(__name__)
 # Crear el enrutador principal
 router = APIRouter()
 
+
+def _validar_asr(asr_engine, whisper_model):
+    """
+    Comprueba el motor y el modelo de ASR pedidos antes de empezar ningún trabajo:
+    un valor desconocido es un error del cliente (400), no un fallo a mitad del pipeline.
+    """
+    try:
+        get_engine(asr_engine).model_key(whisper_model)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
 # Modelo Pydantic para validar la solicitud de análisis
 class AnalyzeRequest(BaseModel):
     url: str
@@ -53,7 +78,7 @@ async def analyze_channel(request: AnalyzeRequest):
     """
     try:
         # Obtener datos del canal y procesar el último video
-        channel_data = fetch_channel_videos(request.url)
+        channel_data = await fetch_channel_videos(request.url)
 
         if not channel_data:
             raise HTTPException(status_code=400, detail="No se pudieron obtener los datos del canal")
@@ -86,12 +111,17 @@ async def save_user_feedback(feedback: FeedbackData):
     Endpoint para guardar la retroalimentación del usuario.
     """
     try: 
-        save_feedback(
+        # psycopg2 es bloqueante: se ejecuta en el pool de IO
+        await run_io(
+            save_feedback,
             feedback.type, 
             feedback.result, 
             feedback.content,
             feedback.prompt
         )
+        if feedback.type == "definition":
+            # Las valoraciones negativas invalidan la definición cacheada
+            record_feedback(feedback.content, feedback.result)
         return {"message": "Feedback guardado exitosamente."}
     except Exception as e:
         raise HTTPException(
@@ -105,21 +135,26 @@ import traceback
 
 class PerfumeAnalysisRequest(BaseModel):
     video_url: str
+    whisper_model: Optional[str] = Field(default=None, description="Tamaño del modelo Whisper (tiny, base, small...)")
+    asr_engine: Optional[str] = Field(default=None, description="Motor de ASR (whisper, faster-whisper, vosk)")
 
 @router.post("/api/analyze-perfumes")
 async def analyze_perfumes_endpoint(request: PerfumeAnalysisRequest):
     """
     Endpoint para analizar perfumes mencionados en un video
     """
+    _validar_asr(request.asr_engine, request.whisper_model)
     try:
-        # Procesar el video usando la función existente
-        video_data = procesar_video(request.video_url)
+        # Ejecutar solo las etapas necesarias para el análisis de perfumes
+        video_data = await ejecutar_pipeline_async(
+            request.video_url, ["perfumes"], request.whisper_model, asr_engine=request.asr_engine
+        )
         
         if not video_data:
             raise HTTPException(status_code=400, detail="No se pudo procesar el video")
             
         # Extraer el análisis de perfumes
-        perfume_analysis = video_data.get("perfume_analysis")
+        perfume_analysis = video_data.get("perfumes")
         
         if not perfume_analysis:
             raise HTTPException(status_code=404, detail="No se encontró análisis de perfumes")
@@ -151,6 +186,8 @@ class PerfumeParameter(BaseModel):
 class ParametersRequest(BaseModel):
     video_url: Optional[str] = Field(default=None, description="URL del video a analizar")
     transcription: Optional[str] = Field(default=None, description="Transcripción del video")
+    whisper_model: Optional[str] = Field(default=None, description="Tamaño del modelo Whisper (tiny, base, small...)")
+    asr_engine: Optional[str] = Field(default=None, description="Motor de ASR (whisper, faster-whisper, vosk)")
 
 
 class ParametersResponse(BaseModel):
@@ -172,23 +209,24 @@ async def parameters_endpoint(request: ParametersRequest):
                 status_code=400,
                 detail="Se requiere proporcionar una URL de video válida"
             )
+        _validar_asr(request.asr_engine, request.whisper_model)
 
         # Utilizar la función de análisis basada en la URL
         logger.info(f"Analizando parámetros desde la URL del video: {request.video_url}")
 
-        # Llamada directa a la función analyze_parameters_from_transcription
-        transcription = procesar_video(request.video_url)["transcription"]
+        # Ejecutar solo la transcripción y el análisis de parámetros
+        video_data = await ejecutar_pipeline_async(
+            request.video_url, ["parameters"], request.whisper_model, asr_engine=request.asr_engine
+        )
 
-        if not transcription:
+        if not video_data:
             raise HTTPException(
                 status_code=500,
                 detail="No se pudo obtener la transcripción del video"
             )
 
-        # Analizar la transcripción para obtener parámetros
-        parameter_analysis = analyze_parameters_from_transcription(transcription)
-
         # Validar y procesar el resultado
+        parameter_analysis = video_data.get("parameters") or {}
         perfumes = parameter_analysis.get("perfumes", [])
         if not isinstance(perfumes, list):
             logger.error("El resultado del análisis no contiene una lista válida de perfumes")
@@ -215,43 +253,159 @@ async def parameters_endpoint(request: ParametersRequest):
             detail=f"Error en el análisis de parámetros: {str(e)}"
         )
 
+# --- Trabajos en segundo plano ---
+
+DEFAULT_JOB_ARTIFACTS = ["summary", "brands", "perfumes", "parameters"]
+
+
+async def _job_video(params, progress):
+    return await ejecutar_pipeline_async(
+        params["video_url"], params["artifacts"], params.get("whisper_model"),
+        on_stage=progress, asr_engine=params.get("asr_engine"),
+    )
+
+
+async def _job_channel(params, progress):
+    progress("channel", "running")
+    channel_data = await fetch_channel_videos(params["url"])
+    progress("channel", "done")
+    return channel_data
+
+
+job_queue.register("video", _job_video)
+job_queue.register("channel", _job_channel)
+
+
+class JobRequest(BaseModel):
+    kind: str = Field(description="Tipo de trabajo: 'video' o 'channel'")
+    url: str = Field(description="URL del video o del canal")
+    artifacts: Optional[List[str]] = Field(default=None, description="Artefactos a calcular (solo 'video')")
+    whisper_model: Optional[str] = Field(default=None, description="Tamaño del modelo Whisper (solo 'video')")
+    asr_engine: Optional[str] = Field(default=None, description="Motor de ASR (solo 'video')")
+
+
+@router.post("/api/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """
+    Encola el análisis de un video o de un canal y devuelve el ID del trabajo.
+    Si ya hay un trabajo idéntico en curso, devuelve ese mismo ID.
+    """
+    try:
+        if request.kind == "video":
+            artifacts = sorted(set(request.artifacts or DEFAULT_JOB_ARTIFACTS))
+            resolver_etapas(artifacts)
+            _validar_asr(request.asr_engine, request.whisper_model)
+            params = {
+                "video_url": request.url,
+                "artifacts": artifacts,
+                "whisper_model": request.whisper_model,
+                "asr_engine": request.asr_engine,
+            }
+            dedup_key = (
+                f"video:{extraer_video_id(request.url)}:{','.join(artifacts)}:"
+                f"{request.whisper_model or ''}:{request.asr_engine or ''}"
+            )
+        elif request.kind == "channel":
+            params = {"url": request.url}
+            dedup_key = f"channel:{request.url.rstrip('/')}"
+        else:
+            raise ValueError(f"Tipo de trabajo desconocido: {request.kind}")
+
+        job, deduplicated = await run_io(job_queue.submit, request.kind, params, dedup_key)
+        return {"job_id": job["id"], "status": job["status"], "deduplicated": deduplicated}
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+
+@router.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Estado, progreso por etapas y resultado (cuando termina) de un trabajo.
+    """
+    job = await run_io(job_queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job
+
+
+@router.get("/api/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    """
+    Emite el progreso del trabajo como Server-Sent Events hasta que termina.
+    """
+    if not await run_io(job_queue.get, job_id):
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+
+    async def eventos():
+        async for job in job_queue.watch(job_id):
+            yield f"data: {json.dumps(job, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(eventos(), media_type="text/event-stream")
+
+
+@router.get("/api/health")
+async def health():
+    """
+    Liveness: el worker está arrancado (no hace llamadas externas).
+    """
+    return {"status": "ok"}
+
+
+@router.get("/api/health/ready")
+async def readiness(force: bool = False):
+    """
+    Readiness: comprueba la conexión con OpenAI (resultado cacheado unos segundos).
+    Devuelve 503 si OpenAI no está disponible.
+    """
+    openai_status = await check_openai_ready(force=force)
+    if not openai_status["ready"]:
+        raise HTTPException(status_code=503, detail={"openai": openai_status})
+    return {"status": "ready", "openai": openai_status}
+
+
+@router.get("/api/metrics")
+async def get_metrics():
+    """
+    Métricas internas del worker (modelos y cachés).
+    """
+    return {
+        "whisper": whisper_models.stats(),
+        "asr": asr_stats(),
+        "vad": vad_stats(),
+        "sentiment": sentiment_models.stats(),
+        "transcription_cache": transcription_cache_stats(),
+        "audio_cache": await run_io(audio_cache_stats),  # Recorre el directorio de la caché
+        "pipeline_cache": pipeline_cache_stats(),
+        "summary_chunk_cache": summary_cache_stats(),
+        "embeddings": embedding_models.stats(),
+        "transcript_index_cache": index_cache_stats(),
+        "llm_cache": llm_cache_stats(),
+        "catalog": get_catalog().stats()
+    }
+
+
+@router.post("/api/catalog/reload")
+async def reload_catalog_endpoint():
+    """
+    Recarga el catálogo de marcas y perfumes sin reiniciar el worker.
+    """
+    try:
+        catalogo = await run_cpu(reload_catalog, True)
+        return {"message": "Catálogo recargado", "catalog": catalogo.stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al recargar el catálogo: {str(e)}")
+
+
 @router.post("/api/define")
 async def search_definition(request: SearchRequest):
     try:
         logger.info(f"Recibida solicitud de definición para: {request.term}")
-        
-        messages = [
-            {"role": "system", "content": "Eres un experto en perfumería que proporciona definiciones precisas y profesionales."},
-            {"role": "user", "content": f"Define {request.term} de forma breve y profesional en español."}
-        ]
-        
-        logger.info("Generando definición con OpenAI...")
-        try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                max_tokens=200,
-                temperature=0.7,
-                top_p=0.9
-            )
-            definition = response.choices[0].message.content
-            logger.info(f"Respuesta completa: {definition}")
-        except Exception as e:
-            logger.error(f"Error en la generación con OpenAI: {str(e)}")
-            raise
-        
-        # Now truncate_at_last_period is available
-        definition = truncate_at_last_period(definition)
-        logger.info(f"Definición final extraída y truncada: {definition}")
-        
-        if len(definition) < 10:
-            logger.warning("La definición generada es demasiado corta")
-            raise ValueError("La definición generada es demasiado corta")
-            
+        definition, messages, cached = await generar_definicion(request.term)
         return {
             "definition": definition,
             "prompt_system": messages[0]["content"],
-            "prompt_user": messages[1]["content"]
+            "prompt_user": messages[1]["content"],
+            "cached": cached
         }
         
     except Exception as e:
@@ -263,7 +417,6 @@ async def search_definition(request: SearchRequest):
         )
 
 from fastapi import APIRouter, HTTPException
-from youtube_transcript_api import YouTubeTranscriptApi
 import logging
 
 # Configurar logging
@@ -293,8 +446,7 @@ async def ask_question(request: QuestionRequest):
 
         # 2. Obtener transcripción
         try:
-            transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=['es'])
-            transcription = " ".join([item['text'] for item in transcript])
+            transcription = await run_io(obtener_transcripcion_youtube, video_id)
             
             if not transcription.strip():
                 logger.warning("La transcripción está vacía")
@@ -308,7 +460,14 @@ async def ask_question(request: QuestionRequest):
                 detail="Error al obtener la transcripción. Verifica que el video exista y tenga subtítulos en español."
             )
 
-        # 3. Preparar mensajes para OpenAI
+        # 3. Recuperar los fragmentos relevantes (el índice se construye una vez por video)
+        try:
+            contexto = await run_cpu(contexto_para_pregunta, video_id, transcription, request.question)
+        except Exception as e:
+            logger.error(f"Error en la recuperación de fragmentos, se usa la transcripción completa: {str(e)}")
+            contexto = transcription
+
+        # 4. Preparar mensajes para OpenAI
         messages = [
             {
                 "role": "system", 
@@ -316,14 +475,14 @@ async def ask_question(request: QuestionRequest):
             },
             {
                 "role": "user", 
-                "content": f"Transcripción: {transcription}\nPregunta: {request.question}"
+                "content": f"Transcripción: {contexto}\nPregunta: {request.question}"
             }
         ]
         
-        # 4. Generar respuesta usando OpenAI
+        # 5. Generar respuesta usando OpenAI
         logger.info("Generando respuesta con OpenAI...")
         try:
-            response = client.chat.completions.create(
+            response = await chat_completion(
                 model="gpt-3.5-turbo",
                 messages=messages,
                 max_tokens=300,
@@ -336,7 +495,7 @@ async def ask_question(request: QuestionRequest):
             logger.error(f"Error en la generación con OpenAI: {str(e)}")
             raise
 
-        # 5. Verificar calidad de la respuesta
+        # 6. Verificar calidad de la respuesta
         if len(answer) < 10:
             logger.warning("La respuesta generada es demasiado corta")
             raise ValueError("La respuesta generada es demasiado corta")
@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import logging
+import numpy as np
+import whisper
+from app.utils.model_registry import ModelRegistry
+from app.utils.long_audio import SAMPLE_RATE, LONG_AUDIO_MIN_SECONDS, LONG_AUDIO_WORKERS, transcribir_en_paralelo
+from app.utils.transcription_cache import asr_source
+
+logger = logging.getLogger(__name__)
+
+# Motor de ASR por defecto (se puede sobrescribir por petición con `asr_engine`)
+ASR_ENGINE = os.getenv("ASR_ENGINE", "whisper")
+
+# Configuración de Whisper (se puede sobrescribir por petición con `model_size`)
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "small")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "fp32")
+
+# faster-whisper (CTranslate2): mismos tamaños que Whisper, cuantizado a int8 en CPU
+FASTER_WHISPER_COMPUTE_TYPE = os.getenv("FASTER_WHISPER_COMPUTE_TYPE", "int8")
+FASTER_WHISPER_BEAM_SIZE = int(os.getenv("FASTER_WHISPER_BEAM_SIZE", "5"))
+# Modelos que se pueden pedir por petición (WhisperModel descargaría cualquier repo de Hugging Face)
+FASTER_WHISPER_MODELS = [
+    m.strip() for m in os.getenv(
+        "FASTER_WHISPER_MODELS", "tiny,base,small,medium,large-v2,large-v3,distil-large-v3"
+    ).split(",") if m.strip()
+]
+
+# Vosk (Kaldi): transcripción en streaming, mucho más barata, para borradores de baja latencia
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", os.path.join("models", "vosk-model-small-es-0.42"))
+VOSK_CHUNK_SECONDS = float(os.getenv("VOSK_CHUNK_SECONDS", "0.5"))
+# Directorios de modelos de Vosk que se pueden pedir por petición (por ruta o por nombre del directorio)
+VOSK_MODEL_PATHS = list(dict.fromkeys(
+    [VOSK_MODEL_PATH, *(p.strip() for p in os.getenv("VOSK_MODEL_PATHS", "").split(",") if p.strip())]
+))
+
+
+def cargar_audio(ruta):
+    """
+    Lee un fichero de audio (cualquier formato que entienda ffmpeg) como float32 mono a 16 kHz.
+    """
+    return whisper.load_audio(ruta)
+
+
+def pcm16(audio):
+    """
+    Convierte audio float32 en [-1, 1] a PCM de 16 bits little-endian (bytes).
+    """
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+# --- Carga de modelos (funciones de módulo: los procesos de long_audio las reciben por referencia) ---
+
+def _cargar_modelo_whisper(model_size, device, compute_type):
+    return whisper.load_model(model_size, device=device)
+
+
+def _cargar_modelo_faster_whisper(model_size, device, compute_type):
+    from faster_whisper import WhisperModel
+
+    return WhisperModel(model_size, device=device, compute_type=compute_type)
+
+
+def _cargar_modelo_vosk(ruta):
+    from vosk import Model, SetLogLevel
+
+    SetLogLevel(-1)
+    return Model(ruta)
+
+
+# Un único registro por motor y worker: cada clave se carga una vez
+whisper_models = ModelRegistry(
+    "whisper",
+    _cargar_modelo_whisper,
+    max_modelos=int(os.getenv("WHISPER_MAX_MODELS", "2")),
+    min_memoria_mb=int(os.getenv("WHISPER_MIN_FREE_MB", "0")) or None,
+)
+faster_whisper_models = ModelRegistry(
+    "faster-whisper",
+    _cargar_modelo_faster_whisper,
+    max_modelos=int(os.getenv("FASTER_WHISPER_MAX_MODELS", "2")),
+    min_memoria_mb=int(os.getenv("WHISPER_MIN_FREE_MB", "0")) or None,
+)
+vosk_models = ModelRegistry("vosk", _cargar_modelo_vosk, max_modelos=1)
+
+
+def whisper_model_key(model_size=None):
+    """
+    Clave del registro de Whisper para un tamaño de modelo (o el configurado por defecto).
+    """
+    model_size = model_size or WHISPER_MODEL_SIZE
+    if model_size not in whisper.available_models():
+        raise ValueError(f"Modelo de Whisper no válido: {model_size}")
+    return (model_size, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE)
+
+
+def faster_whisper_model_key(model_size=None):
+    """
+    Clave del registro de faster-whisper; solo se aceptan los modelos de FASTER_WHISPER_MODELS.
+    """
+    model_size = model_size or WHISPER_MODEL_SIZE
+    if model_size not in FASTER_WHISPER_MODELS:
+        raise ValueError(f"Modelo de faster-whisper no válido: {model_size}")
+    return (model_size, WHISPER_DEVICE, FASTER_WHISPER_COMPUTE_TYPE)
+
+
+def vosk_model_key(model=None):
+    """
+    Clave del registro de Vosk: la ruta configurada (VOSK_MODEL_PATHS) que corresponde a `model`,
+    dado por ruta o por nombre del directorio. Nunca se abre una ruta que no esté configurada.
+    """
+    if not model:
+        return (VOSK_MODEL_PATH,)
+    candidatas = [
+        ruta for ruta in VOSK_MODEL_PATHS if model == ruta or model == os.path.basename(ruta.rstrip("/"))
+    ]
+    if len(candidatas) != 1:
+        motivo = "ambiguo" if candidatas else "no válido"
+        raise ValueError(f"Modelo de Vosk {motivo}: {model}")
+    return (candidatas[0],)
+
+
+# --- Inferencia: todas devuelven {"text", "segments": [{"start", "end", "text"}, ...]} ---
+
+def _transcribir_whisper(modelo, audio, **opciones):
+    resultado = modelo.transcribe(audio, **opciones)
+    return {
+        "text": resultado.get("text", "").strip(),
+        "segments": [
+            {"start": s["start"], "end": s["end"], "text": s["text"]} for s in resultado.get("segments", [])
+        ],
+    }
+
+
+def _transcribir_faster_whisper(modelo, audio, **opciones):
+    # faster-whisper devuelve un generador: la decodificación ocurre al recorrerlo
+    segmentos, _ = modelo.transcribe(audio, **opciones)
+    segmentos = [{"start": s.start, "end": s.end, "text": s.text} for s in segmentos]
+    return {"text": "".join(s["text"] for s in segmentos).strip(), "segments": segmentos}
+
+
+def _frase_vosk(resultado_json):
+    resultado = json.loads(resultado_json)
+    texto = resultado.get("text", "").strip()
+    if not texto:
+        return None
+    palabras = resultado.get("result") or [{"start": 0.0, "end": 0.0}]
+    return {"start": palabras[0]["start"], "end": palabras[-1]["end"], "text": texto}
+
+
+def transcribir_vosk_stream(modelo, bloques, sample_rate=SAMPLE_RATE):
+    """
+    Transcribe en streaming bloques de PCM de 16 bits mono (bytes). Genera cada frase
+    {"start", "end", "text"} en cuanto Vosk la da por terminada, sin esperar al final del audio.
+    """
+    from vosk import KaldiRecognizer
+
+    reconocedor = KaldiRecognizer(modelo, sample_rate)
+    reconocedor.SetWords(True)
+    for bloque in bloques:
+        if reconocedor.AcceptWaveform(bloque):
+            frase = _frase_vosk(reconocedor.Result())
+            if frase:
+                yield frase
+    frase = _frase_vosk(reconocedor.FinalResult())
+    if frase:
+        yield frase
+
+
+def _transcribir_vosk(modelo, audio, chunk_s=VOSK_CHUNK_SECONDS):
+    pcm = pcm16(audio)
+    tamano = 2 * int(SAMPLE_RATE * chunk_s)
+    segmentos = list(transcribir_vosk_stream(modelo, (pcm[i:i + tamano] for i in range(0, len(pcm), tamano))))
+    return {"text": " ".join(s["text"] for s in segmentos), "segments": segmentos}
+
+
+class ASREngine:
+    """
+    Motor de ASR. Carga sus modelos en un registro compartido por proceso y transcribe audio
+    float32 mono a 16 kHz. Los audios de más de LONG_AUDIO_MIN_SECONDS se reparten por
+    segmentos entre varios procesos (ver `long_audio`).
+    """
+
+    nombre = None
+    registro = None
+    cargar_modelo = None
+    transcribir = None
+    # Si el modelo compartido no admite inferencias concurrentes desde varios hilos del pool de CPU
+    serializar_inferencia = True
+
+    def model_key(self, model=None):
+        raise NotImplementedError
+
+    def opciones(self):
+        return {}
+
+    def source(self, model=None):
+        """
+        Fuente de la caché de transcripciones para este motor y modelo ("<motor>:<modelo>").
+        """
+        return asr_source(self.nombre, self.model_key(model)[0])
+
+    def _inferencia(self, modelo, key, audio):
+        if self.serializar_inferencia:
+            with self.registro.inference_lock(*key):
+                return self.transcribir(modelo, audio, **self.opciones())
+        return self.transcribir(modelo, audio, **self.opciones())
+
+    def transcribe(self, audio, model=None):
+        """
+        Devuelve {"text", "segments"} con marcas de tiempo en segundos desde el inicio del audio.
+        """
+        key = self.model_key(model)
+
+        if len(audio) / SAMPLE_RATE >= LONG_AUDIO_MIN_SECONDS and LONG_AUDIO_WORKERS > 1:
+            # Los segmentos se transcriben en los procesos del pool: el modelo no se carga en este
+            # salvo que el audio acabe en un único segmento
+            inicio = time.perf_counter()
+            resultado = transcribir_en_paralelo(
+                audio, lambda segmento: self._inferencia(self.registro.get(*key), key, segmento),
+                self.cargar_modelo, key, self.opciones(), transcribir=self.transcribir,
+            )
+        else:
+            modelo = self.registro.get(*key)
+            inicio = time.perf_counter()
+            resultado = self._inferencia(modelo, key, audio)
+        duracion = time.perf_counter() - inicio
+        self.registro.record_inference(key, duracion)
+        logger.info(
+            f"Inferencia de {self.nombre} ({key[0]}) completada en {duracion:.2f}s "
+            f"(RTF {duracion / max(len(audio) / SAMPLE_RATE, 1e-6):.2f})"
+        )
+        return resultado
+
+
+class WhisperEngine(ASREngine):
+    nombre = "whisper"
+    registro = whisper_models
+    cargar_modelo = staticmethod(_cargar_modelo_whisper)
+    transcribir = staticmethod(_transcribir_whisper)
+
+    def model_key(self, model=None):
+        return whisper_model_key(model)
+
+    def opciones(self):
+        return {"language": "es", "task": "transcribe", "fp16": WHISPER_COMPUTE_TYPE == "fp16"}
+
+
+class FasterWhisperEngine(ASREngine):
+    nombre = "faster-whisper"
+    registro = faster_whisper_models
+    cargar_modelo = staticmethod(_cargar_modelo_faster_whisper)
+    transcribir = staticmethod(_transcribir_faster_whisper)
+
+    def model_key(self, model=None):
+        return faster_whisper_model_key(model)
+
+    def opciones(self):
+        return {"language": "es", "task": "transcribe", "beam_size": FASTER_WHISPER_BEAM_SIZE}
+
+
+class VoskEngine(ASREngine):
+    nombre = "vosk"
+    registro = vosk_models
+    cargar_modelo = staticmethod(_cargar_modelo_vosk)
+    transcribir = staticmethod(_transcribir_vosk)
+    # Cada llamada crea su propio KaldiRecognizer; el modelo solo se lee
+    serializar_inferencia = False
+
+    def model_key(self, model=None):
+        # Para Vosk el "modelo" es el directorio del modelo; la caché se indexa por la ruta completa
+        return vosk_model_key(model)
+
+    def stream(self, bloques, model=None):
+        """
+        Transcribe bloques de PCM de 16 bits a medida que llegan (ver `transcribir_vosk_stream`).
+        """
+        return transcribir_vosk_stream(self.registro.get(*self.model_key(model)), bloques)
+
+
+ENGINES = {engine.nombre: engine for engine in (WhisperEngine(), FasterWhisperEngine(), VoskEngine())}
+
+
+def get_engine(nombre=None):
+    """
+    Devuelve el motor de ASR `nombre` (o el configurado en ASR_ENGINE).
+    """
+    nombre = nombre or ASR_ENGINE
+    if nombre not in ENGINES:
+        raise ValueError(f"Motor de ASR no válido: {nombre} (disponibles: {', '.join(ENGINES)})")
+    return ENGINES[nombre]
+
+
+def asr_stats():
+    return {"default": ASR_ENGINE, "engines": {nombre: engine.registro.stats() for nombre, engine in ENGINES.items()}}
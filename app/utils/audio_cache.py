@@ -0,0 +1,252 @@
+import os
+import time
+import fcntl
+import shutil
+import logging
+import tempfile
+from contextlib import contextmanager
+from app.utils.cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join("cache", "audio"))
+# Límite de disco de la caché. En Cloud Run el sistema de ficheros está en memoria.
+# Con 0 el PCM de la descarga en streaming no se guarda y de los WAV solo se conserva el último
+AUDIO_CACHE_MAX_MB = float(os.getenv("AUDIO_CACHE_MAX_MB", "1024"))
+
+# Extensión de los ficheros de cada formato
+FORMATOS = {"pcm16k": "pcm", "wav": "wav"}
+
+# Los temporales más antiguos que esto son de escrituras interrumpidas (un worker que murió)
+_TMP_MAX_EDAD = 6 * 3600
+
+
+class AudioCache:
+    """
+    Caché en disco del audio descargado, por (id del video o de la fuente, formato).
+    - Escrituras atómicas: se escribe en un temporal del mismo directorio y se renombra.
+    - Un lock por clave (flock, válido entre hilos y entre procesos): si dos peticiones piden
+      el mismo audio, se descarga una vez y la segunda reutiliza el fichero. Quien lee una entrada
+      mantiene el lock compartido mientras la usa, así que la expulsión no la borra a medio leer.
+    - Tamaño acotado: al superar `max_mb` se borran las entradas usadas hace más tiempo
+      (por mtime, que se actualiza en cada acierto).
+    """
+
+    def __init__(self, directorio, max_mb):
+        self.directorio = directorio
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(os.path.join(directorio, ".locks"), exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _ruta(self, key, formato):
+        return os.path.join(self.directorio, key[:2], f"{key}.{FORMATOS[formato]}")
+
+    def _ruta_lock(self, key):
+        return os.path.join(self.directorio, ".locks", f"{key}.lock")
+
+    def _abrir_lock(self, key, bloquear=True, modo=fcntl.LOCK_EX):
+        """
+        Abre y bloquea el fichero de lock de la clave (`modo`: LOCK_EX o LOCK_SH). Cada open() es una
+        descripción de fichero distinta, así que flock también excluye a otros hilos del mismo proceso.
+        Devuelve el fichero abierto (cerrarlo libera el lock), o None si `bloquear` es False y está ocupado.
+        """
+        ruta = self._ruta_lock(key)
+        while True:
+            f = open(ruta, "a")
+            try:
+                fcntl.flock(f, modo if bloquear else modo | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                return None
+            try:
+                vigente = os.fstat(f.fileno()).st_ino == os.stat(ruta).st_ino
+            except FileNotFoundError:
+                vigente = False
+            if vigente:
+                return f
+            f.close()  # La expulsión borró el lock mientras esperábamos: se usa el nuevo
+
+    @contextmanager
+    def _bloqueo(self, key, modo=fcntl.LOCK_EX):
+        f = self._abrir_lock(key, modo=modo)
+        try:
+            yield
+        finally:
+            f.close()
+
+    @staticmethod
+    def _tocar(ruta):
+        try:
+            os.utime(ruta)  # Marca el uso para el orden LRU
+            return True
+        except FileNotFoundError:
+            return False
+
+    @contextmanager
+    def get(self, clave, formato):
+        """
+        Context manager que da la ruta del audio guardado para (clave, formato), o None.
+        La entrada no se expulsa mientras dura el bloque.
+        """
+        key = cache_key(clave, formato)
+        ruta = self._ruta(key, formato)
+        with self._bloqueo(key, fcntl.LOCK_SH):
+            if self._tocar(ruta):
+                self.hits += 1
+                yield ruta
+            else:
+                self.misses += 1
+                yield None
+
+    @contextmanager
+    def get_or_create(self, clave, formato, producir):
+        """
+        Context manager que da la ruta del audio (clave, formato), generándolo con `producir(ruta_tmp)`
+        si no está. `producir` escribe el fichero completo en `ruta_tmp`; si falla, no queda nada en la caché.
+        La entrada no se expulsa mientras dura el bloque: el fichero se debe leer dentro de él.
+        """
+        key = cache_key(clave, formato)
+        ruta = self._ruta(key, formato)
+        with self._bloqueo(key, fcntl.LOCK_SH):
+            if self._tocar(ruta):
+                self.hits += 1
+                yield ruta
+                return
+
+        with self._bloqueo(key):
+            # Otra petición ha podido generarlo mientras se esperaba el lock exclusivo
+            if self._tocar(ruta):
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._producir(clave, ruta, producir)
+                self.expulsar(conservar=ruta)
+            yield ruta
+
+    @staticmethod
+    def _producir(clave, ruta, producir):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+        os.close(fd)
+        try:
+            producir(tmp)
+            if os.path.getsize(tmp) == 0:
+                raise ValueError(f"El audio de {clave} está vacío")
+            os.replace(tmp, ruta)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def temporal(self):
+        """
+        Directorio temporal dentro de la caché (mismo sistema de ficheros, para poder renombrar).
+        """
+        return tempfile.TemporaryDirectory(dir=self.directorio, suffix=".tmp")
+
+    def _recorrer(self):
+        """
+        Devuelve las entradas [(mtime, tamaño, ruta)] y el tamaño de las escrituras en curso.
+        Borra los temporales abandonados.
+        """
+        entradas, en_curso = [], 0
+        ahora = time.time()
+        for carpeta, subcarpetas, nombres in os.walk(self.directorio):
+            for nombre in list(subcarpetas):
+                if nombre.startswith("."):
+                    subcarpetas.remove(nombre)
+                elif nombre.endswith(".tmp"):
+                    subcarpetas.remove(nombre)
+                    ruta = os.path.join(carpeta, nombre)
+                    try:
+                        if ahora - os.stat(ruta).st_mtime > _TMP_MAX_EDAD:
+                            shutil.rmtree(ruta, ignore_errors=True)
+                    except FileNotFoundError:
+                        pass
+            for nombre in nombres:
+                ruta = os.path.join(carpeta, nombre)
+                try:
+                    estado = os.stat(ruta)
+                except FileNotFoundError:
+                    continue
+                if not nombre.endswith(".tmp"):
+                    entradas.append((estado.st_mtime, estado.st_size, ruta))
+                elif ahora - estado.st_mtime > _TMP_MAX_EDAD:
+                    try:
+                        os.remove(ruta)
+                    except FileNotFoundError:
+                        pass
+                else:
+                    en_curso += estado.st_size
+        return entradas, en_curso
+
+    def expulsar(self, conservar=None):
+        """
+        Borra las entradas usadas hace más tiempo hasta que la caché ocupe menos de `max_mb`.
+        Las claves cuyo lock tiene otra petición (porque la está generando o leyendo) no se tocan.
+        """
+        entradas, en_curso = self._recorrer()
+        total = en_curso + sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, ruta in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            if ruta == conservar:
+                continue
+            key = os.path.splitext(os.path.basename(ruta))[0]
+            f = self._abrir_lock(key, bloquear=False)
+            if f is None:
+                continue
+            try:
+                os.remove(ruta)
+                os.remove(self._ruta_lock(key))
+                self.evictions += 1
+                total -= tamano
+            except FileNotFoundError:
+                pass
+            finally:
+                f.close()
+        self._limpiar_locks()
+
+    def _limpiar_locks(self):
+        # Los locks de claves que no llegaron a guardarse (descargas fallidas) se borran al cabo de un tiempo
+        ahora = time.time()
+        for nombre in os.listdir(os.path.join(self.directorio, ".locks")):
+            key = nombre[:-len(".lock")]
+            try:
+                if ahora - os.stat(self._ruta_lock(key)).st_mtime < _TMP_MAX_EDAD:
+                    continue
+            except FileNotFoundError:
+                continue
+            f = self._abrir_lock(key, bloquear=False)
+            if f is None:
+                continue
+            try:
+                os.remove(self._ruta_lock(key))
+            except FileNotFoundError:
+                pass
+            finally:
+                f.close()
+
+    def stats(self):
+        entradas, en_curso = self._recorrer()
+        total = self.hits + self.misses
+        return {
+            "directory": self.directorio,
+            "entries": len(entradas),
+            "size_mb": round(sum(tamano for _, tamano, _ in entradas) / (1024 * 1024), 1),
+            "in_progress_mb": round(en_curso / (1024 * 1024), 1),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "evictions": self.evictions,
+        }
+
+
+audio_cache = AudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB)
+
+
+def audio_cache_stats():
+    return audio_cache.stats()
@@ -1,13 +1,21 @@
 import os
 import re
+import logging
 import yt_dlp
-import whisper
 import subprocess
 from dotenv import load_dotenv
 from openai import OpenAI
-from app.utils.text_analysis import limpiar_y_contar, TextAnalyzer
-from app.utils.perfume_analysis import analyze_perfumes_from_transcription
-from app.utils.perfume_parameters import analyze_parameters_from_transcription
+from app.utils.summarizer import resumir_async
+from app.utils.executors import run_io, run_cpu, run_sync
+from app.utils.asr_engines import whisper_models, whisper_model_key, cargar_audio, get_engine
+from app.utils.audio_stream import descargar_pcm, guardar_pcm, leer_pcm
+from app.utils.audio_cache import audio_cache
+from app.utils.vad import VAD_ENABLED, aplicar_vad, restaurar_tiempos
+from app.utils.transcription_cache import (
+    YOUTUBE_TRANSCRIPT_SOURCE, get_transcription, get_first_transcription, save_transcription
+)
+
+logger = logging.getLogger(__name__)
 
 # Cargar variables de entorno
 load_dotenv()
@@ -16,67 +24,140 @@ if not OpenAI.api_key:
     raise ValueError("La clave de OpenAI no está configurada. Por favor, revisa el archivo .env.")
 
 
-def download_audio_yt_dlp(video_url):
+def warmup_whisper(model_sizes=None):
+    """
+    Precarga los modelos de Whisper indicados (por defecto los de WHISPER_WARMUP, separados por comas).
+    """
+    if model_sizes is None:
+        model_sizes = [m.strip() for m in os.getenv("WHISPER_WARMUP", "").split(",") if m.strip()]
+    claves = []
+    for model_size in model_sizes:
+        # Un tamaño mal escrito no debe impedir que arranque el worker
+        try:
+            claves.append(whisper_model_key(model_size))
+        except ValueError as e:
+            logger.error(f"[whisper] Se omite del warm-up: {e}")
+    whisper_models.warmup(claves)
+
+
+def download_audio_yt_dlp(video_url, cache_id=None):
     """
-    Descarga un audio de YouTube con yt-dlp y lo convierte en .wav
+    Descarga un audio de YouTube con yt-dlp, lo convierte en .wav y lo devuelve decodificado (float32 mono a 16 kHz).
+    El fichero queda en la caché de audio bajo (cache_id o URL, "wav") y se reutiliza en los siguientes análisis.
     """
+    def producir(destino):
+        # Se descarga en un directorio temporal de la caché y solo se conserva el .wav
+        with audio_cache.temporal() as output_dir:
+            ydl_opts = {
+                'format': 'bestaudio/best',
+                'postprocessors': [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'wav'}],
+                'outtmpl': os.path.join(output_dir, 'audio.%(ext)s'),
+            }
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                ydl.extract_info(video_url, download=True)
+            os.replace(os.path.join(output_dir, "audio.wav"), destino)
+
     try:
-        output_dir = "downloads"
-        os.makedirs(output_dir, exist_ok=True)
-
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'postprocessors': [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'wav'}],
-            'outtmpl': os.path.join(output_dir, '%(id)s.%(ext)s'),
-            'keepvideo': True
-        }
-
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            result = ydl.extract_info(video_url, download=True)
-            audio_path = os.path.join(output_dir, f"{result['id']}.wav")
-            return audio_path
+        # Se decodifica con la entrada fijada: fuera del bloque la expulsión podría borrarla
+        with audio_cache.get_or_create(cache_id or video_url, "wav", producir) as ruta:
+            return cargar_audio(ruta)
     except Exception as e:
         print(f"Error al descargar audio con yt-dlp: {e}")
         return None
 
 
-def download_hls_audio(video_url):
+def download_hls_audio(video_url, cache_id=None):
     """
-    Descarga y combina segmentos HLS en un archivo único .wav (flujo alternativo).
+    Descarga y combina segmentos HLS en un archivo único .wav (flujo alternativo) y lo devuelve decodificado.
+    El fichero queda en la caché de audio bajo (cache_id o URL, "wav").
     """
-    try:
-        output_dir = "downloads"
-        os.makedirs(output_dir, exist_ok=True)
-        output_audio = os.path.join(output_dir, "hls_output_audio.wav")
-
+    def producir(destino):
         subprocess.run([
-            "ffmpeg", "-y", "-i", video_url, "-acodec", "pcm_s16le", "-ac", "1", "-ar", "16000", output_audio
+            "ffmpeg", "-y", "-i", video_url, "-acodec", "pcm_s16le", "-ac", "1", "-ar", "16000", "-f", "wav", destino
         ], check=True)
-        return output_audio
+
+    try:
+        with audio_cache.get_or_create(cache_id or video_url, "wav", producir) as ruta:
+            return cargar_audio(ruta)
     except Exception as e:
         print(f"Error al descargar HLS: {e}")
         return None
 
 
-def transcribir_audio_whisper(audio_file):
+def descargar_audio_stream(source_url, cache_id=None):
+    """
+    Descarga el audio directamente como PCM float32 mono a 16 kHz (yt-dlp | ffmpeg), sin
+    ficheros intermedios. Si yt-dlp no puede con la URL, ffmpeg la lee directamente (HLS, audio directo).
+    El PCM se guarda en la caché de audio bajo (cache_id o URL, "pcm16k"), así que volver a analizar
+    el mismo video con otro motor o modelo no lo descarga de nuevo. Con AUDIO_CACHE_MAX_MB=0 se queda en memoria.
+    """
+    for directo in (False, True):
+        try:
+            if not audio_cache.max_bytes:
+                audio = descargar_pcm(source_url, directo=directo)
+            else:
+                with audio_cache.get_or_create(
+                    cache_id or source_url, "pcm16k", lambda destino: guardar_pcm(source_url, destino, directo)
+                ) as ruta:
+                    audio = leer_pcm(ruta)
+            if len(audio):
+                return audio
+        except Exception as e:
+            print(f"Error al descargar el audio en streaming ({'ffmpeg' if directo else 'yt-dlp'}): {e}")
+    return None
+
+
+def transcribir_con_vad(engine, audio, model_size=None):
+    """
+    Etapa de VAD + ASR: solo pasa al motor las regiones con voz (se omiten silencios, intros
+    musicales y planos sin voz) y devuelve {"text", "segments"} con las marcas de tiempo
+    referidas al audio original. Con VAD_ENABLED=0 transcribe el audio completo.
+    """
+    if not VAD_ENABLED:
+        return engine.transcribe(audio, model_size)
+
+    voz, mapa, omitida = aplicar_vad(audio)
+    logger.info(f"VAD: se omite el {omitida:.0%} del audio (silencio o música)")
+    if not len(voz):
+        return {"text": "", "segments": []}
+    result = engine.transcribe(voz, model_size)
+    result["segments"] = restaurar_tiempos(result["segments"], mapa)
+    return result
+
+
+def transcribir_audio(audio_file, model_size=None, asr_engine=None):
     """
-    Transcribe un archivo de audio usando Whisper.
+    Transcribe un archivo de audio (ruta o array float32 mono a 16 kHz ya decodificado)
+    con el motor de ASR indicado (por defecto ASR_ENGINE, Whisper), previo paso por el VAD.
+    Los modelos se obtienen del registro compartido de cada motor, así que solo se cargan la primera vez.
+    Los audios de más de LONG_AUDIO_MIN_SECONDS se transcriben por segmentos en paralelo.
+    Devuelve {"text", "segments"} con las marcas de tiempo del audio original, o None si falla o está vacía.
     """
     try:
-        print("Iniciando transcripción con Whisper...")
-        model = whisper.load_model("small", device="cpu")
-        result = model.transcribe(audio_file, language="es", task="transcribe")
-        if result and "text" in result and result["text"].strip():
-            print("Transcripción completada con Whisper.")
-            return result["text"]
+        engine = get_engine(asr_engine)
+        print(f"Iniciando transcripción con {engine.nombre}...")
+        audio = cargar_audio(audio_file) if isinstance(audio_file, (str, os.PathLike)) else audio_file
+        result = transcribir_con_vad(engine, audio, model_size)
+
+        if result and result["text"].strip():
+            print(f"Transcripción completada con {engine.nombre}.")
+            return result
         else:
-            print("La transcripción con Whisper está vacía.")
+            print(f"La transcripción con {engine.nombre} está vacía.")
             return None
     except Exception as e:
-        print(f"Error en la transcripción con Whisper: {e}")
+        print(f"Error en la transcripción con {asr_engine or 'el motor por defecto'}: {e}")
         return None
 
 
+def transcribir_audio_whisper(audio_file, model_size=None, asr_engine=None):
+    """
+    Como `transcribir_audio`, pero devuelve solo el texto (o None).
+    """
+    result = transcribir_audio(audio_file, model_size, asr_engine)
+    return result["text"] if result else None
+
+
 def puntuar_texto_en_espanol(texto):
     """
     Corrige un poco la puntuación de un texto en español.
@@ -96,111 +177,155 @@ def generar_resumen(texto):
     """
     Genera un resumen con OpenAI GPT a partir de un texto largo.
     """
+    return run_sync(generar_resumen_async(texto))
+
+
+async def generar_resumen_async(texto):
+    """
+    Genera un resumen con OpenAI GPT. Los textos largos se resumen por fragmentos
+    en paralelo y luego se combinan (ver `summarizer.resumir_async`).
+    """
     try:
-        client = OpenAI()
-        prompt = f"Resume el siguiente texto en español manteniendo las ideas clave:\n\n{texto}"
-
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Eres un asistente que proporciona resúmenes de textos."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=512,
-            temperature=0.7
-        )
-
-        resumen = response.choices[0].message.content
-        return resumen.strip()
+        return await resumir_async(texto)
     except Exception as e:
         print(f"Error al generar el resumen: {e}")
         return None
 
 
-def procesar_video(video_url):
+def extraer_video_id(video_url):
     """
-    Flujo de procesamiento específico para un video de YouTube.
-    - Intenta usar la API de YouTubeTranscriptApi.
-    - Si falla, descarga el audio y transcribe con Whisper.
-    - Genera resumen, wordcount y análisis de perfumes y parámetros.
+    Extrae el ID de un video de YouTube a partir de su URL (watch?v=<ID>&...).
+    """
+    return video_url.split("watch?v=")[-1].split("&")[0]
+
+
+def obtener_transcripcion_youtube(video_id):
+    """
+    Obtiene los subtítulos en español con YouTubeTranscriptApi, usando la caché de transcripciones.
     """
     from youtube_transcript_api import YouTubeTranscriptApi
 
-    try:
-        analyzer = TextAnalyzer()
+    transcription = get_transcription(video_id, YOUTUBE_TRANSCRIPT_SOURCE)
+    if transcription:
+        return transcription
 
-        # 1. Intentar transcripción con YouTubeTranscriptApi
-        video_id = video_url.split("watch?v=")[-1]
-        transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=['es'])
-        transcription = " ".join([item['text'] for item in transcript])
+    transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=['es'])
+    transcription = " ".join([item['text'] for item in transcript])
+    save_transcription(video_id, YOUTUBE_TRANSCRIPT_SOURCE, transcription)
+    return transcription
 
-        # 2. Si no hay transcripción, descargar con yt-dlp
-        if not transcription:
-            audio_file = download_audio_yt_dlp(video_url)
-            if not audio_file:
-                audio_file = download_hls_audio(video_url)
-            if audio_file:
-                transcription = transcribir_audio_whisper(audio_file)
-            else:
-                return None
-
-        # 3. Puntuación y resumen
-        puntuado_texto = puntuar_texto_en_espanol(transcription)
-        resumen = generar_resumen(puntuado_texto)
-
-        # 4. Análisis de perfumes y parámetros
-        perfume_analysis = analyze_perfumes_from_transcription(transcription)
-        parameter_analysis = analyze_parameters_from_transcription(transcription)
-        detected_brands = analyzer.find_brands_in_transcription(transcription)
-
-        return {
-            "transcription": transcription,
-            "punctuated_text": puntuado_texto,
-            "summary": resumen,
-            "brands": detected_brands,
-            "perfume_analysis": perfume_analysis,
-            "parameter_analysis": parameter_analysis
-        }
-    except Exception as e:
-        print(f"Error en procesar_video con YouTubeTranscriptApi: {str(e)}")
-        return _procesar_audio_generico(video_url)
+
+async def transcribir_fuente_audio_async(source_url, cache_id, whisper_model=None, asr_engine=None):
+    """
+    Descarga el audio (yt-dlp/HLS) como PCM a 16 kHz en memoria y lo transcribe con el motor de ASR indicado.
+    El resultado se guarda en la caché bajo (cache_id, <motor>:<modelo>).
+    La descarga va al pool de IO y el ASR al pool de CPU, sin bloquear el event loop.
+    """
+    source = get_engine(asr_engine).source(whisper_model)
+    transcription = get_transcription(cache_id, source)
+    if transcription:
+        return transcription
+
+    print("Intentando descarga de audio en streaming (yt-dlp/HLS)...")
+    audio = await run_io(descargar_audio_stream, source_url, cache_id)
+
+    if audio is None:
+        print("No se pudo procesar el audio. Finalizando flujo.")
+        return None
+
+    transcription = await run_cpu(transcribir_audio_whisper, audio, whisper_model, asr_engine)
+    save_transcription(cache_id, source, transcription)
+    return transcription
 
 
-def _procesar_audio_generico(source_url):
+async def obtener_transcripcion_async(video_url, whisper_model=None, asr_engine=None):
     """
-    Fallback para cuando no se obtenga transcripción de YouTubeTranscriptApi.
-    Descarga y transcribe con Whisper.
+    Devuelve la transcripción de un video de YouTube.
+    - Si ya está en la caché (subtítulos o ASR), no hace ninguna llamada de red ni ASR.
+    - Intenta usar la API de YouTubeTranscriptApi.
+    - Si falla, descarga el audio y transcribe con el motor de ASR (`asr_engine` o ASR_ENGINE).
     """
+    video_id = extraer_video_id(video_url)
+    transcription = get_first_transcription(
+        video_id, [YOUTUBE_TRANSCRIPT_SOURCE, get_engine(asr_engine).source(whisper_model)]
+    )
+    if transcription:
+        return transcription
+
     try:
-        analyzer = TextAnalyzer()
+        transcription = await run_io(obtener_transcripcion_youtube, video_id)
+    except Exception as e:
+        print(f"Error al obtener la transcripción con YouTubeTranscriptApi: {str(e)}")
+        transcription = None
 
-        print("Intentando descarga de audio (yt-dlp/HLS) como fallback...")
-        audio_file = download_audio_yt_dlp(source_url)
-        if not audio_file:
-            audio_file = download_hls_audio(source_url)
+    if not transcription:
+        transcription = await transcribir_fuente_audio_async(video_url, video_id, whisper_model, asr_engine)
+    return transcription
 
-        if not audio_file:
-            print("No se pudo procesar el audio. Finalizando flujo.")
-            return None
 
-        transcription = transcribir_audio_whisper(audio_file)
+def transcribir_fuente_audio(source_url, cache_id, whisper_model=None, asr_engine=None):
+    """
+    Versión síncrona de `transcribir_fuente_audio_async`.
+    """
+    return run_sync(transcribir_fuente_audio_async(source_url, cache_id, whisper_model, asr_engine))
+
+
+def obtener_transcripcion(video_url, whisper_model=None, asr_engine=None):
+    """
+    Versión síncrona de `obtener_transcripcion_async`.
+    """
+    return run_sync(obtener_transcripcion_async(video_url, whisper_model, asr_engine))
+
+
+def _analizar_transcripcion(transcription):
+    """
+    Ejecuta todas las etapas del pipeline y devuelve el resultado con las claves históricas.
+    """
+    from app.utils.video_pipeline import ejecutar_etapas
+
+    artefactos = ejecutar_etapas(
+        transcription, ["punctuated_text", "summary", "brands", "wordcount", "perfumes", "parameters"]
+    )
+    return {
+        "transcription": transcription,
+        "punctuated_text": artefactos["punctuated_text"],
+        "summary": artefactos["summary"],
+        "brands": artefactos["brands"],
+        "wordcount": artefactos["wordcount"],
+        "perfume_analysis": artefactos["perfumes"],
+        "parameter_analysis": artefactos["parameters"]
+    }
+
+
+def procesar_video(video_url, whisper_model=None, asr_engine=None):
+    """
+    Flujo de procesamiento específico para un video de YouTube.
+    - Obtiene la transcripción (caché, YouTubeTranscriptApi o ASR).
+    - Genera resumen, wordcount y análisis de perfumes y parámetros.
+    `whisper_model` y `asr_engine` permiten elegir el modelo y el motor de ASR para esta petición.
+    Los endpoints que solo necesitan algunos artefactos deben usar
+    `video_pipeline.ejecutar_pipeline` en su lugar.
+    """
+    try:
+        transcription = obtener_transcripcion(video_url, whisper_model, asr_engine)
         if not transcription:
             return None
+        return _analizar_transcripcion(transcription)
+    except Exception as e:
+        print(f"Error en procesar_video: {str(e)}")
+        return None
 
-        puntuado_texto = puntuar_texto_en_espanol(transcription)
-        resumen = generar_resumen(puntuado_texto)
-        perfume_analysis = analyze_perfumes_from_transcription(transcription)
-        parameter_analysis = analyze_parameters_from_transcription(transcription)
-        detected_brands = analyzer.find_brands_in_transcription(transcription)
-
-        return {
-            "transcription": transcription,
-            "punctuated_text": puntuado_texto,
-            "summary": resumen,
-            "brands": detected_brands,
-            "perfume_analysis": perfume_analysis,
-            "parameter_analysis": parameter_analysis
-        }
+
+def _procesar_audio_generico(source_url, whisper_model=None, asr_engine=None):
+    """
+    Flujo para fuentes de audio que no son videos de YouTube (podcasts, HLS...).
+    Descarga y transcribe con el motor de ASR indicado.
+    """
+    try:
+        transcription = transcribir_fuente_audio(source_url, source_url, whisper_model, asr_engine)
+        if not transcription:
+            return None
+        return _analizar_transcripcion(transcription)
     except Exception as e:
         print(f"Error en _procesar_audio_generico: {e}")
         return None
@@ -0,0 +1,108 @@
+import sys
+import tempfile
+import subprocess
+import numpy as np
+from app.utils.long_audio import SAMPLE_RATE
+
+# Tamaño de cada lectura del pipe de ffmpeg (1 s de PCM de 16 bits mono a 16 kHz)
+PCM_CHUNK_BYTES = 2 * SAMPLE_RATE
+
+
+def _comando_ytdlp(url):
+    # "-o -" escribe el stream al stdout: yt-dlp no deja ficheros .part ni el vídeo original
+    return [
+        sys.executable, "-m", "yt_dlp", "--quiet", "--no-warnings", "--no-playlist",
+        "-f", "bestaudio/best", "-o", "-", url,
+    ]
+
+
+def _comando_ffmpeg(entrada):
+    return [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-i", entrada,
+        "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1",
+    ]
+
+
+def _error(nombre, stderr):
+    stderr.seek(0)
+    lineas = stderr.read().decode("utf-8", "replace").strip().splitlines()
+    return f"{nombre} terminó con error: {lineas[-1] if lineas else 'sin detalles'}"
+
+
+def iter_pcm(source_url, directo=False, chunk_bytes=PCM_CHUNK_BYTES):
+    """
+    Genera el audio de `source_url` en bloques de PCM de 16 bits mono a 16 kHz sin ficheros
+    intermedios: yt-dlp escribe el stream en un pipe que ffmpeg decodifica y remuestrea al vuelo.
+    Con `directo`, ffmpeg lee la URL él mismo (HLS, ficheros de audio).
+    Lanza RuntimeError si yt-dlp o ffmpeg terminan con error.
+    """
+    procesos = []
+    # stderr va a ficheros temporales (pequeños) para no bloquear los procesos si se llena un pipe
+    with tempfile.TemporaryFile() as err_ytdlp, tempfile.TemporaryFile() as err_ffmpeg:
+        try:
+            if directo:
+                entrada = subprocess.DEVNULL
+            else:
+                ytdlp = subprocess.Popen(_comando_ytdlp(source_url), stdout=subprocess.PIPE, stderr=err_ytdlp)
+                procesos.append(("yt-dlp", ytdlp, err_ytdlp))
+                entrada = ytdlp.stdout
+            ffmpeg = subprocess.Popen(
+                _comando_ffmpeg(source_url if directo else "pipe:0"),
+                stdin=entrada, stdout=subprocess.PIPE, stderr=err_ffmpeg,
+            )
+            procesos.append(("ffmpeg", ffmpeg, err_ffmpeg))
+            if not directo:
+                ytdlp.stdout.close()  # ffmpeg es el único lector: si termina, yt-dlp recibe SIGPIPE
+
+            while True:
+                bloque = ffmpeg.stdout.read(chunk_bytes)
+                if not bloque:
+                    break
+                yield bloque
+
+            for nombre, proceso, stderr in procesos:
+                if proceso.wait() != 0:
+                    raise RuntimeError(_error(nombre, stderr))
+        finally:
+            # Si el consumidor abandona el generador (o hay un error), no se dejan procesos vivos
+            for _, proceso, _ in procesos:
+                if proceso.poll() is None:
+                    proceso.kill()
+                proceso.wait()
+                if proceso.stdout:
+                    proceso.stdout.close()
+
+
+def pcm_a_float32(pcm):
+    """
+    Convierte PCM de 16 bits little-endian (bytes) a float32 en [-1, 1].
+    """
+    vista = memoryview(pcm)[:len(pcm) - len(pcm) % 2]
+    return np.frombuffer(vista, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def descargar_pcm(source_url, directo=False):
+    """
+    Descarga el audio como array float32 mono a 16 kHz, el formato que reciben los motores de ASR.
+    El PCM se acumula en memoria (~115 MB por hora de audio) sin escribir nada en disco.
+    """
+    buffer = bytearray()
+    for bloque in iter_pcm(source_url, directo):
+        buffer += bloque
+    return pcm_a_float32(buffer)
+
+
+def guardar_pcm(source_url, destino, directo=False):
+    """
+    Escribe en `destino` el PCM de 16 bits mono a 16 kHz del audio a medida que llega.
+    """
+    with open(destino, "wb") as f:
+        for bloque in iter_pcm(source_url, directo):
+            f.write(bloque)
+
+
+def leer_pcm(ruta):
+    """
+    Lee un fichero de PCM de 16 bits mono como array float32 en [-1, 1].
+    """
+    return np.fromfile(ruta, dtype="<i2").astype(np.float32) / 32768.0
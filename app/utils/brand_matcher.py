@@ -0,0 +1,148 @@
+import unicodedata
+from collections import deque
+
+# Variantes tipográficas que Whisper y los subtítulos automáticos usan indistintamente
+_EQUIVALENCIAS = {"’": "'", "‘": "'", "´": "'", "`": "'", "＆": "&"}
+
+
+class _TablaPlegado(dict):
+    """
+    Tabla para str.translate que calcula y memoriza el plegado de cada carácter la primera vez.
+    """
+
+    def __missing__(self, codigo):
+        caracter = chr(codigo)
+        if caracter.isspace():
+            plegado = " "
+        else:
+            equivalente = _EQUIVALENCIAS.get(caracter, caracter)
+            plegado = "".join(
+                c for c in unicodedata.normalize("NFKD", equivalente.casefold()) if not unicodedata.combining(c)
+            )
+        self[codigo] = plegado
+        return plegado
+
+
+_tabla = _TablaPlegado()
+
+
+def plegar(texto):
+    """
+    Normaliza un texto para comparar marcas: minúsculas, sin acentos ("È" -> "e", "ß" -> "ss")
+    y espacios colapsados. Devuelve el texto plegado y, para cada carácter plegado, su posición
+    en el texto original (None si coinciden, que es el caso habitual).
+    """
+    plegado = texto.translate(_tabla)
+    if len(plegado) == len(texto) and "  " not in plegado and not plegado.startswith(" "):
+        return plegado, None
+
+    # Algún carácter se ha expandido o eliminado, o hay espacios repetidos: recorrido carácter a carácter
+    partes, posiciones = [], []
+    anterior_espacio = True
+    for indice, caracter in enumerate(texto):
+        plegado = _tabla[ord(caracter)]
+        if plegado == " ":
+            if anterior_espacio:
+                continue
+            anterior_espacio = True
+        elif plegado:
+            anterior_espacio = False
+        partes.append(plegado)
+        posiciones.extend([indice] * len(plegado))
+    return "".join(partes), posiciones
+
+
+def _es_palabra(caracter):
+    return caracter.isalnum()
+
+
+class BrandMatcher:
+    """
+    Autómata de Aho-Corasick sobre un diccionario de marcas normalizado: encuentra todas
+    las marcas en una sola pasada por el texto, respetando los límites de palabra
+    ("Dior" no coincide dentro de "Diorama").
+    """
+
+    def __init__(self, brands):
+        # Cada entrada es una marca o un par (alias, valor canónico).
+        # Deduplicar por forma plegada; se conserva la primera grafía ("Hermès" frente a "hermes")
+        self.canonicas = {}
+        for brand in brands:
+            alias, canonica = brand if isinstance(brand, tuple) else (brand, brand)
+            patron = plegar(alias)[0].strip()
+            if patron and patron not in self.canonicas:
+                self.canonicas[patron] = canonica
+        self.patrones = list(self.canonicas)
+
+        self._goto = [{}]
+        self._fallo = [0]
+        self._salida = [()]
+        for indice, patron in enumerate(self.patrones):
+            estado = 0
+            for caracter in patron:
+                siguiente = self._goto[estado].get(caracter)
+                if siguiente is None:
+                    siguiente = len(self._goto)
+                    self._goto[estado][caracter] = siguiente
+                    self._goto.append({})
+                    self._fallo.append(0)
+                    self._salida.append(())
+                estado = siguiente
+            self._salida[estado] = self._salida[estado] + (indice,)
+        self._construir_fallos()
+
+    def _construir_fallos(self):
+        cola = deque(self._goto[0].values())
+        while cola:
+            estado = cola.popleft()
+            for caracter, siguiente in self._goto[estado].items():
+                cola.append(siguiente)
+                fallo = self._fallo[estado]
+                while fallo and caracter not in self._goto[fallo]:
+                    fallo = self._fallo[fallo]
+                self._fallo[siguiente] = self._goto[fallo].get(caracter, 0)
+                self._salida[siguiente] = self._salida[siguiente] + self._salida[self._fallo[siguiente]]
+
+    def __len__(self):
+        return len(self.patrones)
+
+    def iter_matches(self, texto):
+        """
+        Genera (marca, inicio, fin) por cada aparición, con posiciones en el texto original.
+        """
+        plegado, posiciones = plegar(texto)
+        goto, fallo, salida, patrones = self._goto, self._fallo, self._salida, self.patrones
+        longitud = len(plegado)
+        estado = 0
+        for fin, caracter in enumerate(plegado):
+            while estado and caracter not in goto[estado]:
+                estado = fallo[estado]
+            estado = goto[estado].get(caracter, 0)
+            for indice in salida[estado]:
+                inicio = fin - len(patrones[indice]) + 1
+                if inicio > 0 and _es_palabra(plegado[inicio - 1]):
+                    continue
+                if fin + 1 < longitud and _es_palabra(plegado[fin + 1]):
+                    continue
+                if posiciones is None:
+                    yield self.canonicas[patrones[indice]], inicio, fin + 1
+                else:
+                    yield self.canonicas[patrones[indice]], posiciones[inicio], posiciones[fin] + 1
+
+    def find(self, texto):
+        """
+        Devuelve {marca: {"count": n, "offsets": [(inicio, fin), ...]}} en orden de primera aparición.
+        Si dos marcas se solapan ("Tom Ford" y "Ford") se cuenta solo la más larga.
+        """
+        coincidencias = sorted(self.iter_matches(texto), key=lambda m: (m[1], -m[2]))
+        encontradas = {}
+        limite = 0
+        for brand, inicio, fin in coincidencias:
+            if inicio < limite:
+                continue
+            limite = fin
+            entrada = encontradas.setdefault(brand, {"count": 0, "offsets": []})
+            entrada["count"] += 1
+            entrada["offsets"].append((inicio, fin))
+        return encontradas
+
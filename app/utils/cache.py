@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_NO_ENCONTRADO = object()
+
+
+def cache_key(*partes):
+    """
+    Genera una clave direccionada por contenido (sha256) a partir de varias partes.
+    """
+    return hashlib.sha256("\x1f".join(str(p) for p in partes).encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Caché en memoria con expulsión LRU, segura entre hilos y con contadores de aciertos y fallos.
+    Con `ttl` (segundos), las entradas caducan y cuentan como fallo.
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._caducidades = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            valor = self._datos.get(key, _NO_ENCONTRADO)
+            if valor is not _NO_ENCONTRADO and self.ttl and self._caducidades[key] < time.monotonic():
+                del self._datos[key]
+                del self._caducidades[key]
+                valor = _NO_ENCONTRADO
+            if valor is _NO_ENCONTRADO:
+                self.misses += 1
+                return default
+            self._datos.move_to_end(key)
+            self.hits += 1
+            return valor
+
+    def set(self, key, value):
+        with self._lock:
+            self._datos[key] = value
+            self._datos.move_to_end(key)
+            if self.ttl:
+                self._caducidades[key] = time.monotonic() + self.ttl
+            while self.maxsize and len(self._datos) > self.maxsize:
+                antigua, _ = self._datos.popitem(last=False)
+                self._caducidades.pop(antigua, None)
+
+    def delete(self, key):
+        with self._lock:
+            self._datos.pop(key, None)
+            self._caducidades.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+            self._caducidades.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._datos
+
+    def __len__(self):
+        return len(self._datos)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._datos),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+
+class DiskCache:
+    """
+    Caché persistente en disco: un fichero JSON por clave, escrito de forma atómica.
+    Con `ttl` (segundos), las entradas más antiguas cuentan como fallo.
+    """
+
+    def __init__(self, directorio, ttl=None):
+        self.directorio = directorio
+        self.ttl = ttl
+        os.makedirs(directorio, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _ruta(self, key):
+        return os.path.join(self.directorio, key[:2], f"{key}.json")
+
+    def get(self, key, default=None):
+        try:
+            with open(self._ruta(key), encoding="utf-8") as f:
+                entrada = json.load(f)
+            if self.ttl and entrada.get("created_at", 0) + self.ttl < time.time():
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entrada["value"]
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Entrada de caché corrupta {key}: {e}")
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        ruta = self._ruta(key)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"value": value, "created_at": time.time()}, f, ensure_ascii=False)
+            os.replace(tmp, ruta)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def delete(self, key):
+        try:
+            os.remove(self._ruta(key))
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "directory": self.directorio,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+
+class TieredCache:
+    """
+    Caché de dos niveles: LRU en memoria delante de un nivel persistente opcional.
+    Los aciertos del nivel persistente se promocionan a memoria.
+    """
+
+    def __init__(self, memoria, persistente=None):
+        self.memoria = memoria
+        self.persistente = persistente
+
+    def get(self, key, default=None):
+        valor = self.memoria.get(key, _NO_ENCONTRADO)
+        if valor is not _NO_ENCONTRADO:
+            return valor
+        if self.persistente is not None:
+            valor = self.persistente.get(key, _NO_ENCONTRADO)
+            if valor is not _NO_ENCONTRADO:
+                self.memoria.set(key, valor)
+                return valor
+        return default
+
+    def set(self, key, value):
+        self.memoria.set(key, value)
+        if self.persistente is not None:
+            try:
+                self.persistente.set(key, value)
+            except Exception as e:
+                logger.error(f"Error al escribir en la caché persistente: {e}")
+
+    def delete(self, key):
+        self.memoria.delete(key)
+        if self.persistente is not None:
+            self.persistente.delete(key)
+
+    def stats(self):
+        return {
+            "memory": self.memoria.stats(),
+            "persistent": self.persistente.stats() if self.persistente is not None else None,
+        }
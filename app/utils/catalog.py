@@ -0,0 +1,190 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from types import MappingProxyType
+from app.utils.brand_matcher import BrandMatcher, plegar
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PATH = os.getenv(
+    "CATALOG_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "catalog.json")
+)
+# Cada cuántos segundos se comprueba si el fichero del catálogo ha cambiado (0 = nunca)
+CATALOG_RELOAD_INTERVAL = float(os.getenv("CATALOG_RELOAD_INTERVAL", "30"))
+
+
+def _clave(texto):
+    return plegar(texto)[0].strip()
+
+
+def _variantes(nombre):
+    """
+    Variantes de escritura habituales en transcripciones: "&" dicho como "y"/"and",
+    apóstrofos y guiones omitidos, "No.9" como "no 9".
+    """
+    variantes = {nombre}
+    if "&" in nombre:
+        variantes |= {nombre.replace("&", "y"), nombre.replace("&", "and"), nombre.replace("&", " ")}
+    for variante in list(variantes):
+        if "'" in variante or "’" in variante:
+            variantes |= {re.sub(r"['’]", "", variante), re.sub(r"['’]", " ", variante)}
+        if "-" in variante:
+            variantes.add(variante.replace("-", " "))
+        if re.search(r"n[º°o]\.?\s*\d", variante, re.IGNORECASE):
+            variantes.add(re.sub(r"n[º°o]\.?\s*(\d)", r"no \1", variante, flags=re.IGNORECASE))
+    return variantes
+
+
+class Catalog:
+    """
+    Catálogo inmutable de marcas y perfumes con sus alias y errores de transcripción habituales.
+    Se construye una vez por versión del fichero y se comparte entre peticiones e hilos:
+    las búsquedas por nombre son O(1) (diccionario por forma normalizada) y la detección
+    de menciones en un texto es una sola pasada de Aho-Corasick, sea cual sea el tamaño del catálogo.
+    """
+
+    def __init__(self, datos, fingerprint=None):
+        self.version = datos.get("version")
+        self.fingerprint = fingerprint
+        self.brand_names = tuple(marca["name"] for marca in datos.get("brands", []))
+
+        marcas = {}
+        alias_marca = {}
+        for marca in datos.get("brands", []):
+            alias_marca[marca["name"]] = [marca["name"], *marca.get("aliases", [])]
+            for alias in alias_marca[marca["name"]]:
+                for variante in _variantes(alias):
+                    marcas.setdefault(_clave(variante), marca["name"])
+
+        perfumes = {}
+        patrones_perfume = []
+        registros = []
+        for perfume in datos.get("perfumes", []):
+            registro = MappingProxyType({"name": perfume["name"], "brand": perfume.get("brand")})
+            registros.append(registro)
+            identificador = (registro["brand"], registro["name"])
+            nombres = [registro["name"], *perfume.get("aliases", [])]
+            # Los nombres que son palabras comunes ("Libre", "Y", "1 millón") solo cuentan junto a la marca,
+            # también en sus alias
+            alias = [] if perfume.get("requires_brand") else list(nombres)
+            for marca in alias_marca.get(registro["brand"], [registro["brand"]] if registro["brand"] else []):
+                for nombre in nombres:
+                    alias += [f"{marca} {nombre}", f"{nombre} de {marca}"]
+            for nombre in alias:
+                for variante in _variantes(nombre):
+                    perfumes.setdefault(_clave(variante), registro)
+                    patrones_perfume.append((variante, identificador))
+
+        self.perfumes = tuple(registros)
+        self._marcas = MappingProxyType(marcas)
+        self._perfumes = MappingProxyType(perfumes)
+        self._brand_matcher = BrandMatcher(tuple(marcas.items()))
+        self._perfume_matcher = BrandMatcher(patrones_perfume)
+
+    @classmethod
+    def from_file(cls, ruta):
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+        return cls(json.loads(contenido), fingerprint=hashlib.sha256(contenido).hexdigest()[:16])
+
+    def lookup_brand(self, nombre):
+        """
+        Devuelve el nombre canónico de una marca a partir de cualquiera de sus alias, o None.
+        """
+        return self._marcas.get(_clave(nombre))
+
+    def lookup_perfume(self, nombre):
+        """
+        Devuelve {"name", "brand"} de un perfume a partir de su nombre o alias, o None.
+        """
+        return self._perfumes.get(_clave(nombre))
+
+    def find_brands(self, texto):
+        """
+        Devuelve {marca canónica: {"count": n, "offsets": [(inicio, fin), ...]}} de las marcas mencionadas.
+        """
+        return self._brand_matcher.find(texto)
+
+    def find_perfumes(self, texto):
+        """
+        Devuelve los perfumes mencionados: [{"name", "brand", "count", "offsets"}, ...].
+        """
+        return [
+            {"name": nombre, "brand": marca, **menciones}
+            for (marca, nombre), menciones in self._perfume_matcher.find(texto).items()
+        ]
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "brands": len(self.brand_names),
+            "perfumes": len(self.perfumes),
+            "brand_patterns": len(self._brand_matcher),
+            "perfume_patterns": len(self._perfume_matcher),
+        }
+
+
+# El catálogo activo se sustituye entero al recargar (asignación atómica): las peticiones
+# en curso siguen usando la versión que ya tenían
+_catalogo = None
+_mtime = None
+_ultima_comprobacion = 0.0
+_lock = threading.Lock()
+# Se toma sin esperar antes de lanzar el hilo de recarga: así nunca hay dos recargas en segundo plano
+_recarga_en_curso = threading.Lock()
+
+
+def reload_catalog(force=False):
+    """
+    Vuelve a cargar el catálogo si el fichero ha cambiado (o siempre, con `force`).
+    Si el fichero nuevo no es válido se mantiene el catálogo anterior.
+    """
+    global _catalogo, _mtime, _ultima_comprobacion
+    with _lock:
+        if not force and _catalogo is not None and time.monotonic() - _ultima_comprobacion < CATALOG_RELOAD_INTERVAL:
+            return _catalogo  # Otro hilo acaba de comprobarlo
+        _ultima_comprobacion = time.monotonic()
+        try:
+            mtime = os.stat(CATALOG_PATH).st_mtime_ns
+            if not force and _catalogo is not None and mtime == _mtime:
+                return _catalogo
+            inicio = time.perf_counter()
+            nuevo = Catalog.from_file(CATALOG_PATH)
+        except Exception as e:
+            if _catalogo is None:
+                raise
+            logger.error(f"Error al recargar el catálogo, se mantiene la versión {_catalogo.fingerprint}: {e}")
+            return _catalogo
+        _catalogo, _mtime = nuevo, mtime
+        logger.info(
+            f"Catálogo cargado ({nuevo.fingerprint}): {len(nuevo.brand_names)} marcas, "
+            f"{len(nuevo.perfumes)} perfumes en {time.perf_counter() - inicio:.2f}s"
+        )
+        return nuevo
+
+
+def _recargar_en_segundo_plano():
+    try:
+        reload_catalog()
+    finally:
+        _recarga_en_curso.release()
+
+
+def get_catalog():
+    """
+    Devuelve el catálogo activo, cargándolo la primera vez y comprobando como mucho
+    cada CATALOG_RELOAD_INTERVAL segundos si el fichero ha cambiado.
+    """
+    catalogo = _catalogo
+    if catalogo is None:
+        return reload_catalog()
+    if CATALOG_RELOAD_INTERVAL and time.monotonic() - _ultima_comprobacion >= CATALOG_RELOAD_INTERVAL:
+        # La recarga se hace en segundo plano; mientras tanto se sigue usando la versión actual
+        if _recarga_en_curso.acquire(blocking=False):
+            threading.Thread(target=_recargar_en_segundo_plano, name="catalog-reload", daemon=True).start()
+    return catalogo
@@ -0,0 +1,75 @@
+import os
+import asyncio
+import logging
+import functools
+import concurrent.futures
+
+logger = logging.getLogger(__name__)
+
+# Pools acotados para el trabajo bloqueante que no tiene versión asíncrona:
+# - IO: yt-dlp, ffmpeg, YouTubeTranscriptApi, psycopg2...
+# - CPU: Whisper y BERT. Son hilos (no procesos) para compartir los modelos ya cargados;
+#   torch libera el GIL durante la inferencia.
+IO_WORKERS = int(os.getenv("IO_WORKERS", "16"))
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+_io_executor = concurrent.futures.ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+_cpu_executor = concurrent.futures.ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+
+# Corrutinas que liberan los recursos atados al event loop actual (clientes HTTP con su pool de
+# conexiones). run_sync crea un loop por llamada y las ejecuta antes de cerrarlo.
+_cierres_de_loop = []
+
+
+def al_cerrar_loop(cierre):
+    """
+    Registra la corrutina `cierre()` para que run_sync la ejecute al terminar cada loop que crea.
+    """
+    _cierres_de_loop.append(cierre)
+    return cierre
+
+
+async def _con_cierre(corrutina):
+    try:
+        return await corrutina
+    finally:
+        for cierre in _cierres_de_loop:
+            try:
+                await cierre()
+            except Exception as e:
+                logger.warning(f"Error al liberar los recursos del event loop ({cierre.__module__}): {e}")
+
+
+async def run_io(func, *args, **kwargs):
+    """
+    Ejecuta una función bloqueante de E/S en el pool de IO sin bloquear el event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_cpu(func, *args, **kwargs):
+    """
+    Ejecuta una función intensiva en CPU en el pool de CPU sin bloquear el event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_cpu_executor, functools.partial(func, *args, **kwargs))
+
+
+def run_sync(corrutina):
+    """
+    Ejecuta una corrutina desde código síncrono. Si ya hay un event loop en este hilo
+    (p. ej. dentro de un handler de FastAPI), la ejecuta en un hilo auxiliar.
+    Los clientes creados para el loop temporal se cierran antes de cerrarlo (ver `al_cerrar_loop`).
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_con_cierre(corrutina))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, _con_cierre(corrutina)).result()
+
+
+def shutdown_executors():
+    _io_executor.shutdown(wait=False, cancel_futures=True)
+    _cpu_executor.shutdown(wait=False, cancel_futures=True)
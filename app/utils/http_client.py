@@ -0,0 +1,130 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import weakref
+import email.utils
+import httpx
+from app.utils.executors import al_cerrar_loop
+
+logger = logging.getLogger(__name__)
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+# Motivos 403 de la API de YouTube que son límites de ritmo (se recuperan esperando).
+# "quotaExceeded" es la cuota diaria: reintentar solo la consumiría más.
+MOTIVOS_REINTENTABLES = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+# Un cliente (con su pool de conexiones keep-alive) y sus semáforos por host por event loop
+_estados = weakref.WeakKeyDictionary()
+
+
+def _estado():
+    loop = asyncio.get_running_loop()
+    estado = _estados.get(loop)
+    if estado is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=60,
+            ),
+            follow_redirects=True,
+        )
+        estado = {"client": client, "hosts": {}}
+        _estados[loop] = estado
+    return estado
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Devuelve el cliente HTTP compartido del event loop actual.
+    """
+    return _estado()["client"]
+
+
+def _semaforo_host(host):
+    hosts = _estado()["hosts"]
+    if host not in hosts:
+        hosts[host] = asyncio.Semaphore(HTTP_MAX_PER_HOST)
+    return hosts[host]
+
+
+def _motivo_error(response):
+    try:
+        errores = response.json().get("error", {}).get("errors", [])
+        return errores[0].get("reason") if errores else None
+    except Exception:
+        return None
+
+
+def _es_reintentable(response):
+    if response.status_code in ESTADOS_REINTENTABLES:
+        return True
+    return response.status_code == 403 and _motivo_error(response) in MOTIVOS_REINTENTABLES
+
+
+def _espera(response, intento):
+    """
+    Segundos a esperar antes del siguiente intento: Retry-After si el servidor lo indica,
+    si no, backoff exponencial con jitter.
+    """
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), HTTP_BACKOFF_MAX)
+        except ValueError:
+            try:
+                fecha = email.utils.parsedate_to_datetime(retry_after)
+                return min(max(fecha.timestamp() - time.time(), 0), HTTP_BACKOFF_MAX)
+            except (TypeError, ValueError):
+                pass
+    return min(HTTP_BACKOFF_BASE * (2 ** intento), HTTP_BACKOFF_MAX) * (0.5 + random.random() / 2)
+
+
+async def request(method, url, max_retries=HTTP_MAX_RETRIES, **kwargs) -> httpx.Response:
+    """
+    Hace una petición con el cliente compartido, respetando el límite de concurrencia
+    por host y reintentando errores transitorios (429, 5xx, límites de ritmo y fallos de red).
+    Devuelve la última respuesta; los errores no reintentables se devuelven tal cual.
+    """
+    client = get_http_client()
+    semaforo = _semaforo_host(httpx.URL(url).host)
+
+    for intento in range(max_retries + 1):
+        response = None
+        try:
+            async with semaforo:
+                response = await client.request(method, url, **kwargs)
+            if not _es_reintentable(response) or intento == max_retries:
+                return response
+            logger.warning(f"HTTP {response.status_code} en {httpx.URL(url).host}, reintento {intento + 1}/{max_retries}")
+        except httpx.TransportError as e:
+            if intento == max_retries:
+                raise
+            logger.warning(f"Error de red en {httpx.URL(url).host} ({e}), reintento {intento + 1}/{max_retries}")
+        await asyncio.sleep(_espera(response, intento))
+
+
+async def get(url, **kwargs) -> httpx.Response:
+    return await request("GET", url, **kwargs)
+
+
+@al_cerrar_loop
+async def aclose():
+    """
+    Cierra el cliente compartido del event loop actual (al apagar la aplicación o al terminar run_sync).
+    """
+    loop = asyncio.get_running_loop()
+    estado = _estados.pop(loop, None)
+    if estado is not None:
+        await estado["client"].aclose()
@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import sqlite3
+import threading
+from app.utils.executors import run_io
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join("cache", "jobs.sqlite3"))
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "2"))
+JOBS_HEARTBEAT_INTERVAL = float(os.getenv("JOBS_HEARTBEAT_INTERVAL", "30"))
+# Un trabajo "running" sin latido durante este tiempo se considera huérfano y se reencola
+JOBS_STALE_SECONDS = float(os.getenv("JOBS_STALE_SECONDS", "300"))
+# Los trabajos terminados se borran pasado este tiempo (0 = se conservan siempre)
+JOBS_TTL_SECONDS = float(os.getenv("JOBS_TTL_SECONDS", str(7 * 24 * 3600)))
+JOBS_PURGE_INTERVAL = float(os.getenv("JOBS_PURGE_INTERVAL", "3600"))
+
+ESTADOS_ACTIVOS = ("queued", "running")
+ESTADOS_FINALES = ("done", "failed")
+
+
+async def _esperar_evento(evento, timeout):
+    """
+    Espera a que se active `evento` o pasen `timeout` segundos.
+    En Python < 3.12, asyncio.wait_for se traga la cancelación si el evento se activa a la vez,
+    y el worker seguiría vivo después de stop(); asyncio.wait siempre la propaga.
+    """
+    espera = asyncio.ensure_future(evento.wait())
+    try:
+        await asyncio.wait([espera], timeout=timeout)
+    finally:
+        espera.cancel()
+
+
+class JobQueue:
+    """
+    Cola de trabajos persistida en SQLite.
+
+    Varios workers (y varios procesos de uvicorn) comparten la misma base de datos:
+    cada trabajo se reclama de forma atómica, y los trabajos idénticos en curso
+    (misma `dedup_key`) se deduplican al enviarlos.
+    Los métodos síncronos acceden a SQLite; desde el event loop se llaman con `run_io`.
+    """
+
+    def __init__(self, db_path=JOBS_DB_PATH, workers=JOBS_WORKERS):
+        self.db_path = db_path
+        self.workers = workers
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._tareas = []
+        self._loop = None
+        self._nuevo_trabajo = None
+        # Evento de cambios por trabajo observado y cuántos `watch` lo comparten: el último en salir lo borra
+        self._cambios = {}
+        self._observadores = {}
+
+    # --- Base de datos ---
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    dedup_key TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, status)")
+        return self._conn
+
+    def _transaccion(self, funcion):
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                resultado = funcion(conn)
+                conn.execute("COMMIT")
+                return resultado
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _avisar(self, evento):
+        # Los métodos síncronos se ejecutan en el pool de IO: asyncio.Event no es thread-safe
+        if self._loop is None:
+            evento.set()
+        else:
+            self._loop.call_soon_threadsafe(evento.set)
+
+    @staticmethod
+    def _a_dict(fila):
+        if fila is None:
+            return None
+        job = dict(fila)
+        for campo in ("params", "progress", "result"):
+            job[campo] = json.loads(job[campo]) if job[campo] else None
+        return job
+
+    # --- API pública ---
+
+    def register(self, kind, handler):
+        """
+        Registra la corrutina `handler(params, progress)` que ejecuta los trabajos de tipo `kind`.
+        """
+        self._handlers[kind] = handler
+
+    def submit(self, kind, params, dedup_key):
+        """
+        Encola un trabajo. Si ya hay uno idéntico en curso, devuelve ese.
+        Devuelve (job, deduplicado).
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+
+        def encolar(conn):
+            existente = conn.execute(
+                "SELECT * FROM jobs WHERE dedup_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (dedup_key, *ESTADOS_ACTIVOS)
+            ).fetchone()
+            if existente is not None:
+                return self._a_dict(existente), True
+            ahora = time.time()
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, dedup_key, params, status, progress, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, dedup_key, json.dumps(params), json.dumps({"stages": {}}), ahora, ahora)
+            )
+            fila = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._a_dict(fila), False
+
+        job, deduplicado = self._transaccion(encolar)
+        if not deduplicado and self._nuevo_trabajo is not None:
+            self._avisar(self._nuevo_trabajo)
+        return job, deduplicado
+
+    def get(self, job_id):
+        with self._lock:
+            fila = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._a_dict(fila)
+
+    def purge(self, ttl=JOBS_TTL_SECONDS):
+        """
+        Borra los trabajos terminados ("done" o "failed") hace más de `ttl` segundos.
+        Devuelve el número de trabajos borrados.
+        """
+        limite = time.time() - ttl
+        return self._transaccion(lambda conn: conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (*ESTADOS_FINALES, limite)
+        ).rowcount)
+
+    async def watch(self, job_id, heartbeat=15):
+        """
+        Generador asíncrono que emite el estado del trabajo cada vez que cambia
+        (o cada `heartbeat` segundos) hasta que termina.
+        """
+        ultimo = None
+        evento = self._cambios.setdefault(job_id, asyncio.Event())
+        self._observadores[job_id] = self._observadores.get(job_id, 0) + 1
+        try:
+            while True:
+                job = await run_io(self.get, job_id)
+                if job is None:
+                    return
+                if job["updated_at"] != ultimo:
+                    ultimo = job["updated_at"]
+                    yield job
+                if job["status"] in ESTADOS_FINALES:
+                    return
+                # Los cambios hechos por otros procesos solo se ven al volver a consultar
+                await _esperar_evento(evento, min(heartbeat, JOBS_POLL_INTERVAL))
+                evento.clear()
+        finally:
+            self._observadores[job_id] -= 1
+            if not self._observadores[job_id]:
+                del self._observadores[job_id]
+                self._cambios.pop(job_id, None)
+
+    # --- Workers ---
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._nuevo_trabajo = asyncio.Event()
+        await run_io(self._reencolar_huerfanos)
+        self._tareas = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        if JOBS_TTL_SECONDS:
+            self._tareas.append(asyncio.create_task(self._purgar()))
+        logger.info(f"Cola de trabajos iniciada con {self.workers} workers ({self.db_path})")
+
+    async def stop(self):
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+        self._loop = None
+
+    def _reencolar_huerfanos(self):
+        limite = time.time() - JOBS_STALE_SECONDS
+        self._transaccion(lambda conn: conn.execute(
+            "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running' AND updated_at < ?",
+            (time.time(), limite)
+        ))
+
+    def _reclamar(self):
+        def reclamar(conn):
+            fila = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if fila is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (time.time(), fila["id"])
+            )
+            return self._a_dict(fila)
+        return self._transaccion(reclamar)
+
+    def _actualizar(self, job_id, **campos):
+        campos["updated_at"] = time.time()
+        for campo in ("progress", "result"):
+            if campo in campos:
+                campos[campo] = json.dumps(campos[campo])
+        columnas = ", ".join(f"{nombre} = ?" for nombre in campos)
+        self._transaccion(lambda conn: conn.execute(
+            f"UPDATE jobs SET {columnas} WHERE id = ?", (*campos.values(), job_id)
+        ))
+        evento = self._cambios.get(job_id)
+        if evento is not None:
+            self._avisar(evento)
+
+    async def _latido(self, job_id):
+        while True:
+            await asyncio.sleep(JOBS_HEARTBEAT_INTERVAL)
+            await run_io(self._actualizar, job_id)
+
+    async def _purgar(self):
+        while True:
+            try:
+                borrados = await run_io(self.purge)
+                if borrados:
+                    logger.info(f"Borrados {borrados} trabajos terminados hace más de {JOBS_TTL_SECONDS:.0f}s")
+            except Exception as e:
+                logger.error(f"Error al borrar trabajos antiguos: {e}")
+            await asyncio.sleep(JOBS_PURGE_INTERVAL)
+
+    async def _worker(self, numero):
+        while True:
+            try:
+                job = await run_io(self._reclamar)
+            except Exception as e:
+                logger.error(f"Error al reclamar trabajo: {e}")
+                job = None
+
+            if job is None:
+                await _esperar_evento(self._nuevo_trabajo, JOBS_POLL_INTERVAL)
+                self._nuevo_trabajo.clear()
+                continue
+
+            await self._ejecutar(job, numero)
+
+    async def _ejecutar(self, job, numero):
+        job_id = job["id"]
+        progreso = job["progress"] or {"stages": {}}
+        logger.info(f"[worker {numero}] Ejecutando trabajo {job_id} ({job['kind']})")
+
+        # `progress` lo llaman los handlers desde el event loop: el progreso se guarda en una tarea
+        # aparte (una escritura a la vez, con el último estado) para no bloquear el loop con SQLite
+        guardado = {"pendiente": False, "tarea": None}
+
+        async def guardar_progreso():
+            while guardado["pendiente"]:
+                guardado["pendiente"] = False
+                try:
+                    await run_io(self._actualizar, job_id, progress={**progreso, "stages": dict(progreso["stages"])})
+                except Exception as e:
+                    logger.error(f"[worker {numero}] Error al guardar el progreso de {job_id}: {e}")
+
+        def progress(etapa, estado):
+            progreso["stages"][etapa] = estado
+            progreso["current"] = etapa
+            guardado["pendiente"] = True
+            if guardado["tarea"] is None or guardado["tarea"].done():
+                guardado["tarea"] = asyncio.create_task(guardar_progreso())
+
+        async def terminar(**campos):
+            # El estado final se escribe después del último progreso
+            if guardado["tarea"] is not None:
+                await asyncio.gather(guardado["tarea"], return_exceptions=True)
+            await run_io(self._actualizar, job_id, **campos)
+
+        latido = asyncio.create_task(self._latido(job_id))
+        try:
+            resultado = await self._handlers[job["kind"]](job["params"], progress)
+            if resultado is None:
+                await terminar(status="failed", error="El trabajo no produjo resultados")
+            else:
+                await terminar(status="done", result=resultado)
+        except asyncio.CancelledError:
+            # Apagado del worker: se deja en cola para que otro lo retome
+            await terminar(status="queued")
+            raise
+        except Exception as e:
+            logger.error(f"[worker {numero}] Error en el trabajo {job_id}: {e}", exc_info=True)
+            await terminar(status="failed", error=str(e))
+        finally:
+            latido.cancel()
+
+
+job_queue = JobQueue()
@@ -0,0 +1,110 @@
+import os
+import re
+import json
+import asyncio
+import logging
+import unicodedata
+from app.utils.cache import LRUCache, DiskCache, TieredCache, cache_key
+
+logger = logging.getLogger(__name__)
+
+# Las respuestas caducan a los 7 días por defecto (el modelo o el prompt pueden cambiar)
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))) or None
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+
+_cache = TieredCache(
+    LRUCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL),
+    DiskCache(os.getenv("LLM_CACHE_DIR", os.path.join("cache", "llm")), ttl=LLM_CACHE_TTL)
+    if os.getenv("LLM_CACHE_PERSIST", "1") == "1" else None,
+)
+
+# Índice contenido -> clave para asociar las valoraciones a su respuesta. Va aparte de `_cache`
+# para no ocupar sitio de las respuestas ni contar en sus aciertos y fallos; se actualiza cada vez
+# que se sirve una respuesta, así que también cubre las que vienen del disco tras un reinicio
+_claves_por_contenido = LRUCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL)
+
+# Generaciones en curso por clave: las peticiones idénticas simultáneas esperan a la misma llamada
+_en_curso = {}
+
+_contadores = {"generated": 0, "coalesced": 0, "feedback_positive": 0, "feedback_negative": 0, "invalidated": 0}
+
+
+def normalizar_prompt(texto):
+    """
+    Normaliza un prompt para que las variantes triviales (mayúsculas, espacios,
+    formas Unicode) compartan entrada de caché.
+    """
+    texto = unicodedata.normalize("NFKC", texto).casefold()
+    return re.sub(r"\s+", " ", texto).strip()
+
+
+def clave_llm(model, messages, **params):
+    """
+    Clave de caché de una llamada al LLM: modelo, parámetros de muestreo y mensajes normalizados.
+    """
+    mensajes = [(m["role"], normalizar_prompt(m["content"])) for m in messages]
+    return cache_key(model, json.dumps(params, sort_keys=True), json.dumps(mensajes, ensure_ascii=False))
+
+
+def _clave_contenido(content):
+    return cache_key(content.strip())
+
+
+async def get_or_generate(clave, generar):
+    """
+    Devuelve (respuesta, desde_cache) para la clave: desde la caché o ejecutando
+    la corrutina `generar()`, que debe devolver el texto ya validado.
+    Si `generar` lanza una excepción no se cachea nada.
+    """
+    entrada = _cache.get(clave)
+    if entrada is not None:
+        _claves_por_contenido.set(_clave_contenido(entrada["content"]), clave)
+        return entrada["content"], True
+
+    tarea = _en_curso.get(clave)
+    if tarea is not None and tarea.get_loop() is asyncio.get_running_loop():
+        _contadores["coalesced"] += 1
+        return await asyncio.shield(tarea), True
+
+    async def _generar_y_guardar():
+        content = await generar()
+        _cache.set(clave, {"content": content, "ratings": {"positive": 0, "negative": 0}})
+        _claves_por_contenido.set(_clave_contenido(content), clave)
+        _contadores["generated"] += 1
+        return content
+
+    tarea = asyncio.ensure_future(_generar_y_guardar())
+    _en_curso[clave] = tarea
+    tarea.add_done_callback(lambda t: _en_curso.pop(clave, None) if _en_curso.get(clave) is t else None)
+    return await asyncio.shield(tarea), False
+
+
+def record_feedback(content, result):
+    """
+    Asocia una valoración del usuario a la respuesta cacheada con ese contenido.
+    Si las valoraciones negativas superan a las positivas, la entrada se invalida
+    y la siguiente petición vuelve a generar la respuesta.
+    Devuelve True si la respuesta estaba en caché.
+    """
+    indice = _clave_contenido(content)
+    clave = _claves_por_contenido.get(indice)
+    entrada = _cache.get(clave) if clave else None
+    if entrada is None:
+        logger.warning("Valoración no asociada a ninguna respuesta cacheada (caducada, expulsada o desconocida)")
+        return False
+
+    campo = "positive" if result else "negative"
+    entrada["ratings"][campo] += 1
+    _contadores[f"feedback_{campo}"] += 1
+    if entrada["ratings"]["negative"] > entrada["ratings"]["positive"]:
+        logger.info(f"Respuesta cacheada invalidada por feedback negativo: {clave}")
+        _cache.delete(clave)
+        _claves_por_contenido.delete(indice)
+        _contadores["invalidated"] += 1
+    else:
+        _cache.set(clave, entrada)
+    return True
+
+
+def llm_cache_stats():
+    return {**_cache.stats(), **_contadores, "in_flight": len(_en_curso)}
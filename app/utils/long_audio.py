@@ -0,0 +1,256 @@
+import os
+import time
+import functools
+import logging
+import threading
+import multiprocessing
+import concurrent.futures
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+# Por encima de esta duración el audio se transcribe por segmentos en varios procesos
+LONG_AUDIO_MIN_SECONDS = float(os.getenv("LONG_AUDIO_MIN_SECONDS", "600"))
+LONG_AUDIO_WORKERS = int(os.getenv("LONG_AUDIO_WORKERS", str(max(1, (os.cpu_count() or 1) // 2))))
+# Duración objetivo de cada segmento y margen alrededor del corte en el que se busca un silencio
+LONG_AUDIO_SEGMENT_SECONDS = float(os.getenv("LONG_AUDIO_SEGMENT_SECONDS", "90"))
+LONG_AUDIO_SEARCH_SECONDS = float(os.getenv("LONG_AUDIO_SEARCH_SECONDS", "15"))
+# Con "forkserver" (por defecto) el servidor de procesos arranca limpio, carga una vez el modelo de ASR
+# por defecto (ver `precargar_modelo`) y los workers lo heredan al hacer fork, compartiendo los pesos por
+# copia en escritura. Con "spawn" cada proceso carga su propia copia. No se usa "fork" directamente:
+# hacer fork del proceso de la aplicación, con hilos (uvicorn, torch), puede dejar locks bloqueados en el hijo
+LONG_AUDIO_START_METHOD = os.getenv("LONG_AUDIO_START_METHOD", "forkserver")
+# Pools de procesos que se mantienen vivos (uno por modelo); salvo el precargado, cada uno ocupa memoria
+# de un modelo por proceso
+LONG_AUDIO_MAX_POOLS = int(os.getenv("LONG_AUDIO_MAX_POOLS", "1"))
+
+FRAME_MS = 30
+
+
+def energia_por_trama(audio, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS):
+    """
+    Energía RMS (en dB) de cada trama de `frame_ms` milisegundos del audio.
+    """
+    muestras = int(sample_rate * frame_ms / 1000)
+    tramas = len(audio) // muestras
+    if tramas == 0:
+        return np.zeros(0, dtype=np.float32)
+    bloques = audio[:tramas * muestras].reshape(tramas, muestras).astype(np.float32)
+    rms = np.sqrt(np.mean(bloques * bloques, axis=1))
+    return 20 * np.log10(rms + 1e-10)
+
+
+def cortes_en_silencios(audio, sample_rate=SAMPLE_RATE, segmento_s=LONG_AUDIO_SEGMENT_SECONDS,
+                        margen_s=LONG_AUDIO_SEARCH_SECONDS):
+    """
+    Divide el audio en segmentos de ~`segmento_s` segundos cortando en la trama de menor
+    energía dentro de ±`margen_s` segundos del corte ideal, para no partir palabras.
+    Devuelve una lista de (inicio, fin) en muestras.
+    """
+    total = len(audio)
+    if total <= sample_rate * (segmento_s + margen_s):
+        return [(0, total)]
+
+    energia = energia_por_trama(audio, sample_rate)
+    muestras_trama = int(sample_rate * FRAME_MS / 1000)
+    tramas_segmento = int(segmento_s * 1000 / FRAME_MS)
+    tramas_margen = int(margen_s * 1000 / FRAME_MS)
+
+    cortes = []
+    inicio_trama = 0
+    while len(energia) - inicio_trama > tramas_segmento + tramas_margen:
+        objetivo = inicio_trama + tramas_segmento
+        ventana = energia[objetivo - tramas_margen:objetivo + tramas_margen]
+        corte = objetivo - tramas_margen + int(np.argmin(ventana))
+        cortes.append(corte * muestras_trama)
+        inicio_trama = corte
+
+    limites = [0, *cortes, total]
+    return list(zip(limites[:-1], limites[1:]))
+
+
+# Modelo de cada proceso del pool (heredado del forkserver o cargado por el inicializador) y su clave
+_modelo_worker = None
+_clave_worker = None
+# Pools vivos por (cargar_modelo, clave_modelo, workers), en orden LRU
+_pools = OrderedDict()
+# Reentrante: los segmentos se envían con el lock adquirido, para que otra petición no cierre el pool entre medias
+_lock_pools = threading.RLock()
+
+
+def precargar_modelo():
+    """
+    Carga el modelo del motor de ASR por defecto en el proceso forkserver, antes de que cree
+    ningún worker (se llama al importar `long_audio_preload`). No debe lanzar excepciones:
+    si falla, cada worker carga su modelo como con "spawn".
+    """
+    global _modelo_worker, _clave_worker
+    try:
+        import torch
+        from app.utils.asr_engines import get_engine
+
+        # Con un solo hilo torch no arranca su pool de OpenMP, que no sobrevive a un fork
+        torch.set_num_threads(1)
+        engine = get_engine()
+        clave_modelo = tuple(engine.model_key())
+        _modelo_worker = engine.cargar_modelo(*clave_modelo)
+        _clave_worker = (engine.cargar_modelo, clave_modelo)
+    except Exception as e:
+        logger.error(f"No se pudo precargar el modelo de ASR en el forkserver: {e}")
+
+
+if LONG_AUDIO_START_METHOD == "forkserver":
+    # Solo tiene efecto antes de que arranque el forkserver, es decir, antes del primer pool
+    multiprocessing.get_context("forkserver").set_forkserver_preload(["app.utils.long_audio_preload"])
+
+
+def _inicializar_worker(cargar_modelo, clave_modelo, hilos):
+    global _modelo_worker, _clave_worker
+    import torch
+
+    torch.set_num_threads(hilos)
+    if _clave_worker != (cargar_modelo, tuple(clave_modelo)):
+        _modelo_worker = cargar_modelo(*clave_modelo)
+        _clave_worker = (cargar_modelo, tuple(clave_modelo))
+
+
+def _listo(espera):
+    time.sleep(espera)  # Ocupa el proceso para que las demás tareas vayan a otros
+    return os.getpid()
+
+
+def _pool(cargar_modelo, clave_modelo, workers):
+    """
+    Devuelve el pool de procesos para el modelo, creándolo la primera vez. Los procesos cargan
+    el modelo al arrancar (o heredan el precargado en el forkserver) y se reutilizan en las
+    siguientes transcripciones.
+    """
+    clave = (cargar_modelo, tuple(clave_modelo), workers)
+    with _lock_pools:
+        if clave in _pools:
+            _pools.move_to_end(clave)
+            return _pools[clave]
+        hilos = max(1, (os.cpu_count() or 1) // workers)
+        _pools[clave] = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(LONG_AUDIO_START_METHOD),
+            initializer=_inicializar_worker,
+            initargs=(cargar_modelo, clave_modelo, hilos),
+        )
+        logger.info(f"Pool de {workers} procesos creado para {clave_modelo} ({LONG_AUDIO_START_METHOD})")
+        while len(_pools) > max(1, LONG_AUDIO_MAX_POOLS):
+            clave_antigua, antiguo = _pools.popitem(last=False)
+            # Los segmentos ya enviados al pool antiguo terminan antes de que se cierre
+            antiguo.shutdown(wait=False)
+            logger.info(f"Pool de procesos de {clave_antigua[1]} cerrado")
+        return _pools[clave]
+
+
+def _descartar_pool(cargar_modelo, clave_modelo, workers, executor):
+    with _lock_pools:
+        clave = (cargar_modelo, tuple(clave_modelo), workers)
+        if _pools.get(clave) is executor:
+            del _pools[clave]
+    executor.shutdown(wait=False)
+
+
+def calentar_pool(cargar_modelo, clave_modelo, workers=None):
+    """
+    Arranca los procesos del pool del modelo (y espera a que lo carguen) antes de la primera transcripción.
+    """
+    workers = workers or LONG_AUDIO_WORKERS
+    procesos = set()
+    # Los procesos que aún están cargando el modelo no reciben tareas: se repite hasta verlos todos
+    for _ in range(20):
+        with _lock_pools:
+            executor = _pool(cargar_modelo, clave_modelo, workers)
+            futuros = [executor.submit(_listo, 0.2) for _ in range(workers)]
+        procesos.update(futuro.result() for futuro in futuros)
+        if len(procesos) >= workers:
+            break
+    return sorted(procesos)
+
+
+def cerrar_pools():
+    """
+    Cierra los pools de procesos (al apagar la aplicación).
+    """
+    with _lock_pools:
+        pools = list(_pools.values())
+        _pools.clear()
+    for executor in pools:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _transcribir_modelo(modelo, audio, **opciones):
+    return modelo.transcribe(audio, **opciones)
+
+
+def _transcribir_con(transcribir, indice, segmento, offset_s):
+    inicio = time.perf_counter()
+    resultado = transcribir(segmento)
+    segmentos = [
+        {"start": s["start"] + offset_s, "end": s["end"] + offset_s, "text": s["text"]}
+        for s in resultado.get("segments", [])
+    ]
+    return indice, resultado.get("text", "").strip(), segmentos, time.perf_counter() - inicio
+
+
+def _transcribir_segmento(transcribir, indice, segmento, offset_s, opciones):
+    return _transcribir_con(functools.partial(transcribir, _modelo_worker, **opciones), indice, segmento, offset_s)
+
+
+def unir_resultados(resultados):
+    """
+    Une los resultados de los segmentos en orden: texto completo y segmentos con marcas
+    de tiempo absolutas.
+    """
+    resultados = sorted(resultados, key=lambda r: r[0])
+    return {
+        "text": " ".join(texto for _, texto, _, _ in resultados if texto),
+        "segments": [segmento for _, _, segmentos, _ in resultados for segmento in segmentos],
+    }
+
+
+def transcribir_en_paralelo(audio, en_proceso, cargar_modelo, clave_modelo, opciones, workers=None, transcribir=None):
+    """
+    Transcribe un audio largo (float32, 16 kHz, mono) por segmentos cortados en silencios,
+    repartidos entre los `workers` procesos del pool del modelo (ver `_pool`).
+    Devuelve {"text", "segments"} en orden.
+    `transcribir(modelo, audio, **opciones)` debe ser una función de módulo (se envía a los
+    procesos) que devuelva {"text", "segments"}; por defecto llama a `modelo.transcribe`.
+    `en_proceso(audio)` transcribe en este proceso y solo se usa si hay un único proceso o segmento:
+    así el modelo no se carga aquí cuando la transcripción se reparte entre los procesos del pool.
+    """
+    transcribir = transcribir or _transcribir_modelo
+    workers = workers or LONG_AUDIO_WORKERS
+    cortes = cortes_en_silencios(audio)
+    logger.info(
+        f"Transcripción larga: {len(audio) / SAMPLE_RATE:.0f}s en {len(cortes)} segmentos, "
+        f"{min(workers, len(cortes))} procesos"
+    )
+
+    if workers <= 1 or len(cortes) <= 1:
+        return unir_resultados([
+            _transcribir_con(en_proceso, indice, audio[inicio:fin], inicio / SAMPLE_RATE)
+            for indice, (inicio, fin) in enumerate(cortes)
+        ])
+
+    try:
+        with _lock_pools:
+            executor = _pool(cargar_modelo, clave_modelo, workers)
+            futuros = [
+                executor.submit(
+                    _transcribir_segmento, transcribir, indice, audio[inicio:fin], inicio / SAMPLE_RATE, opciones
+                )
+                for indice, (inicio, fin) in enumerate(cortes)
+            ]
+        resultados = [futuro.result() for futuro in futuros]
+    except concurrent.futures.process.BrokenProcessPool:
+        # Un proceso murió (p. ej. sin memoria): el pool ya no sirve, la siguiente petición crea otro
+        _descartar_pool(cargar_modelo, clave_modelo, workers, executor)
+        raise
+    logger.info(f"Segmentos transcritos; tiempo de CPU de ASR: {sum(r[3] for r in resultados):.1f}s")
+    return unir_resultados(resultados)
@@ -0,0 +1,7 @@
+"""
+Módulo que importa el forkserver de `long_audio` al arrancar (ver LONG_AUDIO_START_METHOD):
+carga el modelo de ASR por defecto para que los procesos del pool lo hereden.
+"""
+from app.utils.long_audio import precargar_modelo
+
+precargar_modelo()
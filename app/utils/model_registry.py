@@ -0,0 +1,177 @@
+import gc
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def memoria_disponible_mb():
+    """
+    Devuelve la memoria disponible (MB) teniendo en cuenta el límite del cgroup
+    si existe (Cloud Run / Docker). Devuelve None si no se puede determinar.
+    """
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            limite = f.read().strip()
+        with open("/sys/fs/cgroup/memory.current") as f:
+            actual = int(f.read().strip())
+        if limite != "max":
+            return (int(limite) - actual) / (1024 * 1024)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class ModelRegistry:
+    """
+    Registro de modelos compartido por proceso.
+
+    Cada clave (por ejemplo (tamaño, dispositivo, compute_type)) se carga una sola vez
+    con `loader(*clave)` y se reutiliza en las siguientes llamadas. Mantiene un orden LRU
+    para poder liberar modelos cuando se supera `max_modelos` o cuando la memoria
+    disponible baja de `min_memoria_mb`.
+    """
+
+    def __init__(self, nombre, loader, max_modelos=None, min_memoria_mb=None):
+        self.nombre = nombre
+        self._loader = loader
+        self.max_modelos = max_modelos
+        self.min_memoria_mb = min_memoria_mb
+        self._modelos = OrderedDict()
+        self._lock = threading.Lock()
+        self._locks_carga = {}
+        self._locks_inferencia = {}
+        self._metricas = {}
+
+    def _lock_de_carga(self, clave):
+        with self._lock:
+            return self._locks_carga.setdefault(clave, threading.Lock())
+
+    def inference_lock(self, *clave):
+        """
+        Lock para serializar la inferencia de un modelo que no admite llamadas concurrentes
+        (p. ej. Whisper, que registra hooks de kv-cache en el decoder compartido en cada decodificación,
+        o los fast tokenizers de Hugging Face, que fallan con "Already borrowed" si se usan a la vez).
+        """
+        with self._lock:
+            return self._locks_inferencia.setdefault(clave, threading.Lock())
+
+    def _metricas_de(self, clave):
+        return self._metricas.setdefault(clave, {
+            "loads": 0,
+            "load_seconds": None,
+            "hits": 0,
+            "inferences": 0,
+            "inference_seconds_total": 0.0,
+            "last_inference_seconds": None,
+        })
+
+    def get(self, *clave):
+        """
+        Devuelve el modelo para `clave`, cargándolo si todavía no está en memoria.
+        Las cargas concurrentes de la misma clave esperan a la primera.
+        """
+        with self._lock:
+            if clave in self._modelos:
+                self._modelos.move_to_end(clave)
+                self._metricas_de(clave)["hits"] += 1
+                return self._modelos[clave]
+
+        with self._lock_de_carga(clave):
+            with self._lock:
+                if clave in self._modelos:
+                    self._modelos.move_to_end(clave)
+                    self._metricas_de(clave)["hits"] += 1
+                    return self._modelos[clave]
+
+            self._liberar_por_presion()
+
+            logger.info(f"[{self.nombre}] Cargando modelo {clave}...")
+            inicio = time.perf_counter()
+            modelo = self._loader(*clave)
+            duracion = time.perf_counter() - inicio
+            logger.info(f"[{self.nombre}] Modelo {clave} cargado en {duracion:.2f}s")
+
+            with self._lock:
+                self._modelos[clave] = modelo
+                metricas = self._metricas_de(clave)
+                metricas["loads"] += 1
+                metricas["load_seconds"] = round(duracion, 3)
+                self._aplicar_limite()
+            return modelo
+
+    def warmup(self, claves):
+        """
+        Precarga una lista de claves (p. ej. al arrancar el worker).
+        """
+        for clave in claves:
+            try:
+                self.get(*clave)
+            except Exception as e:
+                logger.error(f"[{self.nombre}] Error en el warm-up de {clave}: {e}")
+
+    def evict(self, *clave):
+        """
+        Libera un modelo concreto, o el menos usado recientemente si no se indica clave.
+        Devuelve la clave liberada o None.
+        """
+        with self._lock:
+            if not self._modelos:
+                return None
+            if not clave:
+                clave, _ = self._modelos.popitem(last=False)
+            elif clave in self._modelos:
+                del self._modelos[clave]
+            else:
+                return None
+        gc.collect()
+        logger.info(f"[{self.nombre}] Modelo {clave} liberado de memoria")
+        return clave
+
+    def evict_all(self):
+        with self._lock:
+            self._modelos.clear()
+
+    def record_inference(self, clave, segundos):
+        with self._lock:
+            metricas = self._metricas_de(tuple(clave))
+            metricas["inferences"] += 1
+            metricas["inference_seconds_total"] += segundos
+            metricas["last_inference_seconds"] = round(segundos, 3)
+
+    def stats(self):
+        """
+        Métricas de carga e inferencia por modelo (para comparar arranques en frío y en caliente).
+        """
+        with self._lock:
+            return {
+                "loaded": [list(clave) for clave in self._modelos],
+                "models": {
+                    "/".join(str(parte) for parte in clave): dict(
+                        metricas,
+                        loaded=clave in self._modelos,
+                        inference_seconds_total=round(metricas["inference_seconds_total"], 3),
+                    )
+                    for clave, metricas in self._metricas.items()
+                },
+            }
+
+    def _aplicar_limite(self):
+        # Se llama con self._lock adquirido
+        while self.max_modelos and len(self._modelos) > self.max_modelos:
+            clave, _ = self._modelos.popitem(last=False)
+            logger.info(f"[{self.nombre}] Límite de {self.max_modelos} modelos alcanzado, liberando {clave}")
+
+    def _liberar_por_presion(self):
+        if not self.min_memoria_mb:
+            return
+        disponible = memoria_disponible_mb()
+        while disponible is not None and disponible < self.min_memoria_mb and self.evict() is not None:
+            disponible = memoria_disponible_mb()
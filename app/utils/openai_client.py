@@ -0,0 +1,106 @@
+import os
+import asyncio
+import logging
+import time
+import weakref
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from dotenv import load_dotenv
+from app.utils.executors import al_cerrar_loop
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Límite de llamadas simultáneas a OpenAI por worker y timeout por llamada (segundos)
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+# Un cliente (con su pool de conexiones) y un semáforo por event loop.
+# En el servidor solo hay un loop, así que en la práctica es un cliente compartido;
+# las conexiones de httpx no pueden reutilizarse entre loops distintos. Los clientes de los
+# loops temporales de run_sync se cierran al terminar (ver `aclose`).
+_clientes = weakref.WeakKeyDictionary()
+
+
+def _estado():
+    loop = asyncio.get_running_loop()
+    estado = _clientes.get(loop)
+    if estado is None:
+        client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout=OPENAI_TIMEOUT,
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONCURRENCY,
+                    max_keepalive_connections=OPENAI_MAX_CONCURRENCY,
+                )
+            ),
+        )
+        estado = (client, asyncio.Semaphore(OPENAI_MAX_CONCURRENCY))
+        _clientes[loop] = estado
+    return estado
+
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    Devuelve el cliente AsyncOpenAI compartido del event loop actual.
+    """
+    return _estado()[0]
+
+
+@al_cerrar_loop
+async def aclose():
+    """
+    Cierra el cliente del event loop actual (al apagar la aplicación o al terminar run_sync).
+    """
+    estado = _clientes.pop(asyncio.get_running_loop(), None)
+    if estado is not None:
+        await estado[0].close()
+
+
+async def chat_completion(timeout: float = None, **kwargs):
+    """
+    Llama a chat.completions.create respetando el límite de concurrencia y el timeout por llamada.
+    """
+    client, semaforo = _estado()
+    async with semaforo:
+        return await asyncio.wait_for(
+            client.chat.completions.create(**kwargs),
+            timeout=timeout or OPENAI_TIMEOUT
+        )
+
+
+# Resultado de la última comprobación de disponibilidad de OpenAI (se reutiliza durante OPENAI_HEALTH_TTL)
+OPENAI_HEALTH_TTL = float(os.getenv("OPENAI_HEALTH_TTL", "60"))
+OPENAI_HEALTH_TIMEOUT = float(os.getenv("OPENAI_HEALTH_TIMEOUT", "5"))
+OPENAI_HEALTH_MODEL = os.getenv("OPENAI_HEALTH_MODEL", "gpt-3.5-turbo")
+_ultima_comprobacion = None
+_lock_comprobacion = weakref.WeakKeyDictionary()
+
+
+async def check_openai_ready(force=False):
+    """
+    Comprueba que OpenAI responde y que la API key es válida, consultando el modelo
+    (sin consumir tokens). El resultado se cachea OPENAI_HEALTH_TTL segundos y las
+    comprobaciones simultáneas comparten una única llamada.
+    """
+    global _ultima_comprobacion
+    loop = asyncio.get_running_loop()
+    lock = _lock_comprobacion.setdefault(loop, asyncio.Lock())
+    async with lock:
+        ahora = time.monotonic()
+        if not force and _ultima_comprobacion and ahora - _ultima_comprobacion["checked_at"] < OPENAI_HEALTH_TTL:
+            return {**_ultima_comprobacion["result"], "cached": True}
+
+        inicio = time.perf_counter()
+        try:
+            await asyncio.wait_for(get_async_client().models.retrieve(OPENAI_HEALTH_MODEL), timeout=OPENAI_HEALTH_TIMEOUT)
+            resultado = {"ready": True}
+        except Exception as e:
+            logger.error(f"Error en la verificación de OpenAI: {str(e)}")
+            resultado = {"ready": False, "error": str(e)}
+        resultado["latency_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        _ultima_comprobacion = {"checked_at": ahora, "result": resultado}
+        return {**resultado, "cached": False}
@@ -1,67 +1,39 @@
-from openai import OpenAI
 import logging
-from typing import List, Dict
+from typing import Dict
+from app.utils.executors import run_sync
+from app.utils.perfume_extraction import extract_perfume_records_async, to_perfume_analysis
 
 # Configuración del logger
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
+
+def _log_result(result: str) -> None:
+    logger.info("Resultado del análisis de perfumes:")
+    logger.info(result)
+    print("Resultado del análisis de perfumes:")
+    print(result)
+
+
 def analyze_perfumes_from_transcription(transcription: str) -> Dict:
     """
     Analiza la transcripción para extraer información sobre perfumes,
     separando la marca y el nombre, su valoración y la razón.
     """
-    try:
-        client = OpenAI()
-        logger.info("Analizando transcripción para extraer información de perfumes...")
-
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    "Eres un experto en perfumería que analiza reseñas de video. "
-                    "Extrae información sobre los perfumes mencionados, separando la marca del perfume y su nombre. "
-                    "Además, identifica si cada perfume tiene una valoración positiva, negativa o neutra, "
-                    "y describe la razón detrás de la valoración. Devuelve los resultados en formato JSON."
-                )
-            },
-            {
-                "role": "user",
-                "content": (
-                    f"Analiza la siguiente transcripción y extrae la información sobre los perfumes mencionados. "
-                    f"Para cada perfume, incluye:\n"
-                    f"1. La marca del perfume.\n"
-                    f"2. El nombre del perfume.\n"
-                    f"3. Una descripción breve del perfume.\n"
-                    f"4. La valoración ('positiva', 'negativa' o 'neutra').\n"
-                    f"5. La razón detrás de la valoración.\n\n"
-                    f"Devuelve los resultados estrictamente en formato JSON válido:\n\n{transcription}"
-                )
-            }
-        ]
-
-        # Solicitud a la API de OpenAI
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            temperature=0.3,
-            max_tokens=1500,
-            response_format={"type": "json_object"}
-        )
+    return run_sync(analyze_perfumes_from_transcription_async(transcription))
 
-        # Obtener el contenido de la respuesta
-        result = response.choices[0].message.content
-        
-        # Loguear e imprimir la respuesta
-        logger.info("Resultado del análisis de perfumes:")
-        logger.info(result)
-        print("Resultado del análisis de perfumes:")
-        print(result)
-
-        return result
-
-    except Exception as e:
-        logger.error(f"Error en el análisis de perfumes: {str(e)}")
-        print(f"Error en el análisis de perfumes: {str(e)}")
-        raise
 
+async def analyze_perfumes_from_transcription_async(transcription: str) -> Dict:
+    """
+    Versión asíncrona de `analyze_perfumes_from_transcription`.
+    Usa la extracción unificada (`perfume_extraction`) y devuelve solo los campos de la reseña.
+    """
+    registros = await extract_perfume_records_async(transcription)
+    if registros is None:
+        logger.error("Error en el análisis de perfumes: la extracción no devolvió resultados")
+        print("Error en el análisis de perfumes: la extracción no devolvió resultados")
+        raise ValueError("La extracción de perfumes no devolvió resultados")
+
+    result = to_perfume_analysis(registros)
+    _log_result(result)
+    return result
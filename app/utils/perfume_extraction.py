@@ -0,0 +1,173 @@
+import json
+import logging
+from typing import Dict, List, Literal, Optional, Union
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from app.utils.openai_client import chat_completion
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_MODEL = "gpt-3.5-turbo"
+EJES = ("fragancia", "duracion", "diseno", "calidad", "precio")
+
+
+class PerfumeRecord(BaseModel):
+    """
+    Registro unificado de un perfume: datos de la reseña y puntuaciones por eje.
+    """
+    marca: Optional[str] = None
+    nombre: str
+    descripcion: Optional[str] = None
+    valoracion: Literal["positiva", "negativa", "neutra"] = "neutra"
+    razon: Optional[str] = None
+    fragancia: Optional[int] = Field(default=None, ge=0, le=10)
+    duracion: Optional[int] = Field(default=None, ge=0, le=10)
+    diseno: Optional[int] = Field(default=None, ge=0, le=10)
+    calidad: Optional[int] = Field(default=None, ge=0, le=10)
+    precio: Optional[int] = Field(default=None, ge=0, le=10)
+
+    @field_validator("valoracion", mode="before")
+    @classmethod
+    def _normalizar_valoracion(cls, valor):
+        valor = str(valor or "").strip().lower()
+        return valor if valor in ("positiva", "negativa", "neutra") else "neutra"
+
+    @field_validator(*EJES, mode="before")
+    @classmethod
+    def _redondear_eje(cls, valor):
+        # El modelo a veces devuelve "8", 7.5 o "" en lugar de un entero; "NaN" o "Infinity"
+        # tampoco son una puntuación: el eje queda sin valor y el perfume se conserva
+        try:
+            return max(0, min(10, round(float(valor))))
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+
+def _esquema_eje(descripcion):
+    return {"type": ["integer", "null"], "minimum": 0, "maximum": 10, "description": descripcion}
+
+
+EXTRACTION_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "registrar_perfumes",
+        "description": "Registra los perfumes mencionados en la transcripción con su valoración y puntuaciones.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "perfumes": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "marca": {"type": ["string", "null"], "description": "Marca del perfume o null si no se menciona"},
+                            "nombre": {"type": "string", "description": "Nombre del perfume, sin la marca"},
+                            "descripcion": {"type": "string", "description": "Descripción breve del perfume"},
+                            "valoracion": {"type": "string", "enum": ["positiva", "negativa", "neutra"]},
+                            "razon": {"type": "string", "description": "Razón de la valoración"},
+                            "fragancia": _esquema_eje("Puntuación del olor (0-10) o null si no se menciona"),
+                            "duracion": _esquema_eje("Puntuación de la duración (0-10) o null si no se menciona"),
+                            "diseno": _esquema_eje("Puntuación del diseño del frasco (0-10) o null si no se menciona"),
+                            "calidad": _esquema_eje("Puntuación de la calidad (0-10) o null si no se menciona"),
+                            "precio": _esquema_eje("Puntuación de la relación calidad-precio (0-10) o null si no se menciona"),
+                        },
+                        "required": ["marca", "nombre", "descripcion", "valoracion", "razon", *EJES],
+                    },
+                }
+            },
+            "required": ["perfumes"],
+        },
+    },
+}
+
+
+def _build_messages(transcription: str) -> List[Dict]:
+    return [
+        {
+            "role": "system",
+            "content": (
+                "Eres un experto en perfumería que analiza reseñas de video. "
+                "Extrae los perfumes mencionados, separando la marca del nombre, su valoración "
+                "('positiva', 'negativa' o 'neutra') con la razón, y puntúa de 0 a 10 sus características "
+                "basándote únicamente en la información disponible en la transcripción."
+            )
+        },
+        {
+            "role": "user",
+            "content": f"Registra los perfumes mencionados en la siguiente transcripción:\n\n{transcription}"
+        }
+    ]
+
+
+REQUEST_PARAMS = {
+    "model": EXTRACTION_MODEL,
+    "temperature": 0.3,
+    "max_tokens": 2000,
+    "tools": [EXTRACTION_TOOL],
+    "tool_choice": {"type": "function", "function": {"name": "registrar_perfumes"}},
+}
+
+
+def _parse_records(arguments: str) -> List[Dict]:
+    """
+    Valida los argumentos de la llamada a la función y devuelve los registros normalizados
+    (dicts serializables). Los perfumes que no cumplen el esquema se descartan de uno en uno
+    en lugar de invalidar toda la respuesta.
+    """
+    perfumes = json.loads(arguments).get("perfumes") or []
+    registros = []
+    for perfume in perfumes:
+        try:
+            registros.append(PerfumeRecord.model_validate(perfume).model_dump())
+        except ValidationError as e:
+            logger.warning(f"Perfume descartado por no cumplir el esquema: {perfume} - {e.error_count()} errores")
+    return registros
+
+
+async def extract_perfume_records_async(transcription: str) -> Union[List[Dict], None]:
+    """
+    Extrae en una sola llamada a OpenAI los perfumes de la transcripción: marca, nombre,
+    descripción, valoración y razón, y las puntuaciones de cada eje.
+    Devuelve None si la llamada falla o la respuesta no es JSON válido.
+    """
+    try:
+        logger.info("Extrayendo perfumes de la transcripción...")
+        response = await chat_completion(messages=_build_messages(transcription), **REQUEST_PARAMS)
+        tool_calls = response.choices[0].message.tool_calls
+        if not tool_calls:
+            logger.error("La respuesta del modelo no contiene la llamada a la función de extracción")
+            return None
+        registros = _parse_records(tool_calls[0].function.arguments)
+        logger.info(f"Perfumes extraídos: {len(registros)}")
+        return registros
+
+    except json.JSONDecodeError as json_error:
+        logger.error(f"Error al decodificar JSON: {json_error}")
+        return None
+    except Exception as e:
+        logger.error(f"Error en la extracción de perfumes: {str(e)}")
+        return None
+
+
+def to_perfume_analysis(registros: List[Dict]) -> str:
+    """
+    Formato de /api/analyze-perfumes: JSON con marca, nombre, descripción, valoración y razón.
+    La razón se incluye como `razon_valoracion` (la que muestra el frontend) y como `razon`.
+    """
+    campos = ("marca", "nombre", "descripcion", "valoracion", "razon")
+    perfumes = [
+        {**{campo: registro[campo] for campo in campos}, "razon_valoracion": registro["razon"]}
+        for registro in registros
+    ]
+    return json.dumps({"perfumes": perfumes}, ensure_ascii=False)
+
+
+def to_perfume_parameters(registros: List[Dict]) -> Dict:
+    """
+    Formato de /api/parameters: nombre, marca y puntuaciones de cada eje.
+    """
+    return {
+        "perfumes": [
+            {"perfume_name": registro["nombre"], "brand": registro["marca"], **{eje: registro[eje] for eje in EJES}}
+            for registro in registros
+        ]
+    }
@@ -1,28 +1,9 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from openai import OpenAI
+import asyncio
 import logging
-import sys
-
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-logger = logging.getLogger(__name__)
-
-# Inicializar cliente de OpenAI
-try:
-    client = OpenAI()
-    logger.info("Cliente OpenAI inicializado correctamente")
-except Exception as e:
-    logger.error(f"Error al inicializar cliente OpenAI: {str(e)}")
-    raise
-
+from app.utils.llm_cache import clave_llm, get_or_generate
+from app.utils.openai_client import chat_completion
 
+logger = logging.getLogger(__name__)
 
 
 def truncate_at_last_period(text: str) -> str:
@@ -36,19 +17,53 @@ def truncate_at_last_period(text: str) -> str:
     return text
 
 
+DEFINITION_MODEL = "gpt-3.5-turbo"
+DEFINITION_PARAMS = {"max_tokens": 200, "temperature": 0.7, "top_p": 0.9}
+DEFINITION_SYSTEM_PROMPT = "Eres un experto en perfumería que proporciona definiciones precisas y profesionales."
+
+# Términos de perfumería habituales que se precargan en la caché si LLM_CACHE_PREWARM=1
+TERMINOS_PRECARGA = [
+    "chipre", "fougère", "gourmand", "oriental", "aldehídos", "acorde", "notas de salida",
+    "notas de corazón", "notas de fondo", "estela", "proyección", "longevidad", "eau de parfum",
+    "eau de toilette", "extrait de parfum", "oud", "ámbar", "almizcle", "pachulí", "vetiver",
+    "iris", "cuero", "flanker", "nicho", "dupe",
+]
+
+
+def definition_messages(term):
+    return [
+        {"role": "system", "content": DEFINITION_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Define {' '.join(term.split())} de forma breve y profesional en español."}
+    ]
+
+
+async def generar_definicion(term):
+    """
+    Devuelve (definición, mensajes, desde_cache) para un término de perfumería.
+    Las definiciones se cachean por prompt normalizado; las demasiado cortas no se cachean.
+    """
+    messages = definition_messages(term)
+
+    async def generar():
+        logger.info("Generando definición con OpenAI...")
+        response = await chat_completion(model=DEFINITION_MODEL, messages=messages, **DEFINITION_PARAMS)
+        definition = truncate_at_last_period(response.choices[0].message.content)
+        logger.info(f"Definición final extraída y truncada: {definition}")
+        if len(definition) < 10:
+            logger.warning("La definición generada es demasiado corta")
+            raise ValueError("La definición generada es demasiado corta")
+        return definition
 
-# Verificar estado de la API al inicio
-try:
-    logger.info("Verificando conexión con OpenAI...")
-    test_response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "Eres un experto en perfumería."},
-            {"role": "user", "content": "Define prueba."}
-        ],
-        max_tokens=20
-    )
-    logger.info("Verificación de conexión con OpenAI completada exitosamente")
-except Exception as e:
-    logger.error(f"Error en la verificación inicial de OpenAI: {str(e)}")
-    raise
\ No newline at end of file
+    clave = clave_llm(DEFINITION_MODEL, messages, **DEFINITION_PARAMS)
+    definition, desde_cache = await get_or_generate(clave, generar)
+    return definition, messages, desde_cache
+
+
+async def precargar_definiciones(terminos=None):
+    """
+    Genera en segundo plano las definiciones de los términos más consultados.
+    """
+    terminos = terminos or TERMINOS_PRECARGA
+    resultados = await asyncio.gather(*(generar_definicion(t) for t in terminos), return_exceptions=True)
+    errores = sum(isinstance(r, Exception) for r in resultados)
+    logger.info(f"Precarga de definiciones completada: {len(terminos) - errores}/{len(terminos)}")
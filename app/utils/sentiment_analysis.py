@@ -1,29 +1,187 @@
-from transformers import pipeline
+import os
+import time
+from app.utils.model_registry import ModelRegistry
 
-# Crear el pipeline de análisis de sentimientos
-sentiment_pipeline = pipeline("sentiment-analysis", model="nlptown/bert-base-multilingual-uncased-sentiment", framework="pt")
+MODEL_NAME = "nlptown/bert-base-multilingual-uncased-sentiment"
+MAX_LENGTH = 512
 
-def analyze_comments(comments):
+# Tamaño de lote y número de hilos para la inferencia (0 = valor por defecto del backend).
+# Con "onnx" los hilos son de la sesión de ONNX Runtime y solo afectan al modelo de sentimiento.
+# Con "pytorch" y "quantized" se aplica torch.set_num_threads, que es global del proceso:
+# también cambia los hilos de Whisper y de los embeddings que se ejecuten en el mismo worker.
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "32"))
+SENTIMENT_THREADS = int(os.getenv("SENTIMENT_THREADS", "0"))
+
+# Backend de inferencia:
+# - "pytorch": el modelo original en fp32.
+# - "quantized": cuantización dinámica int8 de las capas lineales (torch, solo CPU).
+# - "onnx": exportado a ONNX y ejecutado con ONNX Runtime (requiere `optimum[onnxruntime]`).
+SENTIMENT_BACKENDS = ("pytorch", "quantized", "onnx")
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "pytorch")
+
+
+def _cargar_modelo_sentimiento(model_name, backend):
+    # torch y transformers se importan aquí para que importar este módulo no cueste nada
+    # en los workers que nunca analizan comentarios
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    if SENTIMENT_THREADS and backend != "onnx":
+        torch.set_num_threads(SENTIMENT_THREADS)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    if backend == "pytorch":
+        model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    elif backend == "quantized":
+        model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif backend == "onnx":
+        try:
+            import onnxruntime
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+        except ImportError as e:
+            raise ImportError("El backend 'onnx' requiere instalar optimum[onnxruntime]") from e
+        opciones = onnxruntime.SessionOptions()
+        if SENTIMENT_THREADS:
+            opciones.intra_op_num_threads = SENTIMENT_THREADS
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True, session_options=opciones)
+    else:
+        raise ValueError(f"Backend de sentimiento no válido: {backend}")
+    return tokenizer, model
+
+
+# Cada (modelo, backend) se carga una sola vez por proceso, la primera vez que se necesita
+sentiment_models = ModelRegistry("sentiment", _cargar_modelo_sentimiento)
+
+
+def get_sentiment_model(backend=None):
+    """
+    Devuelve (tokenizer, model) del backend indicado, cargándolos la primera vez.
+    """
+    return sentiment_models.get(MODEL_NAME, backend or SENTIMENT_BACKEND)
+
+
+def warmup_sentiment():
+    """
+    Precarga el modelo de sentimiento si SENTIMENT_WARMUP=1.
+    """
+    if os.getenv("SENTIMENT_WARMUP", "0") == "1":
+        sentiment_models.warmup([(MODEL_NAME, SENTIMENT_BACKEND)])
+
+
+def _lotes_por_longitud(encodings, batch_size):
+    """
+    Agrupa los índices de los comentarios (claves de `encodings`) en lotes de longitud
+    parecida (length bucketing), para que el padding de cada lote sea mínimo.
+    """
+    orden = sorted(encodings, key=lambda i: len(encodings[i]["input_ids"]))
+    return [orden[i:i + batch_size] for i in range(0, len(orden), batch_size)]
+
+
+def _puntuar(tokenizer, model, encodings, lock_tokenizer):
+    """
+    Ejecuta el modelo sobre una lista de comentarios ya tokenizados y devuelve (estrellas, confianza).
+    """
+    import torch
+
+    with lock_tokenizer:
+        batch = tokenizer.pad(encodings, padding=True, return_tensors="pt")
+    with torch.inference_mode():
+        logits = model(**batch).logits
+    probabilidades = torch.softmax(logits, dim=-1)
+    scores, indices = probabilidades.max(dim=-1)
+    resultados = []
+    for score, indice in zip(scores.tolist(), indices.tolist()):
+        label = model.config.id2label[indice]
+        resultados.append((int(label.split(" ")[0]), score))  # Extraer las estrellas de la etiqueta (e.g., "5 stars")
+    return resultados
+
+
+def analyze_comments(comments, batch_size=None, backend=None):
     """
     Realiza análisis de sentimiento sobre una lista de comentarios y devuelve su valor en estrellas.
-    
+    Los comentarios se tokenizan y puntúan en lotes con padding, agrupados por longitud.
+
     Args:
         comments (list): Lista de comentarios (str).
-        
+        batch_size (int): Comentarios por lote (por defecto SENTIMENT_BATCH_SIZE).
+        backend (str): "pytorch", "quantized" u "onnx" (por defecto SENTIMENT_BACKEND).
+
     Returns:
         list: Lista de diccionarios con texto, estrellas y confianza.
     """
-    analyzed_comments = []
-    for comment in comments:
+    batch_size = batch_size or SENTIMENT_BATCH_SIZE
+    if not comments:
+        return []
+
+    backend = backend or SENTIMENT_BACKEND
+    tokenizer, model = get_sentiment_model(backend)
+    # El tokenizer se comparte entre los hilos del pool de CPU y no admite llamadas concurrentes
+    lock_tokenizer = sentiment_models.inference_lock(MODEL_NAME, backend)
+    inicio = time.perf_counter()
+
+    # Tokenizar con truncamiento, sin padding (se aplica por lote)
+    encodings = {}
+    with lock_tokenizer:
+        for indice, comment in enumerate(comments):
+            try:
+                encodings[indice] = tokenizer(comment, truncation=True, max_length=MAX_LENGTH)
+            except Exception as e:
+                print(f"Error analyzing comment: {str(comment)[:100]}... - {e}")
+    resultados = [None] * len(comments)
+
+    for lote in _lotes_por_longitud(encodings, batch_size):
         try:
-            # Realizar análisis de sentimiento con truncamiento
-            result = sentiment_pipeline(comment, truncation=True)
-            stars = int(result[0]["label"].split(" ")[0])  # Extraer las estrellas de la etiqueta (e.g., "5 stars")
-            analyzed_comments.append({
-                "text": comment[:500],  # Guardar texto truncado para no exceder 512 tokens
-                "stars": stars,
-                "confidence": result[0]["score"]
-            })
+            puntuaciones = _puntuar(tokenizer, model, [encodings[i] for i in lote], lock_tokenizer)
+            for indice, resultado in zip(lote, puntuaciones):
+                resultados[indice] = resultado
         except Exception as e:
-            print(f"Error analyzing comment: {comment[:100]}... - {e}")  # Mostrar solo una parte del comentario
+            print(f"Error analyzing comment batch, retrying one by one: {e}")
+            for indice in lote:
+                try:
+                    resultados[indice] = _puntuar(tokenizer, model, [encodings[indice]], lock_tokenizer)[0]
+                except Exception as e:
+                    print(f"Error analyzing comment: {comments[indice][:100]}... - {e}")  # Mostrar solo una parte del comentario
+
+    sentiment_models.record_inference((MODEL_NAME, backend), time.perf_counter() - inicio)
+
+    analyzed_comments = []
+    for comment, resultado in zip(comments, resultados):
+        if resultado is None:
+            continue
+        stars, confidence = resultado
+        analyzed_comments.append({
+            "text": comment[:500],  # Guardar texto truncado para no exceder 512 tokens
+            "stars": stars,
+            "confidence": confidence
+        })
     return analyzed_comments
+
+
+def check_backend_parity(comments, backend):
+    """
+    Compara un backend con el pipeline original de transformers (comentario a comentario).
+    Devuelve el porcentaje de estrellas coincidentes y las diferencias medias de estrellas y confianza.
+    """
+    from transformers import pipeline
+
+    if not comments:
+        raise ValueError("Se necesita al menos un comentario para comparar backends")
+    reference_pipeline = pipeline("sentiment-analysis", model=MODEL_NAME, framework="pt")
+    referencia = []
+    for comment in comments:
+        result = reference_pipeline(comment, truncation=True)
+        referencia.append((int(result[0]["label"].split(" ")[0]), result[0]["score"]))
+
+    candidatos = analyze_comments(comments, backend=backend)
+    if len(candidatos) != len(referencia):
+        raise ValueError("El backend no ha analizado todos los comentarios")
+
+    total = len(referencia)
+    return {
+        "backend": backend,
+        "comments": total,
+        "stars_agreement": sum(c["stars"] == r[0] for c, r in zip(candidatos, referencia)) / total,
+        "mean_abs_stars_diff": sum(abs(c["stars"] - r[0]) for c, r in zip(candidatos, referencia)) / total,
+        "mean_abs_confidence_diff": sum(abs(c["confidence"] - r[1]) for c, r in zip(candidatos, referencia)) / total,
+    }
@@ -1,10 +1,11 @@
 
 import os
 import re
-import requests
+from app.utils import http_client
 from dotenv import load_dotenv
 
 from app.utils.audio_processing import procesar_podcast
+from app.utils.executors import run_io
 
 load_dotenv()
 SPOTIFY_TOKEN = os.getenv("SPOTIFY_API_TOKEN")
@@ -22,7 +23,7 @@ def _extract_show_id(spotify_url: str) -> str:
         return match.group(1)
     raise ValueError("No se pudo extraer show_id del URL de Spotify")
 
-def fetch_show_data(spotify_url: str):
+async def fetch_show_data(spotify_url: str):
     """
     Obtiene datos principales del podcast (show) desde la API de Spotify.
     Incluye: nombre, descripción, publisher, followers, total_episodes, etc. (si están disponibles).
@@ -32,7 +33,7 @@ def fetch_show_data(spotify_url: str):
 
     url = f"{BASE_SPOTIFY_URL}/shows/{show_id}"
     params = {"market": "ES"}  # o la que corresponda
-    resp = requests.get(url, headers=headers, params=params)
+    resp = await http_client.get(url, headers=headers, params=params)
     if resp.status_code != 200:
         raise ValueError(f"Error al obtener datos del show: {resp.text}")
 
@@ -52,7 +53,7 @@ def fetch_show_data(spotify_url: str):
     }
     return show_info
 
-def fetch_episodes_for_show(show_id: str, limit: int = 5):
+async def fetch_episodes_for_show(show_id: str, limit: int = 5):
     """
     Devuelve la lista de episodios (hasta 'limit') con campos: id, name, description, release_date, etc.
     """
@@ -63,7 +64,7 @@ def fetch_episodes_for_show(show_id: str, limit: int = 5):
         "limit": limit
     }
 
-    resp = requests.get(url, headers=headers, params=params)
+    resp = await http_client.get(url, headers=headers, params=params)
     if resp.status_code != 200:
         raise ValueError(f"Error al obtener episodios del show: {resp.text}")
 
@@ -88,7 +89,7 @@ def fetch_episodes_for_show(show_id: str, limit: int = 5):
 
     return episodes_data
 
-def analyze_spotify_podcast(spotify_url: str, episodes_limit=5):
+async def analyze_spotify_podcast(spotify_url: str, episodes_limit=5):
     """
     Función principal que:
       1) Obtiene la info del show
@@ -97,10 +98,10 @@ def analyze_spotify_podcast(spotify_url: str, episodes_limit=5):
       4) Retorna un dict con toda la info (similar a lo que hace youtube_api).
     """
     try:
-        show_info = fetch_show_data(spotify_url)
+        show_info = await fetch_show_data(spotify_url)
         show_id = show_info["show_id"]
 
-        episodes_list = fetch_episodes_for_show(show_id, limit=episodes_limit)
+        episodes_list = await fetch_episodes_for_show(show_id, limit=episodes_limit)
         show_info["episodes"] = episodes_list
 
         # Procesar el último episodio (similar a youtube_api que procesa el "videos[0]")
@@ -110,7 +111,7 @@ def analyze_spotify_podcast(spotify_url: str, episodes_limit=5):
             # Ojo: audio_preview_url es frecuentemente un snippet de 30s, no todo el podcast.
             # Si tienes la URL real del MP3, reemplaza en tu DB/flujo.
             if audio_url:
-                processed_data = procesar_podcast(audio_url)
+                processed_data = await run_io(procesar_podcast, audio_url)
                 if processed_data:
                     latest_ep["summary"] = processed_data["summary"]
                     latest_ep["wordcount"] = processed_data["wordcount"]
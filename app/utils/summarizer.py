@@ -0,0 +1,144 @@
+import os
+import re
+import asyncio
+import logging
+from app.utils.cache import LRUCache, DiskCache, TieredCache, cache_key
+from app.utils.openai_client import chat_completion
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-3.5-turbo")
+# Por debajo de este tamaño el texto se resume en una sola llamada
+SUMMARY_SINGLE_PASS_TOKENS = int(os.getenv("SUMMARY_SINGLE_PASS_TOKENS", "6000"))
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
+SUMMARY_OVERLAP_TOKENS = int(os.getenv("SUMMARY_OVERLAP_TOKENS", "200"))
+SUMMARY_MAX_TOKENS = 512
+SUMMARY_CHUNK_MAX_TOKENS = 300
+
+SYSTEM_PROMPT = "Eres un asistente que proporciona resúmenes de textos."
+PROMPT_RESUMEN = "Resume el siguiente texto en español manteniendo las ideas clave:\n\n{texto}"
+PROMPT_CHUNK = (
+    "El siguiente texto es un fragmento de la transcripción de un video sobre perfumes. "
+    "Resume en español sus ideas clave, conservando los perfumes, marcas y opiniones mencionados:\n\n{texto}"
+)
+PROMPT_REDUCE = (
+    "Los siguientes textos son resúmenes parciales y consecutivos de un mismo video. "
+    "Combínalos en un único resumen en español, sin repeticiones y manteniendo las ideas clave:\n\n{texto}"
+)
+
+# Los resúmenes de cada fragmento se cachean por (modelo, prompt, fragmento): si solo cambia
+# el prompt de reducción, no se vuelve a resumir ningún fragmento
+_chunk_cache = TieredCache(
+    LRUCache(maxsize=int(os.getenv("SUMMARY_CACHE_SIZE", "1024"))),
+    DiskCache(os.getenv("SUMMARY_CACHE_DIR", os.path.join("cache", "summaries")))
+    if os.getenv("SUMMARY_CACHE_PERSIST", "1") == "1" else None,
+)
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+
+def contar_tokens(texto):
+    """
+    Número de tokens del texto (tiktoken si está instalado; si no, ~4 caracteres por token).
+    """
+    if _encoding is not None:
+        return len(_encoding.encode(texto))
+    return max(1, len(texto) // 4)
+
+
+def _unidades(texto, max_tokens):
+    """
+    Divide el texto en frases; las frases más largas que `max_tokens` (p. ej. subtítulos
+    automáticos sin puntuación) se dividen por palabras.
+    """
+    for frase in re.split(r"(?<=[.!?…])\s+", texto.strip()):
+        if not frase:
+            continue
+        if contar_tokens(frase) <= max_tokens:
+            yield frase
+            continue
+        palabras = frase.split()
+        # Estimación de palabras por ventana a partir de la densidad de tokens de la frase
+        por_ventana = max(1, int(len(palabras) * max_tokens / contar_tokens(frase)))
+        for inicio in range(0, len(palabras), por_ventana):
+            yield " ".join(palabras[inicio:inicio + por_ventana])
+
+
+def dividir_en_chunks(texto, max_tokens=SUMMARY_CHUNK_TOKENS, overlap_tokens=SUMMARY_OVERLAP_TOKENS):
+    """
+    Divide un texto en fragmentos de como máximo ~`max_tokens`, cortando por frases,
+    con un solapamiento de ~`overlap_tokens` entre fragmentos consecutivos.
+    """
+    chunks = []
+    actual, tokens_actual = [], 0
+    for unidad in _unidades(texto, max_tokens - overlap_tokens):
+        tokens = contar_tokens(unidad)
+        if actual and tokens_actual + tokens > max_tokens:
+            chunks.append(" ".join(actual))
+            # Arrastrar las últimas frases como contexto del siguiente fragmento
+            solape, tokens_solape = [], 0
+            for previa in reversed(actual):
+                tokens_previa = contar_tokens(previa)
+                if tokens_solape + tokens_previa > overlap_tokens:
+                    break
+                solape.insert(0, previa)
+                tokens_solape += tokens_previa
+            actual, tokens_actual = solape, tokens_solape
+        actual.append(unidad)
+        tokens_actual += tokens
+    if actual:
+        chunks.append(" ".join(actual))
+    return chunks
+
+
+async def _completar(prompt, texto, max_tokens):
+    response = await chat_completion(
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt.format(texto=texto)}
+        ],
+        max_tokens=max_tokens,
+        temperature=0.7
+    )
+    return response.choices[0].message.content.strip()
+
+
+async def _resumir_chunk(chunk):
+    clave = cache_key(SUMMARY_MODEL, PROMPT_CHUNK, chunk)
+    resumen = _chunk_cache.get(clave)
+    if resumen is None:
+        resumen = await _completar(PROMPT_CHUNK, chunk, SUMMARY_CHUNK_MAX_TOKENS)
+        _chunk_cache.set(clave, resumen)
+    return resumen
+
+
+async def resumir_async(texto):
+    """
+    Resume un texto de cualquier longitud.
+    - Si cabe en una llamada, se resume directamente.
+    - Si no, se divide en fragmentos solapados que se resumen en paralelo (map) y luego
+      se combinan los resúmenes parciales (reduce), de forma recursiva si no caben.
+    """
+    if contar_tokens(texto) <= SUMMARY_SINGLE_PASS_TOKENS:
+        return await _completar(PROMPT_RESUMEN, texto, SUMMARY_MAX_TOKENS)
+
+    parciales = list(await asyncio.gather(*(_resumir_chunk(chunk) for chunk in dividir_en_chunks(texto))))
+    logger.info(f"Resumen map-reduce: {len(parciales)} fragmentos")
+
+    # Si los resúmenes parciales siguen sin caber, se vuelven a resumir por grupos
+    while contar_tokens("\n\n".join(parciales)) > SUMMARY_SINGLE_PASS_TOKENS and len(parciales) > 1:
+        grupos = dividir_en_chunks("\n\n".join(parciales), overlap_tokens=0)
+        if len(grupos) >= len(parciales):
+            break
+        parciales = list(await asyncio.gather(*(_resumir_chunk(grupo) for grupo in grupos)))
+
+    return await _completar(PROMPT_REDUCE, "\n\n".join(parciales), SUMMARY_MAX_TOKENS)
+
+
+def summary_cache_stats():
+    return _chunk_cache.stats()
@@ -1,10 +1,13 @@
-import nltk
-from nltk.corpus import stopwords
+import os
+import re
 from collections import Counter
-import string
+from functools import lru_cache
+from app.utils.catalog import get_catalog
+from app.utils.model_registry import ModelRegistry
 
-# Descargar stopwords si no están descargadas
-nltk.download("stopwords")
+# Stopwords incluidas en el repositorio (mismo formato que el corpus de NLTK: una por línea).
+# Para otros idiomas se usa el corpus de NLTK si ya está descargado (el Dockerfile lo descarga al construir)
+STOPWORDS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "stopwords")
 
 # Lista ampliada de stopwords (adicionales)
 stopwords_adicionales = [
@@ -46,73 +49,182 @@ stopwords_adicionales = [
 ]
 
 
-# Función para limpiar el texto y contar las palabras
-def limpiar_y_contar(texto, idioma="spanish"):
+WORDCOUNT_TOP = 20
+# Lematizar con spaCy (es_core_news_lg) antes de contar: "perfumes" y "perfume" cuentan juntas
+WORDCOUNT_LEMMATIZE = os.getenv("WORDCOUNT_LEMMATIZE", "0") == "1"
+WORDCOUNT_SPACY_MODEL = os.getenv("WORDCOUNT_SPACY_MODEL", "es_core_news_lg")
+# Tamaño de los bloques de texto que se pasan a spaCy (su límite por documento es 1M de caracteres)
+WORDCOUNT_BLOCK_CHARS = 100_000
+
+# \w+ separa también los signos que string.punctuation no incluye (¿ ¡ « » … “ ”)
+_TOKEN = re.compile(r"\w+")
+
+
+def _cargar_stopwords(idioma):
+    try:
+        with open(os.path.join(STOPWORDS_DIR, idioma), encoding="utf-8") as f:
+            return [linea.strip() for linea in f if linea.strip()]
+    except FileNotFoundError:
+        pass
+    try:
+        # Nunca se llama a nltk.download en tiempo de ejecución
+        from nltk.corpus import stopwords
+        return stopwords.words(idioma)
+    except (ImportError, LookupError, OSError) as e:
+        print(f"No hay stopwords disponibles para '{idioma}', se usan solo las adicionales: {e}")
+        return []
+
+
+@lru_cache(maxsize=None)
+def get_stopwords(idioma="spanish"):
     """
-    Limpia el texto eliminando stopwords y realiza un conteo de palabras.
+    Conjunto inmutable de stopwords del idioma más las adicionales, calculado una vez por idioma.
     """
-    try:
-        # Convertir a minúsculas y eliminar puntuación
-        texto = texto.lower()
-        texto = texto.translate(str.maketrans("", "", string.punctuation))
+    return frozenset(_cargar_stopwords(idioma)) | frozenset(stopwords_adicionales)
+
+
+def _cargar_spacy(model_name):
+    import spacy
+
+    return spacy.load(model_name, disable=["parser", "ner"])
+
+
+spacy_models = ModelRegistry("spacy", _cargar_spacy, max_modelos=1)
+
+
+def iter_tokens(fuente):
+    """
+    Genera las palabras en minúsculas de un texto o de un iterable de bloques de texto
+    (p. ej. un fichero abierto), sin materializar copias del texto completo.
+    Una palabra partida entre dos bloques se une antes de emitirla.
+    """
+    if isinstance(fuente, str):
+        for match in _TOKEN.finditer(fuente):
+            yield match.group().lower()
+        return
+
+    resto = ""
+    for bloque in fuente:
+        bloque = resto + bloque
+        resto = ""
+        anterior = None
+        for match in _TOKEN.finditer(bloque):
+            if anterior is not None:
+                yield anterior.group().lower()
+            anterior = match
+        if anterior is not None:
+            if anterior.end() == len(bloque):
+                resto = anterior.group()
+            else:
+                yield anterior.group().lower()
+    if resto:
+        yield resto.lower()
+
+
+def _bloques(texto, tamano=WORDCOUNT_BLOCK_CHARS):
+    """
+    Divide un texto en bloques de ~`tamano` caracteres cortando en un espacio.
+    """
+    inicio = 0
+    while inicio < len(texto):
+        fin = min(len(texto), inicio + tamano)
+        if fin < len(texto):
+            espacio = texto.rfind(" ", inicio, fin)
+            fin = espacio + 1 if espacio > inicio else fin
+        yield texto[inicio:fin]
+        inicio = fin
+
+
+def _contar_tokens(tokens, stop_words, conteo=None):
+    conteo = Counter() if conteo is None else conteo
+    conteo.update(token for token in tokens if token not in stop_words)
+    return conteo
+
+
+def _lemas(doc, stop_words):
+    # Se filtra por la forma original y por el lema ("tengo" -> "tener")
+    for token in doc:
+        if token.is_punct or token.is_space:
+            continue
+        forma = token.lower_
+        if forma in stop_words:
+            continue
+        lema = token.lemma_.lower()
+        if lema not in stop_words:
+            yield lema
+
+
+def contar_palabras(fuente, idioma="spanish", lematizar=None, top=WORDCOUNT_TOP):
+    """
+    Cuenta las palabras de un texto (o iterable de bloques de texto) sin stopwords.
+    Devuelve las `top` más frecuentes como lista de tuplas (palabra, conteo).
+    """
+    stop_words = get_stopwords(idioma)
+    if not (WORDCOUNT_LEMMATIZE if lematizar is None else lematizar):
+        return _contar_tokens(iter_tokens(fuente), stop_words).most_common(top)
 
-        # Dividir el texto en palabras
-        palabras = texto.split()
+    nlp = spacy_models.get(WORDCOUNT_SPACY_MODEL)
+    bloques = _bloques(fuente) if isinstance(fuente, str) else fuente
+    conteo = Counter()
+    for doc in nlp.pipe(bloques):
+        conteo.update(_lemas(doc, stop_words))
+    return conteo.most_common(top)
 
-        # Cargar las stopwords en el idioma especificado
-        stop_words = set(stopwords.words(idioma)) | set(stopwords_adicionales)  # Unimos las stopwords por idioma con las adicionales
 
-        # Filtrar stopwords
-        palabras_filtradas = [palabra for palabra in palabras if palabra not in stop_words]
+def contar_palabras_lote(textos, idioma="spanish", lematizar=None, top=WORDCOUNT_TOP, n_process=1):
+    """
+    Cuenta las palabras de muchas transcripciones a la vez. Con lematización, todos los
+    bloques de todos los textos pasan por un único `nlp.pipe` (opcionalmente en varios procesos).
+    Devuelve una lista de resultados en el orden de `textos`.
+    """
+    stop_words = get_stopwords(idioma)
+    if not (WORDCOUNT_LEMMATIZE if lematizar is None else lematizar):
+        return [_contar_tokens(iter_tokens(texto), stop_words).most_common(top) for texto in textos]
 
-        # Contar la frecuencia de palabras
-        conteo = Counter(palabras_filtradas)
+    nlp = spacy_models.get(WORDCOUNT_SPACY_MODEL)
+    conteos = [Counter() for _ in textos]
+    bloques = ((bloque, indice) for indice, texto in enumerate(textos) for bloque in _bloques(texto))
+    for doc, indice in nlp.pipe(bloques, as_tuples=True, n_process=n_process):
+        conteos[indice].update(_lemas(doc, stop_words))
+    return [conteo.most_common(top) for conteo in conteos]
 
-        # Retornar los conteos como una lista de tuplas
-        return conteo.most_common(20)
 
+# Función para limpiar el texto y contar las palabras
+def limpiar_y_contar(texto, idioma="spanish"):
+    """
+    Limpia el texto eliminando stopwords y realiza un conteo de palabras.
+    """
+    try:
+        return contar_palabras(texto, idioma)
     except Exception as e:
         print(f"Error al limpiar y contar palabras: {e}")
         return None
 
 
-
-
-# En text_analysis.py
 class TextAnalyzer:
-    def __init__(self):
-        self.PERFUME_BRANDS = [
-    # Marcas comerciales populares
-    "Tom Ford", "Dior", "Chanel", "Gucci", "Yves Saint Laurent", "Versace", "Hermès", 
-    "Prada", "Dolce & Gabbana", "Givenchy", "Burberry", "Armani", "Hugo Boss", "Calvin Klein",
-    "Lacoste", "Marc Jacobs", "Ralph Lauren", "Paco Rabanne", "Carolina Herrera", 
-    "Jean Paul Gaultier", "Valentino", "Balenciaga", "Bulgari", "Fendi", "Lancome", 
-    "Victoria's Secret", "tom ford", 'dior', 'chanel', 'gucci', 'yves saint laurent', 'versace', 'hermes',
-    'prada', 'dolce & gabbana', 'givenchy', 'burberry', 'armani', 'hugo boss', 'calvin klein', 
-    'lacoste', 'marc jacobs', 'ralph lauren', 'paco rabanne', 'carolina herrera', 'jean paul gaultier', 'Zara', 'Mercadona',
-
-    # Marcas de nicho
-    "Amouage", "Creed", "Maison Francis Kurkdjian", "Byredo", "Le Labo", "Diptyque", 
-    "Frederic Malle", "Jo Malone", "Penhaligon's", "Aesop", "Xerjoff", "Clive Christian", 
-    "Parfums de Marly", "Roja Parfums", "Mancera", "Montale", "Initio", "Tiziana Terenzi", 
-    "Nishane", "Serge Lutens", "Comme des Garçons", "Etat Libre d'Orange", "Zoologist", 
-    "Acqua di Parma", "BDK Parfums", "Carner Barcelona", "Memo Paris", "Floris London",
-    
-    # Otros nichos relevantes
-    "Bond No.9", "Vilhelm Parfumerie", "Histoires de Parfums", "Masque Milano", 
-    "The Different Company", "Atelier Cologne", "Maison Margiela", "Ormonde Jayne", 
-    "House of Oud", "Olfactive Studio", "The Harmonist"
-]
+    """
+    Detección de marcas en transcripciones. Las marcas, sus alias y los perfumes están en el
+    catálogo compartido (app/data/catalog.json), que se recarga sin reiniciar los workers.
+    """
+
+    @property
+    def PERFUME_BRANDS(self):
+        return list(get_catalog().brand_names)
 
-    
     def find_brands_in_transcription(self, transcription):
-        detected_brands = []
-        transcription_lower = transcription.lower()
-        
-        for brand in self.PERFUME_BRANDS:
-            if brand.lower() in transcription_lower:
-                detected_brands.append(brand)
-        
-        return detected_brands
-    
-   
\ No newline at end of file
+        """
+        Devuelve las marcas mencionadas en la transcripción (sin duplicados, en orden de aparición).
+        """
+        return list(self.find_brand_occurrences(transcription))
+
+    def find_brand_occurrences(self, transcription):
+        """
+        Devuelve {marca: {"count": n, "offsets": [(inicio, fin), ...]}} para cada marca mencionada.
+        """
+        return get_catalog().find_brands(transcription)
+
+    def find_perfumes_in_transcription(self, transcription):
+        """
+        Devuelve los perfumes del catálogo mencionados: [{"name", "brand", "count", "offsets"}, ...].
+        """
+        return get_catalog().find_perfumes(transcription)
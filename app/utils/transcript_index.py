@@ -0,0 +1,142 @@
+import os
+import logging
+import tempfile
+import numpy as np
+from app.utils.cache import LRUCache, cache_key
+from app.utils.model_registry import ModelRegistry
+from app.utils.summarizer import dividir_en_chunks, contar_tokens
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+RETRIEVAL_CHUNK_TOKENS = int(os.getenv("RETRIEVAL_CHUNK_TOKENS", "200"))
+RETRIEVAL_OVERLAP_TOKENS = int(os.getenv("RETRIEVAL_OVERLAP_TOKENS", "40"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+# Las transcripciones más cortas que esto se envían completas (no merece la pena recuperar)
+RETRIEVAL_FULL_TEXT_TOKENS = int(os.getenv("RETRIEVAL_FULL_TEXT_TOKENS", "1500"))
+INDEX_CACHE_DIR = os.getenv("INDEX_CACHE_DIR", os.path.join("cache", "indexes"))
+
+
+def _cargar_modelo_embeddings(model_name):
+    from transformers import AutoTokenizer, AutoModel
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    return tokenizer, model
+
+
+embedding_models = ModelRegistry("embeddings", _cargar_modelo_embeddings)
+
+
+def embed(textos):
+    """
+    Calcula embeddings normalizados (mean pooling) para una lista de textos.
+    """
+    import torch
+
+    tokenizer, model = embedding_models.get(EMBEDDING_MODEL)
+    # El fast tokenizer compartido no admite llamadas concurrentes ("Already borrowed")
+    lock_tokenizer = embedding_models.inference_lock(EMBEDDING_MODEL)
+    vectores = []
+    for inicio in range(0, len(textos), EMBEDDING_BATCH_SIZE):
+        with lock_tokenizer:
+            batch = tokenizer(
+                textos[inicio:inicio + EMBEDDING_BATCH_SIZE],
+                padding=True, truncation=True, max_length=256, return_tensors="pt"
+            )
+        with torch.inference_mode():
+            salida = model(**batch).last_hidden_state
+        mascara = batch["attention_mask"].unsqueeze(-1).to(salida.dtype)
+        medias = (salida * mascara).sum(dim=1) / mascara.sum(dim=1).clamp(min=1e-9)
+        vectores.append(torch.nn.functional.normalize(medias, dim=-1).numpy())
+    return np.vstack(vectores).astype(np.float32)
+
+
+class TranscriptIndex:
+    """
+    Índice vectorial de los fragmentos de una transcripción (similitud coseno, búsqueda exacta).
+    """
+
+    def __init__(self, chunks, embeddings):
+        self.chunks = chunks
+        self.embeddings = embeddings
+
+    @classmethod
+    def build(cls, transcription):
+        chunks = dividir_en_chunks(transcription, RETRIEVAL_CHUNK_TOKENS, RETRIEVAL_OVERLAP_TOKENS)
+        return cls(chunks, embed(chunks))
+
+    def search(self, query, k=RETRIEVAL_TOP_K):
+        """
+        Devuelve los `k` fragmentos más relevantes para la consulta, en el orden de la transcripción.
+        """
+        puntuaciones = self.embeddings @ embed([query])[0]
+        mejores = np.argsort(-puntuaciones)[:k]
+        return [self.chunks[i] for i in sorted(mejores)]
+
+    def save(self, ruta):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        # Temporal único: dos construcciones simultáneas del mismo índice no escriben en el mismo fichero
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp.npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, chunks=np.array(self.chunks), embeddings=self.embeddings)
+            os.replace(tmp, ruta)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    @classmethod
+    def load(cls, ruta):
+        with np.load(ruta, allow_pickle=False) as datos:
+            return cls([str(c) for c in datos["chunks"]], datos["embeddings"])
+
+
+_indices = LRUCache(maxsize=int(os.getenv("INDEX_CACHE_SIZE", "64")))
+
+
+def get_transcript_index(video_id, transcription):
+    """
+    Devuelve el índice de la transcripción de un video: desde memoria, desde disco
+    o construyéndolo (una sola vez por transcripción y modelo de embeddings).
+    """
+    clave = cache_key(video_id, EMBEDDING_MODEL, transcription)
+    indice = _indices.get(clave)
+    if indice is not None:
+        return indice
+
+    ruta = os.path.join(INDEX_CACHE_DIR, f"{clave}.npz")
+    try:
+        indice = TranscriptIndex.load(ruta)
+    except FileNotFoundError:
+        indice = None
+    except Exception as e:
+        logger.warning(f"Índice en disco corrupto para {video_id}: {e}")
+        indice = None
+
+    if indice is None:
+        logger.info(f"Construyendo índice de la transcripción de {video_id}...")
+        indice = TranscriptIndex.build(transcription)
+        try:
+            indice.save(ruta)
+        except Exception as e:
+            logger.error(f"Error al guardar el índice de {video_id}: {e}")
+
+    _indices.set(clave, indice)
+    return indice
+
+
+def contexto_para_pregunta(video_id, transcription, question, k=RETRIEVAL_TOP_K):
+    """
+    Devuelve el texto a enviar al LLM para responder `question`: la transcripción completa
+    si es corta, o solo los `k` fragmentos más relevantes.
+    """
+    if contar_tokens(transcription) <= RETRIEVAL_FULL_TEXT_TOKENS:
+        return transcription
+    return "\n[...]\n".join(get_transcript_index(video_id, transcription).search(question, k))
+
+
+def index_cache_stats():
+    return _indices.stats()
@@ -0,0 +1,51 @@
+import os
+from app.utils.cache import LRUCache, DiskCache, TieredCache, cache_key
+
+# Fuentes de transcripción (forman parte de la clave)
+YOUTUBE_TRANSCRIPT_SOURCE = "youtube_transcript_api:es"
+
+
+def asr_source(engine, model):
+    return f"{engine}:{model}"
+
+
+def whisper_source(model_size):
+    return asr_source("whisper", model_size)
+
+
+_cache = TieredCache(
+    LRUCache(maxsize=int(os.getenv("TRANSCRIPTION_CACHE_SIZE", "256"))),
+    DiskCache(os.getenv("TRANSCRIPTION_CACHE_DIR", os.path.join("cache", "transcriptions")))
+    if os.getenv("TRANSCRIPTION_CACHE_PERSIST", "1") == "1" else None,
+)
+
+
+def get_transcription(video_id, source):
+    """
+    Devuelve la transcripción guardada para (video_id, fuente) o None.
+    """
+    return _cache.get(cache_key(video_id, source))
+
+
+def get_first_transcription(video_id, sources):
+    """
+    Devuelve la primera transcripción guardada entre varias fuentes, por orden de preferencia.
+    """
+    for source in sources:
+        transcription = get_transcription(video_id, source)
+        if transcription:
+            return transcription
+    return None
+
+
+def save_transcription(video_id, source, transcription):
+    if transcription:
+        _cache.set(cache_key(video_id, source), transcription)
+
+
+def invalidate_transcription(video_id, source):
+    _cache.delete(cache_key(video_id, source))
+
+
+def transcription_cache_stats():
+    return _cache.stats()
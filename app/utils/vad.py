@@ -0,0 +1,190 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from functools import lru_cache
+import numpy as np
+from app.utils.long_audio import SAMPLE_RATE, FRAME_MS, energia_por_trama
+
+logger = logging.getLogger(__name__)
+
+# Detección de voz antes del ASR: solo se transcriben las regiones con voz
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1") == "1"
+# "silero" (el modelo ONNX que incluye faster-whisper; distingue voz de música),
+# "energy" (solo numpy) o "auto" (silero si está instalado)
+VAD_BACKEND = os.getenv("VAD_BACKEND", "auto")
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "250"))
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "700"))
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "200"))
+# Silencio que se deja entre regiones al concatenarlas, para que el ASR no junte frases
+VAD_GAP_MS = int(os.getenv("VAD_GAP_MS", "300"))
+# Detector por energía: umbral sobre el ruido de fondo (percentil 10) y suelo absoluto en dBFS
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "10"))
+VAD_MIN_DB = float(os.getenv("VAD_MIN_DB", "-55"))
+# La voz alterna sílabas y pausas, así que su energía varía mucho en 1 s; la música de fondo
+# es más estable. Desviación típica mínima (dB) para considerar voz (0 = no se comprueba)
+VAD_MODULATION_DB = float(os.getenv("VAD_MODULATION_DB", "3"))
+
+_lock = threading.Lock()
+_metricas = {"calls": 0, "audio_seconds": 0.0, "speech_seconds": 0.0, "vad_seconds": 0.0}
+
+
+def _tramas(ms):
+    return max(1, int(round(ms / FRAME_MS)))
+
+
+def _tramos(activo):
+    """
+    Devuelve los tramos [(inicio, fin)) de valores True consecutivos.
+    """
+    bordes = np.diff(np.concatenate(([0], activo.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(bordes == 1).tolist(), np.flatnonzero(bordes == -1).tolist()))
+
+
+def _desviacion_movil(valores, ventana):
+    # Desviación típica en una ventana centrada, con sumas acumuladas (O(n))
+    relleno = np.pad(valores.astype(np.float64), (ventana // 2, ventana - 1 - ventana // 2), mode="edge")
+    suma = np.cumsum(np.concatenate(([0.0], relleno)))
+    suma2 = np.cumsum(np.concatenate(([0.0], relleno * relleno)))
+    media = (suma[ventana:] - suma[:-ventana]) / ventana
+    varianza = (suma2[ventana:] - suma2[:-ventana]) / ventana - media * media
+    return np.sqrt(np.maximum(varianza, 0.0))
+
+
+def _regiones_energia(audio, sample_rate=SAMPLE_RATE):
+    energia = energia_por_trama(audio, sample_rate, FRAME_MS)
+    if not len(energia):
+        return []
+    umbral = max(float(np.percentile(energia, 10)) + VAD_MARGIN_DB, VAD_MIN_DB)
+    activo = energia > umbral
+    if VAD_MODULATION_DB:
+        activo &= _desviacion_movil(energia, _tramas(1000)) > VAD_MODULATION_DB
+
+    # Las pausas cortas entre palabras no parten la región
+    for inicio, fin in _tramos(~activo):
+        if inicio > 0 and fin < len(activo) and fin - inicio < _tramas(VAD_MIN_SILENCE_MS):
+            activo[inicio:fin] = True
+
+    muestras = int(sample_rate * FRAME_MS / 1000)
+    margen = _tramas(VAD_PAD_MS)
+    # Al empezar o acabar la música la energía cambia de golpe y la desviación también es alta
+    # durante ~medio segundo: con la comprobación de modulación, las regiones duran al menos la ventana
+    minimo = _tramas(max(VAD_MIN_SPEECH_MS, 1000 if VAD_MODULATION_DB else 0))
+    regiones = []
+    for inicio, fin in _tramos(activo):
+        if fin - inicio < minimo:
+            continue
+        inicio, fin = max(0, inicio - margen) * muestras, min(len(energia), fin + margen) * muestras
+        if fin == len(energia) * muestras:
+            fin = len(audio)
+        if regiones and inicio <= regiones[-1][1]:
+            regiones[-1] = (regiones[-1][0], fin)
+        else:
+            regiones.append((inicio, fin))
+    return regiones
+
+
+def _regiones_silero(audio, sample_rate=SAMPLE_RATE):
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    opciones = VadOptions(
+        min_speech_duration_ms=VAD_MIN_SPEECH_MS,
+        min_silence_duration_ms=VAD_MIN_SILENCE_MS,
+        speech_pad_ms=VAD_PAD_MS,
+    )
+    return [(r["start"], r["end"]) for r in get_speech_timestamps(audio, opciones, sampling_rate=sample_rate)]
+
+
+@lru_cache(maxsize=None)
+def vad_backend():
+    """
+    Detector configurado en VAD_BACKEND; con "auto", silero si faster-whisper está instalado.
+    """
+    if VAD_BACKEND != "auto":
+        return VAD_BACKEND
+    try:
+        import faster_whisper.vad  # noqa: F401
+        return "silero"
+    except ImportError:
+        return "energy"
+
+
+def detectar_voz(audio, sample_rate=SAMPLE_RATE):
+    """
+    Devuelve las regiones con voz del audio (float32 mono) como [(inicio, fin)] en muestras.
+    """
+    if vad_backend() == "silero":
+        return _regiones_silero(audio, sample_rate)
+    return _regiones_energia(audio, sample_rate)
+
+
+def recortar(audio, regiones, sample_rate=SAMPLE_RATE):
+    """
+    Concatena las regiones con voz separadas por VAD_GAP_MS de silencio.
+    Devuelve (audio recortado, mapa de offsets [(inicio_recortado_s, inicio_original_s, duracion_s)]).
+    """
+    hueco = np.zeros(int(sample_rate * VAD_GAP_MS / 1000), dtype=audio.dtype)
+    partes, mapa, posicion = [], [], 0
+    for inicio, fin in regiones:
+        if partes:
+            partes.append(hueco)
+            posicion += len(hueco)
+        partes.append(audio[inicio:fin])
+        mapa.append((posicion / sample_rate, inicio / sample_rate, (fin - inicio) / sample_rate))
+        posicion += fin - inicio
+    return (np.concatenate(partes) if partes else audio[:0]), mapa
+
+
+def restaurar_tiempos(segmentos, mapa):
+    """
+    Pasa las marcas de tiempo de los segmentos del audio recortado al audio original.
+    Los instantes que caen en un hueco añadido se llevan al final de la región anterior.
+    """
+    inicios = [inicio for inicio, _, _ in mapa]
+
+    def original(t):
+        i = max(bisect.bisect_right(inicios, t) - 1, 0)
+        inicio_recortado, inicio_original, duracion = mapa[i]
+        return inicio_original + min(max(t - inicio_recortado, 0.0), duracion)
+
+    if not mapa:
+        return segmentos
+    return [{**s, "start": original(s["start"]), "end": original(s["end"])} for s in segmentos]
+
+
+def aplicar_vad(audio, sample_rate=SAMPLE_RATE):
+    """
+    Detecta la voz y recorta el audio. Devuelve (audio recortado, mapa de offsets, fracción omitida).
+    """
+    inicio = time.perf_counter()
+    regiones = detectar_voz(audio, sample_rate)
+    recortado, mapa = recortar(audio, regiones, sample_rate)
+    duracion = time.perf_counter() - inicio
+
+    total_s = len(audio) / sample_rate
+    voz_s = float(sum(fin - ini for ini, fin in regiones)) / sample_rate
+    omitida = 1 - voz_s / total_s if total_s else 0.0
+    with _lock:
+        _metricas["calls"] += 1
+        _metricas["audio_seconds"] += total_s
+        _metricas["speech_seconds"] += voz_s
+        _metricas["vad_seconds"] += duracion
+    logger.info(
+        f"VAD ({vad_backend()}): {len(regiones)} regiones de voz, {omitida:.0%} de {total_s:.0f}s omitido "
+        f"en {duracion:.2f}s"
+    )
+    return recortado, mapa, omitida
+
+
+def vad_stats():
+    with _lock:
+        metricas = dict(_metricas)
+    return {
+        "enabled": VAD_ENABLED,
+        "backend": vad_backend() if VAD_ENABLED else None,
+        **{clave: round(valor, 2) for clave, valor in metricas.items()},
+        "skipped_fraction": (
+            round(1 - metricas["speech_seconds"] / metricas["audio_seconds"], 4) if metricas["audio_seconds"] else None
+        ),
+    }
@@ -0,0 +1,186 @@
+import os
+import asyncio
+import logging
+from app.utils.cache import LRUCache, cache_key
+from app.utils.catalog import get_catalog
+from app.utils.text_analysis import limpiar_y_contar
+from app.utils.perfume_extraction import extract_perfume_records_async, to_perfume_analysis, to_perfume_parameters
+from app.utils.executors import run_cpu, run_sync
+from app.utils.audio_processing import obtener_transcripcion_async, puntuar_texto_en_espanol, generar_resumen_async
+
+logger = logging.getLogger(__name__)
+
+# Artefactos que puede pedir un endpoint y de qué artefactos depende cada uno
+DEPENDENCIAS = {
+    "transcript": (),
+    "punctuated_text": ("transcript",),
+    "summary": ("punctuated_text",),
+    # Perfumes y parámetros salen de una única llamada de extracción
+    "extraction": ("transcript",),
+    "perfumes": ("extraction",),
+    "parameters": ("extraction",),
+    "brands": ("transcript",),
+    "wordcount": ("transcript",),
+}
+
+# Resultados memoizados por (artefacto, transcripción): una misma transcripción nunca
+# vuelve a pasar por la misma etapa mientras siga en la caché
+_memo = LRUCache(maxsize=int(os.getenv("PIPELINE_CACHE_SIZE", "512")))
+
+
+# Las etapas son corrutinas: las llamadas a OpenAI independientes entre sí
+# (resumen, extracción de perfumes) se ejecutan en paralelo
+
+async def _etapa_punctuated_text(artefactos):
+    return puntuar_texto_en_espanol(artefactos["transcript"])
+
+
+async def _etapa_summary(artefactos):
+    return await generar_resumen_async(artefactos["punctuated_text"])
+
+
+async def _etapa_extraction(artefactos):
+    return await extract_perfume_records_async(artefactos["transcript"])
+
+
+async def _etapa_perfumes(artefactos):
+    if artefactos["extraction"] is None:
+        return None
+    return to_perfume_analysis(artefactos["extraction"])
+
+
+async def _etapa_parameters(artefactos):
+    if artefactos["extraction"] is None:
+        return None
+    return to_perfume_parameters(artefactos["extraction"])
+
+
+async def _etapa_brands(artefactos):
+    return list(await run_cpu(get_catalog().find_brands, artefactos["transcript"]))
+
+
+async def _etapa_wordcount(artefactos):
+    return await run_cpu(limpiar_y_contar, artefactos["transcript"])
+
+
+ETAPAS = {
+    "punctuated_text": _etapa_punctuated_text,
+    "summary": _etapa_summary,
+    "extraction": _etapa_extraction,
+    "perfumes": _etapa_perfumes,
+    "parameters": _etapa_parameters,
+    "brands": _etapa_brands,
+    "wordcount": _etapa_wordcount,
+}
+
+
+def _version_etapa(nombre):
+    """
+    Parte de la clave de memoización que depende de datos externos a la transcripción:
+    las marcas detectadas cambian al recargar el catálogo.
+    """
+    return get_catalog().fingerprint if nombre == "brands" else ""
+
+
+def _notificar(on_stage, nombre, estado):
+    if on_stage is None:
+        return
+    try:
+        on_stage(nombre, estado)
+    except Exception as e:
+        logger.warning(f"Error en el callback de progreso de la etapa '{nombre}': {e}")
+
+
+def resolver_etapas(requeridos):
+    """
+    Devuelve las etapas necesarias para producir `requeridos`, en orden de dependencias.
+    """
+    orden = []
+
+    def visitar(nombre):
+        if nombre not in DEPENDENCIAS:
+            raise ValueError(f"Artefacto desconocido: {nombre}")
+        if nombre in orden:
+            return
+        for dependencia in DEPENDENCIAS[nombre]:
+            visitar(dependencia)
+        orden.append(nombre)
+
+    for nombre in requeridos:
+        visitar(nombre)
+    return orden
+
+
+async def ejecutar_etapas_async(transcription, requeridos, on_stage=None):
+    """
+    Calcula los artefactos `requeridos` a partir de una transcripción ya obtenida,
+    reutilizando los resultados memoizados de cada etapa. Cada etapa empieza en cuanto
+    sus dependencias están listas, así que la latencia total es la del camino más lento.
+    `on_stage(nombre, estado)` se llama al empezar ("running") y terminar ("done") cada etapa.
+    """
+    etapas = resolver_etapas(requeridos)
+    artefactos = {"transcript": transcription}
+    clave_transcripcion = cache_key(transcription)
+    tareas = {}
+
+    async def ejecutar(nombre):
+        for dependencia in DEPENDENCIAS[nombre]:
+            if dependencia in tareas:
+                await tareas[dependencia]
+        clave = cache_key(nombre, clave_transcripcion, _version_etapa(nombre))
+        resultado = _memo.get(clave)
+        if resultado is None:
+            logger.info(f"Ejecutando etapa '{nombre}' del pipeline")
+            _notificar(on_stage, nombre, "running")
+            resultado = await ETAPAS[nombre](artefactos)
+            if resultado is not None:
+                _memo.set(clave, resultado)
+        artefactos[nombre] = resultado
+        _notificar(on_stage, nombre, "done")
+
+    # `etapas` está en orden topológico, así que las dependencias ya tienen su tarea
+    for nombre in etapas:
+        if nombre not in artefactos:
+            tareas[nombre] = asyncio.ensure_future(ejecutar(nombre))
+    try:
+        await asyncio.gather(*tareas.values())
+    finally:
+        for tarea in tareas.values():
+            tarea.cancel()
+
+    return artefactos
+
+
+async def ejecutar_pipeline_async(video_url, requeridos, whisper_model=None, on_stage=None, asr_engine=None):
+    """
+    Ejecuta solo las etapas necesarias para obtener los artefactos `requeridos`
+    (transcript, punctuated_text, summary, perfumes, parameters, brands, wordcount) de un video.
+    `whisper_model` y `asr_engine` eligen el modelo y el motor de ASR si hay que transcribir el audio.
+    Devuelve un dict con los artefactos calculados, o None si no hay transcripción.
+    """
+    resolver_etapas(requeridos)  # Validar los nombres antes de transcribir
+
+    _notificar(on_stage, "transcript", "running")
+    transcription = await obtener_transcripcion_async(video_url, whisper_model, asr_engine)
+    if not transcription:
+        return None
+    _notificar(on_stage, "transcript", "done")
+    return await ejecutar_etapas_async(transcription, requeridos, on_stage)
+
+
+def ejecutar_etapas(transcription, requeridos):
+    """
+    Versión síncrona de `ejecutar_etapas_async`.
+    """
+    return run_sync(ejecutar_etapas_async(transcription, requeridos))
+
+
+def ejecutar_pipeline(video_url, requeridos, whisper_model=None, asr_engine=None):
+    """
+    Versión síncrona de `ejecutar_pipeline_async`.
+    """
+    return run_sync(ejecutar_pipeline_async(video_url, requeridos, whisper_model, asr_engine=asr_engine))
+
+
+def pipeline_cache_stats():
+    return _memo.stats()
@@ -1,23 +1,28 @@
 import os
 import re
-import requests
+import asyncio
+from app.utils import http_client
 from dotenv import load_dotenv
-from app.utils.audio_processing import procesar_video
+from app.utils.video_pipeline import ejecutar_pipeline_async
+from app.utils.executors import run_cpu
 
 from app.utils.sentiment_analysis import analyze_comments
 
 # Cargar variables de entorno
 load_dotenv()
 API_KEY = os.getenv("YOUTUBE_API_KEY")
+# Videos cuyos comentarios se descargan a la vez
+MAX_CONCURRENT_VIDEOS = int(os.getenv("YOUTUBE_MAX_CONCURRENT_VIDEOS", "5"))
+MAX_IDS_PER_REQUEST = 50
 
-def fetch_channel_id_from_handle(channel_handle):
+async def fetch_channel_id_from_handle(channel_handle):
     """
     Obtiene el channelId de un canal de YouTube usando su handle.
     """
     try:
         # Llamada a la API de YouTube con el parámetro forHandle
         channel_api_url = f"https://www.googleapis.com/youtube/v3/channels?part=id&forHandle={channel_handle}&key={API_KEY}"
-        response = requests.get(channel_api_url)
+        response = await http_client.get(channel_api_url)
 
         if response.status_code != 200:
             raise Exception(f"Error fetching channel data by handle: {response.text}")
@@ -32,12 +37,12 @@ def fetch_channel_id_from_handle(channel_handle):
         print("Error fetching channelId by handle:", e)
         return None
 
-def fetch_channel_id_from_html(channel_url):
+async def fetch_channel_id_from_html(channel_url):
     """
     Obtiene el channelId de un canal de YouTube usando scraping del HTML.
     """
     try:
-        response = requests.get(channel_url)
+        response = await http_client.get(channel_url)
         if response.status_code != 200:
             raise Exception(f"Error fetching HTML content: {response.status_code}")
         html_content = response.text
@@ -49,7 +54,7 @@ def fetch_channel_id_from_html(channel_url):
         print("Error fetching channelId from HTML:", e)
         return None
 
-def fetch_video_comments(video_id, max_comments=25):
+async def fetch_video_comments(video_id, max_comments=25):
     """
     Obtiene hasta `max_comments` comentarios de un video de YouTube usando la API.
     """
@@ -61,7 +66,7 @@ def fetch_video_comments(video_id, max_comments=25):
             if next_page_token:
                 comments_url += f"&pageToken={next_page_token}"
 
-            response = requests.get(comments_url)
+            response = await http_client.get(comments_url)
             if response.status_code != 200:
                 raise Exception(f"Error fetching comments: {response.text}")
 
@@ -82,19 +87,52 @@ def fetch_video_comments(video_id, max_comments=25):
         return []
 
 
-def fetch_channel_videos(channel_url):
+async def fetch_videos_statistics(video_ids):
+    """
+    Obtiene las estadísticas de varios videos en una sola llamada por cada 50 IDs
+    (máximo que admite videos?id=a,b,c). Devuelve un dict videoId -> statistics.
+    """
+    statistics = {}
+    for inicio in range(0, len(video_ids), MAX_IDS_PER_REQUEST):
+        ids = ",".join(video_ids[inicio:inicio + MAX_IDS_PER_REQUEST])
+        video_metrics_url = f"https://www.googleapis.com/youtube/v3/videos?part=statistics&id={ids}&key={API_KEY}"
+        try:
+            response = await http_client.get(video_metrics_url)
+            if response.status_code != 200:
+                raise Exception(f"Error fetching video statistics: {response.text}")
+            for item in response.json().get("items", []):
+                statistics[item["id"]] = item.get("statistics", {})
+        except Exception as e:
+            print("Error fetching video statistics:", e)
+    return statistics
+
+
+async def _analyze_video_comments(semaphore, video_id):
+    """
+    Descarga y analiza los comentarios de un video, limitado por `semaphore`.
+    """
+    async with semaphore:
+        raw_comments = await fetch_video_comments(video_id, max_comments=25)
+    # Añadir análisis de sentimiento (BERT, en el pool de CPU)
+    return await run_cpu(analyze_comments, raw_comments)
+
+
+async def fetch_channel_videos(channel_url):
     """
     Obtiene los últimos 10 videos de un canal y procesa el más reciente.
+    Las estadísticas se piden en un único lote y los comentarios de cada video
+    se descargan y analizan en paralelo, así como el resumen del último video.
     """
+    summary_task = None
     try:
         # Priorizar obtención del channelId usando el handle
         print(f"Fetching channelId for URL: {channel_url}")
         channel_handle = channel_url.split("/")[-1]
-        channel_id = fetch_channel_id_from_handle(channel_handle)
+        channel_id = await fetch_channel_id_from_handle(channel_handle)
 
         # Si falla, intentar obtener el channelId desde el HTML
         if not channel_id:
-            channel_id = fetch_channel_id_from_html(channel_url)
+            channel_id = await fetch_channel_id_from_html(channel_url)
 
         if not channel_id:
             raise Exception("Could not extract channelId using handle or HTML.")
@@ -103,7 +141,7 @@ def fetch_channel_videos(channel_url):
 
         # Obtener datos del canal
         channel_api_url = f"https://www.googleapis.com/youtube/v3/channels?part=snippet,contentDetails&id={channel_id}&key={API_KEY}"
-        response = requests.get(channel_api_url)
+        response = await http_client.get(channel_api_url)
         if response.status_code != 200:
             raise Exception(f"Error fetching channel data: {response.text}")
         channel_data = response.json()
@@ -113,42 +151,45 @@ def fetch_channel_videos(channel_url):
 
         # Obtener los últimos 10 videos
         videos_url = f"https://www.googleapis.com/youtube/v3/playlistItems?part=snippet,contentDetails&playlistId={uploads_playlist_id}&maxResults=10&key={API_KEY}"
-        videos_response = requests.get(videos_url)
+        videos_response = await http_client.get(videos_url)
         if videos_response.status_code != 200:
             raise Exception(f"Error fetching videos data: {videos_response.text}")
         videos_data = videos_response.json()
         videos = []
 
-        # Procesar cada video
         for item in videos_data.get("items", []):
-            video_id = item["contentDetails"]["videoId"]
-            video_title = item["snippet"]["title"]
-            published_date = item["snippet"].get("publishedAt", "Unknown")
-            video_metrics_url = f"https://www.googleapis.com/youtube/v3/videos?part=statistics&id={video_id}&key={API_KEY}"
-            video_metrics_response = requests.get(video_metrics_url)
-
-            video_data = {
-                "title": video_title,
-                "videoId": video_id,
-                "published_date": published_date,
+            videos.append({
+                "title": item["snippet"]["title"],
+                "videoId": item["contentDetails"]["videoId"],
+                "published_date": item["snippet"].get("publishedAt", "Unknown"),
                 "views": 0,
                 "likes": 0,
                 "comments_count": 0,
                 "comments": [], 
                 "average_stars": None,
-            }
-
-            if video_metrics_response.status_code == 200:
-                video_metrics = video_metrics_response.json().get("items", [{}])[0].get("statistics", {})
-                video_data.update({
-                    "views": int(video_metrics.get("viewCount", 0)),
-                    "likes": int(video_metrics.get("likeCount", 0)),
-                    "comments_count": int(video_metrics.get("commentCount", 0)),
-                })
+            })
 
-            # Recoger comentarios
-            raw_comments = fetch_video_comments(video_id, max_comments=25)
-            analyzed_comments = analyze_comments(raw_comments)  # Añadir análisis de sentimiento
+        # El resumen del último video no depende de los comentarios: empezarlo ya
+        if videos:
+            video_url = f"https://www.youtube.com/watch?v={videos[0]['videoId']}"
+            print(f"Processing latest video: {video_url}")
+            summary_task = asyncio.create_task(ejecutar_pipeline_async(video_url, ["summary"]))
+
+        # Estadísticas en un solo lote y comentarios de todos los videos en paralelo
+        video_ids = [video["videoId"] for video in videos]
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_VIDEOS)
+        video_metrics, *analyzed_per_video = await asyncio.gather(
+            fetch_videos_statistics(video_ids),
+            *(_analyze_video_comments(semaphore, video_id) for video_id in video_ids)
+        )
+
+        for video_data, analyzed_comments in zip(videos, analyzed_per_video):
+            metrics = video_metrics.get(video_data["videoId"], {})
+            video_data.update({
+                "views": int(metrics.get("viewCount", 0)),
+                "likes": int(metrics.get("likeCount", 0)),
+                "comments_count": int(metrics.get("commentCount", 0)),
+            })
 
             # Calcular la media de estrellas
             if analyzed_comments:
@@ -159,19 +200,16 @@ def fetch_channel_videos(channel_url):
             # Agregar comentarios analizados
             video_data["comments"] = analyzed_comments
 
-            # Agregar a la lista de videos
-            videos.append(video_data)
-
-        # Procesar el último video
-        if videos:
-            latest_video = videos[0]
-            video_url = f"https://www.youtube.com/watch?v={latest_video['videoId']}"
-            print(f"Processing latest video: {video_url}")
-            processed_data = procesar_video(video_url)
+        # Resumen del último video
+        if summary_task is not None:
+            try:
+                processed_data = await summary_task
+            except Exception as e:
+                print("Error processing latest video:", e)
+                processed_data = None
 
             if processed_data:
-                latest_video["summary"] = processed_data.get("summary", "Resumen no disponible.")
-                
+                videos[0]["summary"] = processed_data.get("summary") or "Resumen no disponible."
 
         return {
             "channel_title": channel_data["items"][0]["snippet"]["title"],
@@ -179,5 +217,7 @@ def fetch_channel_videos(channel_url):
             "videos": videos
         }
     except Exception as e:
+        if summary_task is not None:
+            summary_task.cancel()
         print("Error in fetch_channel_videos:", e)
         return None
@@ -0,0 +1,124 @@
+"""
+Benchmark de los motores de ASR (whisper, faster-whisper, vosk) sobre un audio fijo en español.
+
+Cada motor se ejecuta en un subproceso limpio, para que la memoria de uno no contamine
+la medida del otro. Se mide:
+- carga: tiempo de cargar el modelo (una vez por worker),
+- RTF: tiempo de transcripción / duración del audio (menor es mejor; < 1 es más rápido que tiempo real),
+- memoria: pico de RSS del subproceso (ru_maxrss),
+- WER: tasa de error por palabra frente a la transcripción de referencia.
+
+El audio de referencia (--fixture) y su transcripción (--reference) son locales y no
+cambian entre ejecuciones, para que los resultados sean comparables entre versiones.
+
+Uso:
+    python benchmarks/asr_engines.py --fixture benchmarks/fixtures/es_muestra.wav --reference benchmarks/fixtures/es_muestra.txt
+    python benchmarks/asr_engines.py --engines whisper faster-whisper --model small
+    VOSK_MODEL_PATH=models/vosk-model-small-es-0.42 python benchmarks/asr_engines.py --engines vosk
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+FIXTURE = os.path.join(RAIZ, "benchmarks", "fixtures", "es_muestra.wav")
+REFERENCIA = os.path.join(RAIZ, "benchmarks", "fixtures", "es_muestra.txt")
+
+
+def medir_motor(motor, fixture, modelo):
+    """
+    Se ejecuta en el subproceso: carga el modelo, transcribe el audio y devuelve las medidas.
+    """
+    from app.utils.asr_engines import SAMPLE_RATE, cargar_audio, get_engine
+
+    engine = get_engine(motor)
+    audio = cargar_audio(fixture)
+
+    inicio = time.perf_counter()
+    engine.registro.get(*engine.model_key(modelo))
+    carga = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    resultado = engine.transcribe(audio, modelo)
+    transcripcion = time.perf_counter() - inicio
+
+    return {
+        "engine": motor,
+        "model": engine.model_key(modelo)[0],
+        "audio_seconds": len(audio) / SAMPLE_RATE,
+        "load_seconds": carga,
+        "transcribe_seconds": transcripcion,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "text": resultado["text"],
+    }
+
+
+def wer(referencia, hipotesis):
+    """
+    Tasa de error por palabra: distancia de edición entre las secuencias de palabras
+    (minúsculas, sin puntuación) dividida por el número de palabras de la referencia.
+    """
+    from app.utils.text_analysis import iter_tokens
+
+    ref, hip = list(iter_tokens(referencia)), list(iter_tokens(hipotesis))
+    anterior = list(range(len(hip) + 1))
+    for i, palabra in enumerate(ref, 1):
+        actual = [i]
+        for j, candidata in enumerate(hip, 1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (palabra != candidata)))
+        anterior = actual
+    return anterior[-1] / max(len(ref), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", nargs="+", default=["whisper", "faster-whisper", "vosk"])
+    parser.add_argument("--model", help="Modelo de whisper/faster-whisper (tamaño) o de vosk (ruta o nombre en VOSK_MODEL_PATHS)")
+    parser.add_argument("--fixture", default=FIXTURE, help="Audio en español (cualquier formato de ffmpeg)")
+    parser.add_argument("--reference", default=REFERENCIA, help="Transcripción de referencia del audio")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(medir_motor(args.worker, args.fixture, args.model), ensure_ascii=False))
+        return
+
+    if not os.path.exists(args.fixture) or not os.path.exists(args.reference):
+        sys.exit(f"Faltan el audio ({args.fixture}) o su referencia ({args.reference})")
+    with open(args.reference, encoding="utf-8") as f:
+        referencia = f.read()
+
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    # El audio de referencia es corto: se mide el motor, no el reparto por procesos de long_audio
+    env["LONG_AUDIO_WORKERS"] = "1"
+
+    print(f"{'motor':<16}{'modelo':<26}{'carga':>8}{'RTF':>8}{'memoria':>11}{'WER':>8}")
+    for motor in args.engines:
+        comando = [sys.executable, os.path.abspath(__file__), "--worker", motor,
+                   "--fixture", args.fixture, "--reference", args.reference]
+        if args.model:
+            comando += ["--model", args.model]
+        proceso = subprocess.run(comando, cwd=RAIZ, env=env, capture_output=True, text=True)
+        if proceso.returncode != 0:
+            error = proceso.stderr.strip().splitlines()[-1] if proceso.stderr else ""
+            print(f"{motor:<16}ERROR: {error}")
+            continue
+        medida = json.loads(proceso.stdout.strip().splitlines()[-1])
+        print(
+            f"{motor:<16}{os.path.basename(str(medida['model']))[:25]:<26}"
+            f"{medida['load_seconds']:>7.1f}s"
+            f"{medida['transcribe_seconds'] / medida['audio_seconds']:>8.3f}"
+            f"{medida['peak_rss_mb']:>8.0f} MB"
+            f"{wer(referencia, medida['text']):>7.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
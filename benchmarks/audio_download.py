@@ -0,0 +1,87 @@
+"""
+Benchmark de la obtención de audio para ASR: descarga a fichero (yt-dlp con keepvideo +
+WAV en downloads/ + remuestreo al cargar) frente a streaming (yt-dlp | ffmpeg a PCM de
+16 kHz mono en memoria).
+
+Cada método se ejecuta en un subproceso con un directorio de trabajo temporal. Se mide
+el tiempo total, los bytes escritos en disco por el proceso y sus hijos (ru_oublock) y
+el pico de uso de disco (tamaño de los ficheros que deja en el directorio de trabajo).
+
+Uso:
+    python benchmarks/audio_download.py --url "https://www.youtube.com/watch?v=<ID>"
+    python benchmarks/audio_download.py --url "https://.../playlist.m3u8" --methods stream
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def tamano_directorio(ruta):
+    return sum(
+        os.path.getsize(os.path.join(carpeta, nombre)) for carpeta, _, nombres in os.walk(ruta) for nombre in nombres
+    )
+
+
+def medir_metodo(metodo, url):
+    """
+    Se ejecuta en el subproceso (con el directorio temporal como cwd).
+    """
+    sys.path.insert(0, RAIZ)
+    from app.utils.asr_engines import SAMPLE_RATE
+    from app.utils.audio_processing import download_audio_yt_dlp, descargar_audio_stream
+
+    inicio = time.perf_counter()
+    if metodo == "file":
+        audio = download_audio_yt_dlp(url)
+    else:
+        audio = descargar_audio_stream(url)
+    duracion = time.perf_counter() - inicio
+
+    bloques = sum(resource.getrusage(r).ru_oublock for r in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+    return {
+        "method": metodo,
+        "seconds": duracion,
+        "audio_seconds": len(audio) / SAMPLE_RATE,
+        "written_mb": bloques * 512 / (1024 * 1024),
+        "disk_mb": tamano_directorio(os.getcwd()) / (1024 * 1024),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--methods", nargs="+", default=["file", "stream"], choices=["file", "stream"])
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(medir_metodo(args.worker, args.url)))
+        return
+
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    print(f"{'método':<8}{'tiempo':>9}{'audio':>9}{'escrito en disco':>19}{'disco ocupado':>16}")
+    for metodo in args.methods:
+        with tempfile.TemporaryDirectory() as directorio:
+            comando = [sys.executable, os.path.abspath(__file__), "--worker", metodo, "--url", args.url]
+            proceso = subprocess.run(comando, cwd=directorio, env=env, capture_output=True, text=True)
+        if proceso.returncode != 0:
+            error = proceso.stderr.strip().splitlines()[-1] if proceso.stderr else ""
+            print(f"{metodo:<8}ERROR: {error}")
+            continue
+        medida = json.loads(proceso.stdout.strip().splitlines()[-1])
+        print(
+            f"{metodo:<8}{medida['seconds']:>8.1f}s{medida['audio_seconds'] / 60:>7.1f}min"
+            f"{medida['written_mb']:>16.1f} MB{medida['disk_mb']:>13.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
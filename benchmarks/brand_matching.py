@@ -0,0 +1,112 @@
+"""
+Benchmark de la detección de marcas: bucle original (una búsqueda de subcadena por marca)
+frente al autómata de Aho-Corasick de `brand_matcher`.
+
+Se genera un diccionario sintético de `--brands` marcas (las reales del catálogo más
+marcas inventadas) y una transcripción larga (`--words` palabras) con menciones repartidas.
+Se mide el tiempo de construcción del autómata, el tiempo por transcripción de cada método
+y cuántas coincidencias del bucle original caen dentro de otras palabras.
+
+Uso:
+    python benchmarks/brand_matching.py --brands 5000 --words 30000 --repeat 5
+    python benchmarks/brand_matching.py --transcript-file transcripcion.txt
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.brand_matcher import BrandMatcher  # noqa: E402
+
+SILABAS = ["ma", "ri", "so", "le", "ta", "no", "ca", "de", "lu", "ve", "mo", "ra", "ti", "pe", "sa", "gu", "ol", "ar"]
+PALABRAS = (
+    "hoy os traigo una reseña de este perfume que me encanta porque la salida es muy fresca "
+    "y luego en el fondo tiene vainilla ámbar y madera la duración es buena y la proyección moderada"
+).split()
+
+
+def marca_inventada(rng):
+    palabras = rng.choice([1, 1, 2, 2, 3])
+    return " ".join(
+        "".join(rng.choice(SILABAS) for _ in range(rng.randint(2, 4))).capitalize() for _ in range(palabras)
+    )
+
+
+def generar_marcas(total, rng, reales):
+    marcas = list(reales)
+    vistas = {m.lower() for m in marcas}
+    while len(marcas) < total:
+        marca = marca_inventada(rng)
+        if marca.lower() not in vistas:
+            vistas.add(marca.lower())
+            marcas.append(marca)
+    return marcas
+
+
+def generar_transcripcion(palabras, marcas, rng):
+    texto = []
+    for _ in range(palabras):
+        texto.append(rng.choice(marcas) if rng.random() < 0.01 else rng.choice(PALABRAS))
+    return " ".join(texto)
+
+
+def bucle_original(marcas, transcripcion):
+    detectadas = []
+    transcripcion_lower = transcripcion.lower()
+    for brand in marcas:
+        if brand.lower() in transcripcion_lower:
+            detectadas.append(brand)
+    return detectadas
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--brands", type=int, default=5000, help="Tamaño del diccionario de marcas")
+    parser.add_argument("--words", type=int, default=30000, help="Palabras de la transcripción sintética")
+    parser.add_argument("--transcript-file", help="Usar una transcripción real en lugar de la sintética")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from app.utils.catalog import get_catalog
+
+    rng = random.Random(args.seed)
+    marcas = generar_marcas(args.brands, rng, get_catalog().brand_names)
+    if args.transcript_file:
+        with open(args.transcript_file, encoding="utf-8") as f:
+            transcripcion = f.read()
+    else:
+        transcripcion = generar_transcripcion(args.words, marcas, rng)
+
+    inicio = time.perf_counter()
+    matcher = BrandMatcher(marcas)
+    construccion = time.perf_counter() - inicio
+
+    t_original, original = medir(lambda: bucle_original(marcas, transcripcion), args.repeat)
+    t_automata, automata = medir(lambda: matcher.find(transcripcion), args.repeat)
+
+    print(f"marcas={len(marcas)} (únicas tras normalizar: {len(matcher)}) caracteres={len(transcripcion)}")
+    print(f"construcción del autómata: {construccion * 1000:.1f} ms (una vez por proceso)")
+    print(f"bucle original:   {t_original * 1000:8.1f} ms  marcas detectadas={len(original)}")
+    print(f"aho-corasick:     {t_automata * 1000:8.1f} ms  marcas detectadas={len(automata)} "
+          f"menciones={sum(e['count'] for e in automata.values())}")
+    print(f"aceleración: x{t_original / t_automata:.1f}")
+    solo_original = {m.lower() for m in original} - {m.lower() for m in automata}
+    print(f"coincidencias del bucle original sin límite de palabra: {len(solo_original)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Prueba de carga: latencia de /api/feedback mientras se ejecutan análisis pesados.
+
+Lanza `--heavy` peticiones concurrentes a /api/analyze (o /api/analyze-perfumes) y, a la vez,
+mide la latencia de /api/feedback. Si el event loop no se bloquea, el p99 de /api/feedback
+debe ser similar con y sin carga pesada. Cada petición de feedback inserta una fila
+de tipo "loadtest" en la tabla feedback.
+
+Uso:
+    uvicorn app.main:app --port 8080
+    python benchmarks/loadtest_feedback.py --base-url http://localhost:8080 \
+        --channel-url https://www.youtube.com/@canal --heavy 4 --duration 60
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    indice = min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))
+    return valores[indice]
+
+
+async def medir_feedback(client, base_url, fin, latencias, intervalo):
+    payload = {"type": "loadtest", "result": True, "content": "loadtest", "prompt": None}
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        try:
+            await client.post(f"{base_url}/api/feedback", json=payload)
+        except httpx.HTTPError:
+            pass
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        await asyncio.sleep(intervalo)
+
+
+async def carga_pesada(client, base_url, channel_url, video_url, fin):
+    while time.perf_counter() < fin:
+        try:
+            if video_url:
+                await client.post(f"{base_url}/api/analyze-perfumes", json={"video_url": video_url})
+            else:
+                await client.post(f"{base_url}/api/analyze", json={"url": channel_url})
+        except httpx.HTTPError:
+            pass
+
+
+async def fase(base_url, duracion, heavy, channel_url, video_url, intervalo):
+    latencias = []
+    fin = time.perf_counter() + duracion
+    async with httpx.AsyncClient(timeout=600) as client:
+        tareas = [medir_feedback(client, base_url, fin, latencias, intervalo)]
+        tareas += [carga_pesada(client, base_url, channel_url, video_url, fin) for _ in range(heavy)]
+        await asyncio.gather(*tareas)
+    return latencias
+
+
+def resumen(nombre, latencias):
+    print(
+        f"{nombre:<18} n={len(latencias):<5} "
+        f"p50={percentil(latencias, 50):.1f}ms p95={percentil(latencias, 95):.1f}ms "
+        f"p99={percentil(latencias, 99):.1f}ms max={max(latencias):.1f}ms "
+        f"media={statistics.mean(latencias):.1f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8080")
+    parser.add_argument("--channel-url", help="Canal para /api/analyze")
+    parser.add_argument("--video-url", help="Video para /api/analyze-perfumes (en lugar de --channel-url)")
+    parser.add_argument("--heavy", type=int, default=4, help="Peticiones pesadas concurrentes")
+    parser.add_argument("--duration", type=float, default=60, help="Segundos por fase")
+    parser.add_argument("--interval", type=float, default=0.05, help="Pausa entre peticiones de feedback")
+    args = parser.parse_args()
+
+    if not args.channel_url and not args.video_url:
+        parser.error("Indica --channel-url o --video-url")
+
+    base = await fase(args.base_url, args.duration, 0, args.channel_url, args.video_url, args.interval)
+    cargada = await fase(args.base_url, args.duration, args.heavy, args.channel_url, args.video_url, args.interval)
+
+    resumen("sin carga", base)
+    resumen(f"con {args.heavy} pesadas", cargada)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
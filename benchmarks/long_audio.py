@@ -0,0 +1,96 @@
+"""
+Benchmark de la transcripción de audio largo por segmentos en paralelo.
+
+Genera un audio largo sintético (`--minutes` minutos) repitiendo un fragmento de voz
+(`--speech-file`) separado por silencios, o, si no se indica, ráfagas de ruido con
+envolvente de sílabas. Lo transcribe con Whisper con distinto número de procesos y
+muestra el tiempo total, el factor de tiempo real (RTF) y la aceleración frente a 1 proceso.
+
+Uso:
+    python benchmarks/long_audio.py --speech-file muestra_es.wav --minutes 30 --workers 1 2 4
+    python benchmarks/long_audio.py --minutes 10 --model tiny --workers 1 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_RATE = 16000
+
+
+def audio_sintetico(minutos, rng):
+    """
+    Ráfagas de ruido filtrado con envolvente de sílabas (~4 Hz) de 5-20 s separadas por 0.5-3 s de silencio.
+    """
+    total = int(minutos * 60 * SAMPLE_RATE)
+    partes, longitud = [], 0
+    while longitud < total:
+        duracion = int(rng.uniform(5, 20) * SAMPLE_RATE)
+        t = np.arange(duracion) / SAMPLE_RATE
+        ruido = np.convolve(rng.standard_normal(duracion), np.ones(8) / 8, mode="same")
+        envolvente = 0.5 * (1 + np.sin(2 * np.pi * 4 * t)) ** 2
+        partes.append((0.2 * ruido * envolvente).astype(np.float32))
+        partes.append(np.zeros(int(rng.uniform(0.5, 3) * SAMPLE_RATE), dtype=np.float32))
+        longitud += len(partes[-2]) + len(partes[-1])
+    return np.concatenate(partes)[:total]
+
+
+def audio_desde_voz(ruta, minutos):
+    import whisper
+
+    voz = whisper.load_audio(ruta)
+    silencio = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    repeticiones = int(np.ceil(minutos * 60 * SAMPLE_RATE / (len(voz) + len(silencio))))
+    return np.concatenate([np.concatenate([voz, silencio])] * repeticiones)[:int(minutos * 60 * SAMPLE_RATE)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--speech-file", help="Fragmento de voz en español que se repite")
+    parser.add_argument("--minutes", type=float, default=20)
+    parser.add_argument("--model", default=os.getenv("WHISPER_MODEL_SIZE", "small"))
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    # El forkserver de long_audio precarga el modelo por defecto: que sea el del benchmark
+    os.environ["ASR_ENGINE"] = "whisper"
+    os.environ["WHISPER_MODEL_SIZE"] = args.model
+
+    from app.utils.asr_engines import whisper_models, whisper_model_key, _cargar_modelo_whisper
+    from app.utils.long_audio import transcribir_en_paralelo, cortes_en_silencios, calentar_pool, cerrar_pools
+
+    if args.speech_file:
+        audio = audio_desde_voz(args.speech_file, args.minutes)
+    else:
+        audio = audio_sintetico(args.minutes, np.random.default_rng(args.seed))
+    duracion_audio = len(audio) / SAMPLE_RATE
+    print(f"audio={duracion_audio / 60:.1f} min, segmentos={len(cortes_en_silencios(audio))}, "
+          f"cpus={os.cpu_count()}, modelo={args.model}")
+
+    key = whisper_model_key(args.model)
+    opciones = {"language": "es", "task": "transcribe", "fp16": False}
+
+    def en_proceso(segmento):
+        return whisper_models.get(*key).transcribe(segmento, **opciones)
+
+    base = None
+    for workers in args.workers:
+        if workers > 1:
+            calentar_pool(_cargar_modelo_whisper, key, workers)  # La carga del modelo en los procesos no cuenta
+        inicio = time.perf_counter()
+        resultado = transcribir_en_paralelo(audio, en_proceso, _cargar_modelo_whisper, key, opciones, workers=workers)
+        total = time.perf_counter() - inicio
+        base = base or total
+        print(
+            f"procesos={workers:<3} tiempo={total:8.1f}s RTF={total / duracion_audio:.3f} "
+            f"aceleración=x{base / total:.2f} palabras={len(resultado['text'].split())}"
+        )
+    cerrar_pools()
+
+
+if __name__ == "__main__":
+    main()
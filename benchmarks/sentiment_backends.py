@@ -0,0 +1,114 @@
+"""
+Benchmark de los backends de sentimiento (pytorch, quantized, onnx).
+
+Cada backend se mide en un subproceso propio para que el RSS máximo sea comparable:
+tiempo de carga, comentarios por segundo y RSS máximo. Con --parity se compara además
+cada backend con el pipeline original de transformers.
+
+Uso:
+    python benchmarks/sentiment_backends.py --repeat 20 --parity
+    python benchmarks/sentiment_backends.py --comments-file comentarios.txt --backends pytorch quantized
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMENTARIOS_EJEMPLO = [
+    "Me encanta este perfume, dura todo el día y huele increíble.",
+    "No me ha gustado nada, demasiado dulce y se va en una hora.",
+    "Buena reseña, gracias por comparar las dos versiones.",
+    "El frasco es precioso pero el precio es excesivo para lo que ofrece.",
+    "Lo compré por tu recomendación y es justo lo que buscaba 😍",
+    "Meh, normalito. Hay opciones mejores por menos dinero.",
+    "¿Qué opinas de la versión intense? ¿Merece la pena?",
+    "Horrible, me dio dolor de cabeza desde el primer momento.",
+    "Great review! The dry down sounds amazing.",
+    "La salida es muy cítrica y luego se vuelve amaderado, una maravilla. " * 8,
+]
+
+
+def rss_max_mb():
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def medir_backend(backend, comments, batch_size, parity):
+    from app.utils import sentiment_analysis
+
+    inicio = time.perf_counter()
+    sentiment_analysis.get_sentiment_model(backend)
+    carga = time.perf_counter() - inicio
+
+    # Una pasada de calentamiento y luego la medida
+    sentiment_analysis.analyze_comments(comments[:batch_size], batch_size=batch_size, backend=backend)
+    inicio = time.perf_counter()
+    sentiment_analysis.analyze_comments(comments, batch_size=batch_size, backend=backend)
+    duracion = time.perf_counter() - inicio
+
+    resultado = {
+        "backend": backend,
+        "load_seconds": round(carga, 2),
+        "comments": len(comments),
+        "comments_per_second": round(len(comments) / duracion, 1),
+        "rss_max_mb": round(rss_max_mb(), 1),
+    }
+    if parity:
+        resultado["parity"] = sentiment_analysis.check_backend_parity(comments[:200], backend)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "quantized", "onnx"])
+    parser.add_argument("--comments-file", help="Fichero con un comentario por línea")
+    parser.add_argument("--repeat", type=int, default=25, help="Repeticiones de los comentarios de ejemplo")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--parity", action="store_true", help="Comparar con el pipeline original")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.comments_file:
+        with open(args.comments_file, encoding="utf-8") as f:
+            comments = [linea.strip() for linea in f if linea.strip()]
+    else:
+        comments = COMENTARIOS_EJEMPLO * args.repeat
+
+    if args.child:
+        print(json.dumps(medir_backend(args.child, comments, args.batch_size, args.parity)))
+        return
+
+    for backend in args.backends:
+        comando = [sys.executable, __file__, "--child", backend, "--batch-size", str(args.batch_size)]
+        if args.comments_file:
+            comando += ["--comments-file", args.comments_file]
+        else:
+            comando += ["--repeat", str(args.repeat)]
+        if args.parity:
+            comando.append("--parity")
+        proceso = subprocess.run(comando, capture_output=True, text=True)
+        if proceso.returncode != 0:
+            print(f"{backend:<10} ERROR: {proceso.stderr.strip().splitlines()[-1] if proceso.stderr else ''}")
+            continue
+        resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+        linea = (
+            f"{backend:<10} carga={resultado['load_seconds']}s "
+            f"throughput={resultado['comments_per_second']} comentarios/s "
+            f"rss_max={resultado['rss_max_mb']}MB"
+        )
+        if "parity" in resultado:
+            paridad = resultado["parity"]
+            linea += (
+                f" acuerdo_estrellas={paridad['stars_agreement']:.1%} "
+                f"dif_confianza={paridad['mean_abs_confidence_diff']:.3f}"
+            )
+        print(linea)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark del arranque en frío: tiempo de importar la aplicación en un proceso nuevo.
+
+Cada repetición importa el módulo en un subproceso limpio (como un worker recién
+arrancado) y mide el tiempo total. Con --offline se apunta OpenAI a una dirección
+inalcanzable: el arranque no debe depender de la red, así que el tiempo no debe cambiar.
+Con --importtime se muestran los módulos que más tardan en importarse (python -X importtime).
+Con --chain se mide cada eslabón de la cadena de imports del arranque
+(text_analysis -> audio_processing -> app.routes.main -> app.main) y qué dependencias
+pesadas (nltk, torch, spacy...) arrastra cada uno.
+
+Uso:
+    python benchmarks/startup_time.py --repeat 5
+    python benchmarks/startup_time.py --module app.routes.main --offline --importtime
+    python benchmarks/startup_time.py --chain --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CADENA = ["app.utils.text_analysis", "app.utils.audio_processing", "app.routes.main", "app.main"]
+DEPENDENCIAS_PESADAS = ["nltk", "torch", "transformers", "whisper", "spacy", "openai", "numpy"]
+
+
+def importar(modulo, env, importtime=False):
+    comando = [sys.executable]
+    if importtime:
+        comando += ["-X", "importtime"]
+    # Se imprime qué dependencias pesadas han quedado cargadas tras el import
+    comando += ["-c", (
+        f"import sys, json, {modulo}; "
+        f"print(json.dumps([m for m in {DEPENDENCIAS_PESADAS!r} if m in sys.modules]))"
+    )]
+    inicio = time.perf_counter()
+    proceso = subprocess.run(comando, cwd=RAIZ, env=env, capture_output=True, text=True)
+    return time.perf_counter() - inicio, proceso
+
+
+def modulos_mas_lentos(stderr, top):
+    # Formato: "import time: self [us] | cumulative | imported package"
+    filas = []
+    for linea in stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        propio, acumulado, nombre = linea.split(":", 1)[1].split("|", 2)
+        filas.append((int(acumulado), int(propio), nombre.rstrip()))
+    return sorted(filas, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="Módulo a importar (por defecto app.main)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--offline", action="store_true", help="Simular que OpenAI no es accesible")
+    parser.add_argument("--importtime", action="store_true", help="Mostrar los imports más lentos")
+    parser.add_argument("--chain", action="store_true", help="Medir cada módulo de la cadena de imports del arranque")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    if args.offline:
+        env["OPENAI_BASE_URL"] = "http://127.0.0.1:9/v1"
+
+    for modulo in (CADENA if args.chain else [args.module]):
+        tiempos = []
+        for _ in range(args.repeat):
+            duracion, proceso = importar(modulo, env)
+            if proceso.returncode != 0:
+                error = proceso.stderr.strip().splitlines()[-1] if proceso.stderr else ""
+                print(f"ERROR al importar {modulo} ({duracion:.2f}s): {error}")
+                break
+            tiempos.append(duracion)
+        if len(tiempos) < args.repeat:
+            continue
+        cargadas = json.loads(proceso.stdout.strip().splitlines()[-1])
+        print(
+            f"{modulo}: mediana={statistics.median(tiempos):.2f}s "
+            f"min={min(tiempos):.2f}s max={max(tiempos):.2f}s (n={len(tiempos)}, offline={args.offline}) "
+            f"dependencias pesadas={','.join(cargadas) or '-'}"
+        )
+
+    if args.importtime:
+        _, proceso = importar(args.module, env, importtime=True)
+        print(f"\n{'acumulado':>12} {'propio':>10}  módulo")
+        for acumulado, propio, nombre in modulos_mas_lentos(proceso.stderr, args.top):
+            print(f"{acumulado / 1000:>10.1f}ms {propio / 1000:>8.1f}ms  {nombre}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark de la etapa de VAD previa al ASR.
+
+Con --file usa un audio real (cualquier formato de ffmpeg); si no, genera una reseña
+sintética: intro musical, bloques de "voz" (ruido con envolvente de sílabas) separados por
+silencios, un plano de producto con música y una outro. Muestra el detector usado, las
+regiones detectadas, la fracción de audio omitida y el tiempo del VAD. Con --asr transcribe
+además el audio completo y el recortado, y compara el tiempo de CPU del ASR.
+
+Uso:
+    python benchmarks/vad.py --minutes 10
+    python benchmarks/vad.py --file resena.m4a --asr whisper --model small
+    VAD_BACKEND=energy python benchmarks/vad.py --file resena.m4a
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_RATE = 16000
+
+
+def voz(segundos, rng):
+    t = np.arange(int(segundos * SAMPLE_RATE)) / SAMPLE_RATE
+    ruido = np.convolve(rng.standard_normal(len(t)), np.ones(8) / 8, mode="same")
+    return (0.2 * ruido * (0.5 * (1 + np.sin(2 * np.pi * 4 * t))) ** 2).astype(np.float32)
+
+
+def musica(segundos):
+    t = np.arange(int(segundos * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.05 * sum(np.sin(2 * np.pi * f * t) for f in (220, 277, 330))).astype(np.float32)
+
+
+def silencio(segundos, rng):
+    return (0.0005 * rng.standard_normal(int(segundos * SAMPLE_RATE))).astype(np.float32)
+
+
+def resena_sintetica(minutos, rng):
+    partes = [musica(30), silencio(3, rng)]
+    total = 33
+    while total < minutos * 60 - 30:
+        partes.append(voz(rng.uniform(10, 40), rng))
+        partes.append(silencio(rng.uniform(1, 8), rng))
+        if rng.random() < 0.2:
+            partes.append(musica(rng.uniform(5, 20)))
+        total = sum(len(p) for p in partes) / SAMPLE_RATE
+    partes.append(musica(30))
+    return np.concatenate(partes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", help="Audio real a analizar")
+    parser.add_argument("--minutes", type=float, default=10, help="Duración de la reseña sintética")
+    parser.add_argument("--asr", help="Motor de ASR con el que comparar (whisper, faster-whisper, vosk)")
+    parser.add_argument("--model", help="Modelo del motor de ASR")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.utils.vad import aplicar_vad, detectar_voz, vad_backend
+
+    if args.file:
+        from app.utils.asr_engines import cargar_audio
+        audio = cargar_audio(args.file)
+    else:
+        audio = resena_sintetica(args.minutes, np.random.default_rng(args.seed))
+    duracion = len(audio) / SAMPLE_RATE
+
+    inicio = time.perf_counter()
+    recortado, mapa, omitida = aplicar_vad(audio)
+    t_vad = time.perf_counter() - inicio
+    print(f"detector={vad_backend()} audio={duracion / 60:.1f} min regiones={len(mapa)}")
+    print(f"omitido={omitida:.1%} audio para ASR={len(recortado) / SAMPLE_RATE / 60:.1f} min "
+          f"VAD={t_vad * 1000:.0f} ms ({t_vad / duracion * 3600:.2f} s por hora de audio)")
+    for inicio_recortado, inicio_original, segundos in mapa[:10]:
+        print(f"  {inicio_original:8.1f}s - {inicio_original + segundos:8.1f}s (en el recortado: {inicio_recortado:.1f}s)")
+    if len(mapa) > 10:
+        print(f"  ... {len(mapa) - 10} regiones más")
+
+    if args.asr:
+        os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+        from app.utils.asr_engines import get_engine
+
+        engine = get_engine(args.asr)
+        engine.registro.get(*engine.model_key(args.model))  # La carga del modelo no cuenta
+        tiempos = {}
+        for nombre, entrada in (("completo", audio), ("con VAD", recortado)):
+            inicio = time.perf_counter()
+            resultado = engine.transcribe(entrada, args.model)
+            tiempos[nombre] = time.perf_counter() - inicio
+            print(f"ASR {nombre:<9} {tiempos[nombre]:8.1f}s palabras={len(resultado['text'].split())}")
+        print(f"reducción del tiempo de ASR: {1 - tiempos['con VAD'] / tiempos['completo']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app.utils.audio_cache import AudioCache
+
+
+def _producir(contenido, llamadas=None, espera=0):
+    def producir(destino):
+        if llamadas is not None:
+            llamadas.append(destino)
+        time.sleep(espera)
+        with open(destino, "wb") as f:
+            f.write(contenido)
+    return producir
+
+
+def _envejecer(ruta, segundos):
+    instante = time.time() - segundos
+    os.utime(ruta, (instante, instante))
+
+
+def test_se_produce_una_sola_vez(tmp_path):
+    cache = AudioCache(str(tmp_path), max_mb=1)
+    llamadas, leidos = [], []
+
+    def leer():
+        with cache.get_or_create("video", "wav", _producir(b"audio", llamadas, espera=0.05)) as ruta:
+            with open(ruta, "rb") as f:
+                leidos.append(f.read())
+
+    hilos = [threading.Thread(target=leer) for _ in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(llamadas) == 1
+    assert leidos == [b"audio"] * 6
+    assert (cache.hits, cache.misses) == (5, 1)
+
+
+def test_expulsa_la_entrada_usada_hace_mas_tiempo(tmp_path):
+    cache = AudioCache(str(tmp_path), max_mb=2500 / (1024 * 1024))
+    with cache.get_or_create("antiguo", "wav", _producir(b"x" * 1000)) as antiguo:
+        _envejecer(antiguo, 120)
+    with cache.get_or_create("usado", "wav", _producir(b"x" * 1000)) as usado:
+        _envejecer(usado, 60)
+    with cache.get("antiguo", "wav"):
+        pass  # El acierto lo marca como usado recientemente
+
+    with cache.get_or_create("nuevo", "pcm16k", _producir(b"x" * 1000)):
+        pass
+
+    with cache.get("usado", "wav") as ruta:
+        assert ruta is None
+    with cache.get("antiguo", "wav") as ruta:
+        assert ruta is not None
+    assert cache.evictions == 1
+
+
+def test_no_expulsa_las_entradas_en_uso(tmp_path):
+    cache = AudioCache(str(tmp_path), max_mb=1500 / (1024 * 1024))
+    with cache.get_or_create("leyendo", "wav", _producir(b"x" * 1000)) as ruta:
+        _envejecer(ruta, 60)
+
+    with cache.get("leyendo", "wav") as en_uso:
+        with cache.get_or_create("nuevo", "wav", _producir(b"x" * 1000)):
+            pass
+        assert os.path.exists(en_uso)
+    assert cache.evictions == 0
+
+
+def test_un_fallo_no_deja_nada_en_la_cache(tmp_path):
+    cache = AudioCache(str(tmp_path), max_mb=1)
+
+    def fallar(destino):
+        with open(destino, "wb") as f:
+            f.write(b"parcial")
+        raise RuntimeError("descarga cortada")
+
+    with pytest.raises(RuntimeError):
+        with cache.get_or_create("video", "wav", fallar):
+            pass
+    with pytest.raises(ValueError):
+        with cache.get_or_create("vacio", "wav", _producir(b"")):
+            pass
+
+    entradas, en_curso = cache._recorrer()
+    assert entradas == [] and en_curso == 0
@@ -0,0 +1,26 @@
+from app.utils.brand_matcher import BrandMatcher
+
+
+def test_respeta_los_limites_de_palabra():
+    matcher = BrandMatcher(["Dior"])
+
+    assert matcher.find("Un Diorama de Dior") == {"Dior": {"count": 1, "offsets": [(14, 18)]}}
+
+
+def test_ignora_acentos_y_mayusculas():
+    matcher = BrandMatcher(["Hermès"])
+
+    assert matcher.find("hermes y HERMÈS")["Hermès"]["count"] == 2
+
+
+def test_alias_devuelve_la_marca_canonica():
+    matcher = BrandMatcher([("ysl", "Yves Saint Laurent"), ("Yves Saint Laurent", "Yves Saint Laurent")])
+
+    assert list(matcher.find("el ysl de Yves Saint Laurent")) == ["Yves Saint Laurent"]
+    assert matcher.find("el ysl de Yves Saint Laurent")["Yves Saint Laurent"]["count"] == 2
+
+
+def test_cuenta_solo_la_coincidencia_mas_larga():
+    matcher = BrandMatcher(["Tom Ford", "Ford"])
+
+    assert matcher.find("un Tom Ford") == {"Tom Ford": {"count": 1, "offsets": [(3, 11)]}}
@@ -0,0 +1,34 @@
+import pytest
+
+from app.utils.catalog import CATALOG_PATH, Catalog
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    return Catalog.from_file(CATALOG_PATH)
+
+
+def test_alias_del_catalogo(catalogo):
+    assert list(catalogo.find_brands("el ysl y el christian dior")) == ["Yves Saint Laurent", "Dior"]
+    assert catalogo.lookup_brand("hermes") == "Hermès"
+
+
+def test_el_verbo_dio_no_es_dior(catalogo):
+    assert catalogo.find_brands("Le dio un toque fresco y dió buen resultado") == {}
+
+
+def test_dio_junto_al_perfume_si_cuenta(catalogo):
+    perfumes = catalogo.find_perfumes("me encanta el dió sauvage")
+
+    assert [(p["name"], p["brand"]) for p in perfumes] == [("Sauvage", "Dior")]
+
+
+def test_alias_comunes_no_son_marcas(catalogo):
+    assert catalogo.find_brands("El señor Herrera dijo que tom for sure") == {}
+
+
+def test_1_millon_solo_junto_a_la_marca(catalogo):
+    assert catalogo.find_perfumes("el vídeo llegó a 1 millón de visitas") == []
+    perfumes = catalogo.find_perfumes("me compré el paco rabanne 1 millón")
+
+    assert [(p["name"], p["brand"]) for p in perfumes] == [("1 Million", "Paco Rabanne")]
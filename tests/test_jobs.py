@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.utils import jobs
+from app.utils.jobs import JobQueue
+
+
+@pytest.fixture
+def cola(tmp_path):
+    return JobQueue(db_path=str(tmp_path / "jobs.sqlite3"), workers=1)
+
+
+async def _esperar(cola, job_id):
+    estados = [job["status"] async for job in cola.watch(job_id)]
+    return estados, cola.get(job_id)
+
+
+def test_submit_deduplica_los_trabajos_en_curso(cola):
+    cola.register("video", lambda params, progress: None)
+
+    job, deduplicado = cola.submit("video", {"url": "a"}, "video:a")
+    repetido, deduplicado_2 = cola.submit("video", {"url": "a"}, "video:a")
+    otro, _ = cola.submit("video", {"url": "b"}, "video:b")
+
+    assert job["status"] == "queued" and not deduplicado
+    assert deduplicado_2 and repetido["id"] == job["id"]
+    assert otro["id"] != job["id"]
+
+
+def test_submit_rechaza_tipos_desconocidos(cola):
+    with pytest.raises(ValueError):
+        cola.submit("desconocido", {}, "x")
+
+
+def test_transiciones_de_estado(cola):
+    async def correcto(params, progress):
+        progress("transcript", "running")
+        await asyncio.sleep(0.01)
+        progress("transcript", "done")
+        return {"valor": params["valor"]}
+
+    async def vacio(params, progress):
+        return None
+
+    async def fallido(params, progress):
+        raise RuntimeError("sin audio")
+
+    cola.register("correcto", correcto)
+    cola.register("vacio", vacio)
+    cola.register("fallido", fallido)
+
+    async def escenario():
+        await cola.start()
+        try:
+            ids = [cola.submit(kind, {"valor": 1}, kind)[0]["id"] for kind in ("correcto", "vacio", "fallido")]
+            return [await _esperar(cola, job_id) for job_id in ids]
+        finally:
+            await cola.stop()
+
+    (estados, correcto_job), (_, vacio_job), (_, fallido_job) = asyncio.run(escenario())
+
+    assert estados[-1] == "done"
+    assert correcto_job["result"] == {"valor": 1}
+    assert correcto_job["progress"] == {"stages": {"transcript": "done"}, "current": "transcript"}
+    assert vacio_job["status"] == "failed" and vacio_job["error"] == "El trabajo no produjo resultados"
+    assert fallido_job["status"] == "failed" and fallido_job["error"] == "sin audio"
+    assert cola._cambios == {} and cola._observadores == {}
+
+
+def test_reencola_los_trabajos_huerfanos(cola, monkeypatch):
+    cola.register("video", lambda params, progress: None)
+    job, _ = cola.submit("video", {}, "video:a")
+    assert cola._reclamar()["id"] == job["id"]
+    assert cola.get(job["id"])["status"] == "running"
+
+    monkeypatch.setattr(jobs, "JOBS_STALE_SECONDS", -1)
+    cola._reencolar_huerfanos()
+
+    assert cola.get(job["id"])["status"] == "queued"
+
+
+def test_purge_borra_solo_los_terminados(cola):
+    cola.register("video", lambda params, progress: None)
+    terminado, _ = cola.submit("video", {}, "video:a")
+    en_cola, _ = cola.submit("video", {}, "video:b")
+    cola._actualizar(terminado["id"], status="done", result={})
+
+    assert cola.purge(ttl=3600) == 0
+    assert cola.purge(ttl=-1) == 1
+    assert cola.get(terminado["id"]) is None
+    assert cola.get(en_cola["id"])["status"] == "queued"
+
+
+def test_watch_libera_el_evento_aunque_el_trabajo_desaparezca(cola):
+    cola.register("video", lambda params, progress: None)
+    job, _ = cola.submit("video", {}, "video:a")
+
+    async def escenario():
+        observador = cola.watch(job["id"], heartbeat=0.01)
+        await observador.__anext__()
+        cola._transaccion(lambda conn: conn.execute("DELETE FROM jobs WHERE id = ?", (job["id"],)))
+        return [estado async for estado in observador]
+
+    assert asyncio.run(escenario()) == []
+    assert cola._cambios == {} and cola._observadores == {}
@@ -0,0 +1,73 @@
+import threading
+import time
+
+from app.utils.model_registry import ModelRegistry
+
+
+def _registro(**kwargs):
+    cargas = []
+
+    def loader(*clave):
+        cargas.append(clave)
+        time.sleep(0.05)
+        return {"clave": clave}
+
+    return ModelRegistry("test", loader, **kwargs), cargas
+
+
+def test_cargas_concurrentes_de_la_misma_clave_cargan_una_vez():
+    registro, cargas = _registro()
+    modelos = []
+    hilos = [threading.Thread(target=lambda: modelos.append(registro.get("small", "cpu"))) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert cargas == [("small", "cpu")]
+    assert all(modelo is modelos[0] for modelo in modelos)
+    metricas = registro.stats()["models"]["small/cpu"]
+    assert metricas["loads"] == 1
+    assert metricas["hits"] == 7
+
+
+def test_limite_de_modelos_libera_el_menos_usado():
+    registro, cargas = _registro(max_modelos=2)
+    registro.get("tiny")
+    registro.get("base")
+    registro.get("tiny")  # "base" pasa a ser el menos usado
+    registro.get("small")
+
+    assert registro.stats()["loaded"] == [["tiny"], ["small"]]
+    registro.get("base")
+    assert cargas.count(("base",)) == 2
+
+
+def test_evict():
+    registro, _ = _registro()
+    registro.get("tiny")
+    registro.get("base")
+
+    assert registro.evict("base") == ("base",)
+    assert registro.evict("base") is None
+    assert registro.evict() == ("tiny",)
+    assert registro.stats()["loaded"] == []
+
+
+def test_inference_lock_es_el_mismo_por_clave():
+    registro, _ = _registro()
+
+    assert registro.inference_lock("small", "cpu") is registro.inference_lock("small", "cpu")
+    assert registro.inference_lock("small", "cpu") is not registro.inference_lock("base", "cpu")
+
+
+def test_record_inference():
+    registro, _ = _registro()
+    registro.get("tiny")
+    registro.record_inference(["tiny"], 1.5)
+    registro.record_inference(("tiny",), 0.5)
+
+    metricas = registro.stats()["models"]["tiny"]
+    assert metricas["inferences"] == 2
+    assert metricas["inference_seconds_total"] == 2.0
+    assert metricas["last_inference_seconds"] == 0.5